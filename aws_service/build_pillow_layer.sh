@@ -0,0 +1,20 @@
+#!/bin/sh
+# Installs Pillow for the Lambda runtime (python3.9, x86_64) into
+# .lambda_layers/pillow/python for the pillow_layer. terraform runs this
+# through data.external, so it prints the layer directory as JSON on stdout
+# and sends pip's output to stderr.
+set -e
+cd "$(dirname "$0")"
+
+PILLOW_VERSION=11.3.0
+LAYER_DIR=.lambda_layers/pillow
+
+if [ ! -d "$LAYER_DIR/python/pillow-$PILLOW_VERSION.dist-info" ]; then
+  rm -rf "$LAYER_DIR"
+  pip install "pillow==$PILLOW_VERSION" \
+    --platform manylinux2014_x86_64 --implementation cp \
+    --python-version 3.9 --only-binary=:all: \
+    --target "$LAYER_DIR/python" 1>&2
+fi
+
+printf '{"source_dir": "%s/"}\n' "$LAYER_DIR"
@@ -33,6 +33,26 @@ resource "aws_lambda_layer_version" "requests_layer" {
 }
 
 
+# Pillow has binary wheels, so the layer is installed for the Lambda
+# platform by build_pillow_layer.sh when terraform reads this
+data "external" "pillow_layer" {
+  program = ["sh", "${path.module}/build_pillow_layer.sh"]
+}
+
+data "archive_file" "pillow_layer_zip" {
+  type        = "zip"
+  source_dir  = data.external.pillow_layer.result.source_dir
+  output_path = ".lambda_layers/pillow_layer.zip"
+}
+
+resource "aws_lambda_layer_version" "pillow_layer" {
+  layer_name          = "pillow-layer"
+  description         = "Layer containing Pillow for the avatar thumbnails"
+  filename            = data.archive_file.pillow_layer_zip.output_path
+  source_code_hash    = data.archive_file.pillow_layer_zip.output_base64sha256
+  compatible_runtimes = ["python3.9"]
+}
+
 resource "aws_lambda_function" "create_order_function" {
   function_name    = "create-order-function"
   filename         = "create_order.zip"
@@ -46,8 +66,6 @@ resource "aws_lambda_function" "create_order_function" {
       CHARGER_STATUS_CHANGE_QUEUE_URL = aws_sqs_queue.order_status_queue.url
       UPDATE_PAYMENT_STATUS_API       = "http://charging-sys-dev.eba-thmur3sy.us-east-1.elasticbeanstalk.com/api/charging/records/",
       UPDATE_CHARGER_STATUS_API       = "http://charging-sys-dev.eba-thmur3sy.us-east-1.elasticbeanstalk.com/api/charging/chargers/",
-      SCHEDULED_UPDATE_LAMBDA_ARN     = aws_lambda_function.scheduled_status_update_function.arn,
-      AWS_ACCOUNT_ID                  = "218278578731"
     }
   }
   layers = [
@@ -90,7 +108,8 @@ resource "aws_lambda_function" "upload_avatar_function" {
     }
   }
   layers = [
-    aws_lambda_layer_version.requests_layer.arn
+    aws_lambda_layer_version.requests_layer.arn,
+    aws_lambda_layer_version.pillow_layer.arn
   ]
 }
 
@@ -113,7 +132,43 @@ resource "aws_db_instance" "postgres" {
   }
 }
 
+# shared availability cache and status feed for the web, expiry and status
+# processes (they refuse to start on a per-process cache)
+resource "aws_security_group" "availability_cache_clients" {
+  name        = "availability-cache-clients"
+  description = "Instances allowed to reach the availability cache"
+
+  egress {
+    from_port   = 0
+    to_port     = 0
+    protocol    = "-1"
+    cidr_blocks = ["0.0.0.0/0"]
+  }
+}
+
+resource "aws_security_group" "availability_cache" {
+  name        = "availability-cache"
+  description = "Redis for the availability cache"
+
+  ingress {
+    from_port       = 6379
+    to_port         = 6379
+    protocol        = "tcp"
+    security_groups = [aws_security_group.availability_cache_clients.id]
+  }
+}
+
+resource "aws_elasticache_cluster" "availability_cache" {
+  cluster_id         = "charging-availability"
+  engine             = "redis"
+  node_type          = "cache.t3.micro"
+  num_cache_nodes    = 1
+  port               = 6379
+  security_group_ids = [aws_security_group.availability_cache.id]
+}
+
 locals {
+  availability_cache_location = "redis://${aws_elasticache_cluster.availability_cache.cache_nodes[0].address}:6379/0"
   database_url = "postgres://${aws_db_instance.postgres.username}:${aws_db_instance.postgres.password}@${aws_db_instance.postgres.endpoint}/${aws_db_instance.postgres.db_name}?sslmode=require"
 }
 
@@ -139,6 +194,26 @@ resource "aws_elastic_beanstalk_environment" "charging-sys-dev" {
     name      = "ENVIRONMENT"
     value     = "dev"
   }
+  setting {
+    namespace = "aws:elasticbeanstalk:application:environment"
+    name      = "AVAILABILITY_CACHE_BACKEND"
+    value     = "django.core.cache.backends.redis.RedisCache"
+  }
+  setting {
+    namespace = "aws:elasticbeanstalk:application:environment"
+    name      = "AVAILABILITY_CACHE_LOCATION"
+    value     = local.availability_cache_location
+  }
+  setting {
+    namespace = "aws:elasticbeanstalk:application:environment"
+    name      = "CHARGER_STATUS_QUEUE_URL"
+    value     = aws_sqs_queue.order_status_queue.url
+  }
+  setting {
+    namespace = "aws:autoscaling:launchconfiguration"
+    name      = "SecurityGroups"
+    value     = aws_security_group.availability_cache_clients.id
+  }
 
 }
 resource "aws_api_gateway_rest_api" "gateway" {
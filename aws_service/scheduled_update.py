@@ -4,6 +4,9 @@ import os
 import requests
 
 cloudwatch_events = boto3.client("events")
+lambda_client = boto3.client("lambda")
+http = requests.Session()
+http.headers["Content-Type"] = "application/json"
 
 UPDATE_CHARGER_STATUS_API = os.environ["UPDATE_CHARGER_STATUS_API"]
 AWS_REGION = os.environ["AWS_REGION"]
@@ -12,61 +15,47 @@ AWS_LAMBDA_FUNCTION_NAME = os.environ["AWS_LAMBDA_FUNCTION_NAME"]
 
 
 def handler(event, context):
+    """End the session of a timeout rule left over from the EventBridge scheduler
+
+    Session timeouts are run by the backend's expiry scheduler now; rules
+    created before it still fire once with ``{"charger_id": ...}``. The
+    backend completes the charger's current session the same way its
+    scheduler does and releases the charger, then the rule is deleted.
+    """
+    charger_id = event["charger_id"]
     try:
-        charger_id = event.get("charger_id")
-        target_status = event.get("target_status")
-
-        if not charger_id:
-            raise ValueError("lost charger_id")
-
-        update_order_status(charger_id)
-
-        delete_scheduled_task(charger_id)
-
-        return {
-            "statusCode": 200,
-            "body": json.dumps(
-                {
-                    "message": f"update {charger_id}status to {target_status}",
-                    "success": True,
-                }
-            ),
-        }
-
-    except Exception as e:
+        response = http.post(
+            UPDATE_CHARGER_STATUS_API + charger_id + "/expire_session/"
+        )
+        response.raise_for_status()
+        released = response.json()["released"]
+    except (requests.RequestException, KeyError, ValueError) as e:
+        print(f"failed to expire the session on charger {charger_id}: {e}")
+        released = None
+    delete_scheduled_task(charger_id)
+    if released is None:
         return {
             "statusCode": 500,
-            "body": json.dumps(
-                {
-                    "error": str(e),
-                    "charger_id": charger_id if "charger_id" in locals() else "unknown",
-                }
-            ),
+            "body": json.dumps({"error": "expire failed", "charger_id": charger_id}),
         }
-
-
-def update_order_status(charger_id):
-    headers = {"Content-Type": "application/json"}
-    response = requests.post(
-        UPDATE_CHARGER_STATUS_API + charger_id + "/set_active/", headers=headers
-    )
-    response.raise_for_status()
-    return response.json()
+    return {
+        "statusCode": 200,
+        "body": json.dumps(
+            {"charger_id": charger_id, "released": released, "success": True}
+        ),
+    }
 
 
 def delete_scheduled_task(charger_id):
     rule_name = f"charger-timeout-rule-{charger_id}"
     target_id = f"charger-target-{charger_id}"
 
-    cloudwatch_events.remove_targets(Rule=rule_name, Ids=[target_id])
-
-    cloudwatch_events.delete_rule(Name=rule_name)
-
-    lambda_client = boto3.client("lambda")
     try:
+        cloudwatch_events.remove_targets(Rule=rule_name, Ids=[target_id])
+        cloudwatch_events.delete_rule(Name=rule_name)
         lambda_client.remove_permission(
             FunctionName=AWS_LAMBDA_FUNCTION_NAME,
             StatementId=f"allow-cloudwatch-{rule_name}",
         )
     except Exception as e:
-        print(f"error when remove the permission：{str(e)}")
+        print(f"error when remove the scheduled task：{str(e)}")
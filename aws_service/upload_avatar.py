@@ -1,40 +1,131 @@
 import base64
+import hashlib
+import io
 import json
 import boto3
 import os
+from botocore.exceptions import ClientError
+from PIL import Image, ImageOps, UnidentifiedImageError
 
 s3 = boto3.client("s3")
 
 BUCKET_NAME = os.environ["BUCKET_NAME"]
 
+# square JPEG thumbnails stored as <user_id>/avatar_<size>.jpg; userInfo.html
+# shows the 256 one (128 CSS pixels at 2x)
+THUMBNAIL_SIZES = (256, 64)
+THUMBNAIL_QUALITY = 85
+SOURCE_DIGEST = "source-md5"
+
 
 def handler(event, context):
     try:
-        if event["isBase64Encoded"]:
+        body = event["body"]
+        if event.get("isBase64Encoded"):
             try:
-                body = base64.b64decode(event["body"])
+                body = base64.b64decode(body)
             except Exception:
                 return {
                     "statusCode": 400,
                     "body": json.dumps({"error": "Invalid binary data"}),
                 }
-        user_id = json.loads(body).get("user_id")
-        image = json.loads(body).get("image")
-        file_name = user_id + "/" + json.loads(body).get("file_name")
-        image_data = base64.b64decode(image)
-
-        s3.delete_object(Bucket=BUCKET_NAME, Key=file_name)
-        s3.put_object(
-            Bucket=BUCKET_NAME, Key=file_name, Body=image_data, ContentType="image/png"
-        )
+        request = json.loads(body)
+        user_id = request.get("user_id")
+        file_name = user_id + "/" + request.get("file_name")
+        image_data = base64.b64decode(request.get("image"))
+        digest = hashlib.md5(image_data).hexdigest()
+
+        # an identical image is neither rewritten nor re-thumbnailed
+        thumbnails = []
+        if thumbnail_source(user_id) != digest:
+            try:
+                thumbnails = make_thumbnails(image_data)
+            except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+                return {
+                    "statusCode": 400,
+                    "body": json.dumps({"error": "Invalid image"}),
+                }
+        written = []
+        if stored_etag(file_name) != digest:
+            s3.put_object(
+                Bucket=BUCKET_NAME,
+                Key=file_name,
+                Body=image_data,
+                ContentType="image/png",
+            )
+            written.append(file_name)
+        for size, data in thumbnails:
+            key = thumbnail_key(user_id, size)
+            s3.put_object(
+                Bucket=BUCKET_NAME,
+                Key=key,
+                Body=data,
+                ContentType="image/jpeg",
+                Metadata={SOURCE_DIGEST: digest},
+            )
+            written.append(key)
+
         return {
             "statusCode": 200,
             "body": json.dumps(
                 {
                     "message": f"update {user_id}'s avatar, the store link is: s3://{BUCKET_NAME}/{file_name}",
+                    "thumbnails": [
+                        thumbnail_key(user_id, size) for size in THUMBNAIL_SIZES
+                    ],
+                    "written": written,
                     "success": True,
                 }
             ),
         }
     except Exception as e:
         return {"statusCode": 500, "body": str(e)}
+
+
+def thumbnail_key(user_id, size):
+    return f"{user_id}/avatar_{size}.jpg"
+
+
+def head(key):
+    try:
+        return s3.head_object(Bucket=BUCKET_NAME, Key=key)
+    except ClientError as e:
+        if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+            return None
+        raise
+
+
+def stored_etag(key):
+    """MD5 of the stored object (single-part uploads), or None"""
+    response = head(key)
+    return response["ETag"].strip('"') if response else None
+
+
+def thumbnail_source(user_id):
+    """Digest of the image the current thumbnails were made from, or None"""
+    # the smallest one is written last, so it is only current if all are
+    response = head(thumbnail_key(user_id, THUMBNAIL_SIZES[-1]))
+    return response["Metadata"].get(SOURCE_DIGEST) if response else None
+
+
+def make_thumbnails(image_data):
+    """Decode once and return [(size, JPEG bytes)] for THUMBNAIL_SIZES"""
+    image = Image.open(io.BytesIO(image_data))
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ("RGBA", "LA", "P"):
+        # JPEG has no alpha; flatten onto white
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+    else:
+        image = image.convert("RGB")
+
+    thumbnails = []
+    for size in THUMBNAIL_SIZES:
+        # each size is cut from the previous, larger one
+        image = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        output = io.BytesIO()
+        image.save(output, "JPEG", quality=THUMBNAIL_QUALITY, optimize=True)
+        thumbnails.append((size, output.getvalue()))
+    return thumbnails
@@ -1,4 +1,6 @@
 import json
+import os
+import time
 from typing import Any
 
 import boto3
@@ -7,19 +9,17 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+SECRET_NAME = "google_api_key"
+# how long a fetched key is served before it is fetched again
+SECRET_TTL_SECONDS = float(os.environ.get("SECRET_TTL_SECONDS", 300))
+# how long browsers and caches in front of the API may keep the response
+CACHE_MAX_AGE = int(os.environ.get("CACHE_MAX_AGE", 3600))
+
+_client = None
+
 
 def lambda_handler(event, context):
-    secret_name = "google_api_key"
-    client = get_aws_client()
-    try:
-        get_secret_value_response = client.get_secret_value(SecretId=secret_name)
-    except ClientError as e:
-        # For a list of exceptions thrown, see
-        # https://docs.aws.amazon.com/secretsmanager/latest/apireference/API_GetSecretValue.html
-        logger.error(e)
-        raise e
-    logger.info(get_secret_value_response)
-    secret = get_secret_value_response["SecretString"]
+    secret = secret_cache.get()
 
     return {
         "statusCode": 200,
@@ -28,13 +28,64 @@ def lambda_handler(event, context):
             "Access-Control-Allow-Headers": "Content-Type",
             "Access-Control-Allow-Origin": "https://t0oy2j75f0.execute-api.us-east-1.amazonaws.com",
             "Access-Control-Allow-Methods": "POST, GET",
+            "Cache-Control": f"public, max-age={CACHE_MAX_AGE}",
         },
     }
 
 
 def get_aws_client() -> Any:
-    region_name = "us-east-1"
-    session = boto3.session.Session()
-    client = session.client(service_name="secretsmanager", region_name=region_name)
-    logger.info(client)
-    return client
+    """Secrets Manager client, created once per container"""
+    global _client
+    if _client is None:
+        region_name = "us-east-1"
+        session = boto3.session.Session()
+        _client = session.client(service_name="secretsmanager", region_name=region_name)
+    return _client
+
+
+def fetch_secret() -> str:
+    try:
+        get_secret_value_response = get_aws_client().get_secret_value(
+            SecretId=SECRET_NAME
+        )
+    except ClientError as e:
+        # For a list of exceptions thrown, see
+        # https://docs.aws.amazon.com/secretsmanager/latest/apireference/API_GetSecretValue.html
+        logger.error(e)
+        raise e
+    return get_secret_value_response["SecretString"]
+
+
+class SecretCache:
+    """Module-scope cache of the key for warm invocations
+
+    A cold container fetches the key and fails if it cannot. A warm one
+    serves it until it is ``ttl`` seconds old, then fetches it again
+    inline: Lambda freezes the container between invocations, so work
+    left to a background thread would stall until the next request. The
+    TTL is soft, if the refresh fails the old key is served (and the
+    refresh retried on the next call) rather than failing the map page.
+    """
+
+    def __init__(self, fetch, ttl):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.value = None
+        self.fetched_at = 0.0
+
+    def get(self) -> str:
+        if self.value is None:
+            self._load()
+        elif time.monotonic() - self.fetched_at >= self.ttl:
+            try:
+                self._load()
+            except Exception:
+                logger.exception("could not refresh the secret, serving the cached one")
+        return self.value
+
+    def _load(self):
+        self.value = self.fetch()
+        self.fetched_at = time.monotonic()
+
+
+secret_cache = SecretCache(fetch_secret, SECRET_TTL_SECONDS)
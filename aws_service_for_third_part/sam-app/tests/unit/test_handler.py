@@ -1,8 +1,9 @@
 import json
+from unittest import mock
 
 import pytest
 
-from hello_world import app
+from src.get_google_api_key import app
 
 
 @pytest.fixture()
@@ -62,10 +63,64 @@ def apigw_event():
     }
 
 
-def test_lambda_handler(apigw_event):
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture()
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(app.time, "monotonic", clock)
+    return clock
+
+
+def test_lambda_handler(apigw_event, monkeypatch):
+    monkeypatch.setattr(app, "secret_cache", app.SecretCache(lambda: "key-1", 300))
     ret = app.lambda_handler(apigw_event, "")
     data = json.loads(ret["body"])
 
     assert ret["statusCode"] == 200
-    assert "message" in ret["body"]
-    assert data["message"] == "hello world"
+    assert data["google_maps_api_key"] == "key-1"
+    assert ret["headers"]["Cache-Control"] == f"public, max-age={app.CACHE_MAX_AGE}"
+
+
+def test_secret_is_fetched_once_within_the_ttl(clock):
+    fetch = mock.Mock(return_value="key-1")
+    cache = app.SecretCache(fetch, ttl=300)
+
+    assert cache.get() == "key-1"
+    clock.now += 299
+    assert cache.get() == "key-1"
+    assert fetch.call_count == 1
+
+
+def test_expired_secret_is_refreshed_inline(clock):
+    fetch = mock.Mock(side_effect=["key-1", "key-2"])
+    cache = app.SecretCache(fetch, ttl=300)
+
+    cache.get()
+    clock.now += 300
+    assert cache.get() == "key-2"
+    assert fetch.call_count == 2
+
+
+def test_stale_secret_is_served_when_the_refresh_fails(clock):
+    fetch = mock.Mock(side_effect=["key-1", RuntimeError("throttled"), "key-2"])
+    cache = app.SecretCache(fetch, ttl=300)
+
+    cache.get()
+    clock.now += 301
+    assert cache.get() == "key-1"
+    # the next call tries again
+    assert cache.get() == "key-2"
+
+
+def test_cold_fetch_failure_is_raised(clock):
+    cache = app.SecretCache(mock.Mock(side_effect=RuntimeError("denied")), ttl=300)
+
+    with pytest.raises(RuntimeError):
+        cache.get()
@@ -1,8 +1,19 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.utils import timezone
 from django.utils.html import format_html
 import uuid
-from .models import Station, Charger, ChargingRecord, MaintenanceRecord, User
+from .billing import reprice
+from .exports import records_csv_response
+from .models import (
+    Station,
+    Charger,
+    ChargingRecord,
+    MaintenanceRecord,
+    Tariff,
+    TariffBand,
+    User,
+)
 
 
 @admin.register(User)
@@ -41,11 +52,15 @@ class StationAdmin(admin.ModelAdmin):
         ),
     )
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_charger_counts()
+
     def charger_count(self, obj):
         """Return total number of chargers at this station"""
-        return obj.chargers.count()
+        return obj.charger_count
 
     charger_count.short_description = "Total Chargers"
+    charger_count.admin_order_field = "charger_count"
 
 
 @admin.register(Charger)
@@ -124,7 +139,7 @@ class ChargingRecordAdmin(admin.ModelAdmin):
     list_filter = ("pay_status", "charger__station", "start_time")
     date_hierarchy = "start_time"
     readonly_fields = ("duration", "created_at")
-    actions = ["mark_as_paid", "export_as_csv"]
+    actions = ["mark_as_paid", "reprice_fees", "export_as_csv"]
 
     def pay_status_badge(self, obj):
         """Display payment status with colored badges"""
@@ -141,7 +156,9 @@ class ChargingRecordAdmin(admin.ModelAdmin):
     def mark_as_paid(self, request, queryset):
         """Bulk update payment status to paid"""
         updated = queryset.filter(pay_status="unpaid").update(
-            pay_status="paid", transaction_id=f"ADMIN-{uuid.uuid4().hex[:8]}"
+            pay_status="paid",
+            transaction_id=f"ADMIN-{uuid.uuid4().hex[:8]}",
+            updated_at=timezone.now(),
         )
         self.message_user(
             request, f"Successfully updated {updated} records to paid status"
@@ -149,44 +166,46 @@ class ChargingRecordAdmin(admin.ModelAdmin):
 
     mark_as_paid.short_description = "Mark selected as paid"
 
+    def reprice_fees(self, request, queryset):
+        """Recompute fees from the current tariffs"""
+        priced, skipped = reprice(queryset)
+        self.message_user(
+            request, f"Re-priced {priced} records ({skipped} could not be priced)"
+        )
+
+    reprice_fees.short_description = "Re-price selected from tariffs"
+
     def export_as_csv(self, request, queryset):
         """Export selected records as CSV"""
-        import csv
-        from django.http import HttpResponse
-
-        response = HttpResponse(content_type="text/csv")
-        response["Content-Disposition"] = 'attachment; filename="charging_records.csv"'
-
-        writer = csv.writer(response)
-        writer.writerow(
-            [
-                "ID",
-                "Charger",
-                "License Plate",
-                "Start Time",
-                "End Time",
-                "Energy (kWh)",
-                "Fee (¥)",
-                "Payment Status",
-            ]
-        )
-        for obj in queryset:
-            writer.writerow(
-                [
-                    obj.id,
-                    obj.charger.code,
-                    obj.start_time,
-                    obj.end_time,
-                    obj.electricity,
-                    obj.fee,
-                    obj.get_pay_status_display(),
-                ]
-            )
-        return response
+        return records_csv_response(queryset)
 
     export_as_csv.short_description = "Export selected to CSV"
 
 
+class TariffBandInline(admin.TabularInline):
+    model = TariffBand
+    extra = 0
+
+
+@admin.register(Tariff)
+class TariffAdmin(admin.ModelAdmin):
+    list_display = (
+        "name",
+        "station",
+        "charger_type",
+        "energy_rate",
+        "session_fee",
+        "idle_rate",
+        "valid_from",
+        "valid_to",
+    )
+    search_fields = ("name", "station__name")
+    list_filter = ("charger_type", "valid_from")
+    list_select_related = ("station",)
+    readonly_fields = ("created_at", "updated_at")
+    inlines = [TariffBandInline]
+
+
 @admin.register(MaintenanceRecord)
 class MaintenanceRecordAdmin(admin.ModelAdmin):
     list_display = (
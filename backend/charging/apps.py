@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class ChargingConfig(AppConfig):
     name = "charging"
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,233 @@
+"""Async read endpoints for the ASGI server (``charging_system.asgi``).
+
+The station/charger reads and the status stream are the endpoints clients
+hold open or poll hardest. Served from these views under ASGI, a waiting
+request is a suspended coroutine rather than a blocked worker thread, so
+one process can keep thousands of stream and long-poll connections open.
+
+The list/retrieve responses are built with the DRF viewsets' own
+querysets, filters and paginator, so they take the same query parameters
+and answer errors the same way (400 for a bad filter, 404 for a bad page).
+"""
+
+import asyncio
+import functools
+import json
+import math
+import time
+
+from asgiref.sync import sync_to_async
+from django.http import (
+    Http404,
+    HttpResponseNotAllowed,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from rest_framework.exceptions import APIException
+from rest_framework.views import exception_handler
+
+from . import availability, events
+from .conditional import async_conditional_get
+from .routers import read_replica
+from .serializers import ChargerSerializer, StationSerializer, aget_station_summaries
+from .views import ChargerViewSet, StationViewSet, _parse_uuid
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+STREAM_POLL_INTERVAL = 1
+STREAM_HEARTBEAT = 15
+STREAM_LIFETIME = 300
+STREAM_RETRY_MS = 3000
+LONG_POLL_MAX_WAIT = 25
+
+
+def read_only(view):
+    """Allow safe methods only and answer errors with DRF's JSON body
+
+    (Django 4.2's ``require_safe`` cannot wrap coroutine views.)
+    """
+
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return HttpResponseNotAllowed(SAFE_METHODS)
+        try:
+            return await view(request, *args, **kwargs)
+        except (APIException, Http404) as exc:
+            response = exception_handler(exc, {})
+            return JsonResponse(response.data, status=response.status_code, safe=False)
+
+    return wrapper
+
+
+def _viewset(viewset_class, request, action, **kwargs):
+    """Set up ``viewset_class`` for ``request`` to reuse its filters and paginator"""
+    view = viewset_class(
+        action_map={"get": action}, args=(), kwargs=kwargs, format_kwarg=None
+    )
+    view.request = view.initialize_request(request, **kwargs)
+    return view
+
+
+def _filtered_page(view):
+    return view.paginate_queryset(view.filter_queryset(view.get_queryset()))
+
+
+@read_replica
+@read_only
+@async_conditional_get
+async def station_list(request):
+    """Async ``GET /stations/``; ``?charger_status=idle`` reads the cache"""
+    view = _viewset(StationViewSet, request, "list")
+    if view._use_availability_cache(view.request):
+        station_ids = await sync_to_async(availability.get_station_ids)()
+        page = view.paginate_queryset(station_ids)
+        results = await sync_to_async(availability.get_stations)(page)
+    else:
+        # the counts are annotated and the chargers prefetched, so serializing
+        # the page needs no further queries
+        page = await sync_to_async(_filtered_page)(view)
+        results = StationSerializer(page, many=True).data
+    return JsonResponse(view.get_paginated_response(results).data)
+
+
+@read_replica
+@read_only
+@async_conditional_get
+async def station_detail(request, pk):
+    view = _viewset(StationViewSet, request, "retrieve", pk=pk)
+    if view._use_availability_cache(view.request):
+        station_id = _parse_uuid(pk)
+        if station_id is None:
+            raise Http404
+        stations = await sync_to_async(availability.get_stations)([station_id])
+        if not stations:
+            raise Http404
+        return JsonResponse(stations[0])
+    station = await sync_to_async(view.get_object)()
+    return JsonResponse(StationSerializer(station).data)
+
+
+async def _serialize_chargers(chargers, many):
+    summaries = await aget_station_summaries(
+        {charger.station_id for charger in chargers}
+    )
+    context = {"station_summaries": summaries}
+    if many:
+        return ChargerSerializer(chargers, many=True, context=context).data
+    return ChargerSerializer(chargers[0], context=context).data
+
+
+@read_replica
+@read_only
+@async_conditional_get
+async def charger_list(request):
+    """Async ``GET /chargers/`` with the viewset's filters and search"""
+    view = _viewset(ChargerViewSet, request, "list")
+    chargers = await sync_to_async(_filtered_page)(view)
+    results = await _serialize_chargers(chargers, many=True)
+    return JsonResponse(view.get_paginated_response(results).data)
+
+
+@read_replica
+@read_only
+@async_conditional_get
+async def charger_detail(request, pk):
+    view = _viewset(ChargerViewSet, request, "retrieve", pk=pk)
+    charger = await sync_to_async(view.get_object)()
+    return JsonResponse(await _serialize_chargers([charger], many=False))
+
+
+def _sse_event(event):
+    return f"id: {event['id']}\nevent: status\ndata: {json.dumps(event)}\n\n"
+
+
+def _event_filter(request):
+    """Return a predicate for the ``?station=``/``?charger=`` filters"""
+    stations = set(request.GET.getlist("station"))
+    chargers = set(request.GET.getlist("charger"))
+
+    def matches(event):
+        if stations and event["station"] not in stations:
+            return False
+        return not chargers or event["charger"] in chargers
+
+    return matches
+
+
+def _resume_sequence(request):
+    """The client's last seen event id, or None to start from now"""
+    last_event_id = request.headers.get("Last-Event-ID") or request.GET.get("since")
+    try:
+        return int(last_event_id)
+    except (TypeError, ValueError):
+        return None
+
+
+def _long_poll_wait(request):
+    """Seconds to wait, clamped to [0, LONG_POLL_MAX_WAIT]; None if invalid"""
+    try:
+        wait = float(request.GET["wait"])
+    except ValueError:
+        return None
+    if not math.isfinite(wait):
+        return None
+    return min(max(wait, 0.0), LONG_POLL_MAX_WAIT)
+
+
+def _invalid_wait():
+    return JsonResponse(
+        {"wait": [f"a number of seconds up to {LONG_POLL_MAX_WAIT}"]}, status=400
+    )
+
+
+async def _matching_events(sequence, matches):
+    cursor, found = await events.aevents_since(sequence)
+    return cursor, [{"id": seq, **event} for seq, event in found if matches(event)]
+
+
+@read_only
+async def status_stream(request):
+    """Push charger status changes as Server-Sent Events
+
+    Filter with ``?station=<id>`` and/or ``?charger=<id>`` (repeatable).
+    Clients resume from ``Last-Event-ID`` (or ``?since=``). With ``?wait=N``
+    the endpoint long-polls instead: it answers with JSON as soon as a
+    matching event arrives or after N seconds (at most 25).
+
+    Only served as a coroutine: a waiting client must not hold a worker
+    thread (under ASGI every sync view shares one thread per process).
+    """
+    matches = _event_filter(request)
+    sequence = _resume_sequence(request)
+    if sequence is None:
+        sequence = await events.acurrent_sequence()
+
+    if "wait" in request.GET:
+        wait = _long_poll_wait(request)
+        if wait is None:
+            return _invalid_wait()
+        deadline = time.monotonic() + wait
+        while True:
+            sequence, found = await _matching_events(sequence, matches)
+            if found or time.monotonic() >= deadline:
+                return JsonResponse({"last_event_id": sequence, "events": found})
+            await asyncio.sleep(STREAM_POLL_INTERVAL)
+
+    async def stream(sequence):
+        yield f"retry: {STREAM_RETRY_MS}\n\n"
+        deadline = time.monotonic() + STREAM_LIFETIME
+        last_write = time.monotonic()
+        while time.monotonic() < deadline:
+            sequence, found = await _matching_events(sequence, matches)
+            for event in found:
+                yield _sse_event(event)
+                last_write = time.monotonic()
+            if time.monotonic() - last_write >= STREAM_HEARTBEAT:
+                yield ": keep-alive\n\n"
+                last_write = time.monotonic()
+            await asyncio.sleep(STREAM_POLL_INTERVAL)
+
+    response = StreamingHttpResponse(stream(sequence), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -0,0 +1,124 @@
+"""Per-station availability cache for the idle-station list.
+
+Entries hold the serialized station (with its idle chargers) keyed by
+station id, plus an index of station ids in list order. Writes go through
+``refresh_station``/``forget_station`` (wired to Station and Charger saves in
+``signals.py``), so readers never rebuild the station/charger graph unless
+an entry is missing or has expired.
+
+The status change feed (``events.py``) lives in the same cache. Workers
+that change chargers outside the web process must share it with the web
+workers, so they call ``require_shared_cache`` before starting.
+"""
+
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import Prefetch
+
+from .models import Charger, Station
+
+CACHE_ALIAS = "availability"
+INDEX_KEY = "station-availability:index"
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def is_shared():
+    """Whether the cache is seen by every process, not just this one"""
+    return not isinstance(_cache(), (LocMemCache, DummyCache))
+
+
+def require_shared_cache():
+    """Raise ImproperlyConfigured if the cache is private to this process"""
+    if not is_shared():
+        raise ImproperlyConfigured(
+            "The availability cache is local to this process, so its status "
+            "events and cache refreshes would never reach the web workers. "
+            "Set AVAILABILITY_CACHE_BACKEND (and AVAILABILITY_CACHE_LOCATION) "
+            "to a shared cache such as Redis."
+        )
+
+
+def _station_key(station_id):
+    return f"station-availability:{station_id}"
+
+
+def _load_stations(station_ids):
+    from .serializers import StationSerializer
+
+    stations = (
+        Station.objects.with_charger_counts()
+        .filter(pk__in=station_ids)
+        .prefetch_related(
+            Prefetch(
+                "chargers",
+                queryset=Charger.objects.filter(status="idle"),
+                to_attr="filtered_chargers",
+            )
+        )
+    )
+    data = StationSerializer(stations, many=True).data
+    return {item["id"]: dict(item) for item in data}
+
+
+def get_station_ids():
+    """Return the ids of all stations in list order"""
+    station_ids = _cache().get(INDEX_KEY)
+    if station_ids is None:
+        station_ids = [
+            str(pk)
+            for pk in Station.objects.order_by("name").values_list("pk", flat=True)
+        ]
+        _cache().set(INDEX_KEY, station_ids)
+    return station_ids
+
+
+def get_stations(station_ids):
+    """Return cached station data for ``station_ids``, loading any misses"""
+    station_ids = [str(station_id) for station_id in station_ids]
+    cached = _cache().get_many([_station_key(pk) for pk in station_ids])
+    stations = {
+        pk: cached[_station_key(pk)] for pk in station_ids if _station_key(pk) in cached
+    }
+    missing = [pk for pk in station_ids if pk not in stations]
+    if missing:
+        loaded = _load_stations(missing)
+        _cache().set_many({_station_key(pk): data for pk, data in loaded.items()})
+        stations.update(loaded)
+    return [stations[pk] for pk in station_ids if pk in stations]
+
+
+def refresh_station(station_id):
+    """Recompute one station's entry once the current transaction commits"""
+    refresh_stations([station_id])
+
+
+def refresh_stations(station_ids):
+    """Recompute several stations' entries with one load after commit"""
+    station_ids = [str(station_id) for station_id in station_ids]
+
+    def write():
+        loaded = _load_stations(station_ids)
+        _cache().set_many({_station_key(pk): data for pk, data in loaded.items()})
+        gone = [_station_key(pk) for pk in station_ids if pk not in loaded]
+        if gone:
+            _cache().delete_many(gone)
+
+    if station_ids:
+        transaction.on_commit(write)
+
+
+def forget_station(station_id):
+    """Drop a station's entry and the list index"""
+    transaction.on_commit(
+        lambda: _cache().delete_many([_station_key(station_id), INDEX_KEY])
+    )
+
+
+def invalidate_index():
+    transaction.on_commit(lambda: _cache().delete(INDEX_KEY))
@@ -0,0 +1,213 @@
+"""Batch session pricing.
+
+Sessions are loaded as plain tuples, turned into NumPy arrays and priced
+with whole-array operations, then written back in bulk (``COPY`` into a
+temporary table plus one ``UPDATE ... FROM`` on Postgres), so re-pricing a
+month of sessions costs a few statements per batch instead of one
+``save()`` per row.
+
+A session's fee is::
+
+    session_fee
+    + kWh * (time-of-use rate, weighted by the share of the session in each band)
+    + idle_rate * max(0, minutes plugged in - minutes needed to deliver the
+                      energy at the charger's power - idle_grace_minutes)
+
+Energy is assumed to flow evenly over the session when split across bands.
+"""
+
+import csv
+import io
+from decimal import Decimal
+
+import numpy as np
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .intervals import local_offsets, seconds_in_daily_window
+from .models import ChargingRecord, Tariff
+
+MAX_FEE = 999999  # cents, what ChargingRecord.fee can hold
+DEFAULT_BATCH_SIZE = 50000
+SESSION_FIELDS = (
+    "pk",
+    "charger__station_id",
+    "charger__charger_type",
+    "charger__power",
+    "start_time",
+    "end_time",
+    "electricity",
+)
+
+
+def _seconds_of_day(value):
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+class TariffTable:
+    """Tariffs in precedence order, matched against whole session arrays"""
+
+    def __init__(self, tariffs):
+        # least specific first, so more specific tariffs overwrite them
+        self.tariffs = sorted(
+            tariffs,
+            key=lambda t: (
+                t.station_id is not None,
+                bool(t.charger_type),
+                t.valid_from,
+            ),
+        )
+
+    @classmethod
+    def load(cls):
+        return cls(Tariff.objects.prefetch_related("bands"))
+
+    def match(self, station_ids, charger_types, start):
+        """Index into ``self.tariffs`` for each session, -1 where none applies"""
+        index = np.full(len(start), -1, dtype=np.int64)
+        for i, tariff in enumerate(self.tariffs):
+            mask = start >= tariff.valid_from.timestamp()
+            if tariff.valid_to is not None:
+                mask &= start < tariff.valid_to.timestamp()
+            if tariff.station_id is not None:
+                mask &= station_ids == str(tariff.station_id)
+            if tariff.charger_type:
+                mask &= charger_types == tariff.charger_type
+            index[mask] = i
+        return index
+
+
+def price_sessions(table, station_ids, charger_types, power, start, end, energy):
+    """Return fees in cents for arrays of sessions (-1 where unpriceable)
+
+    ``start``/``end`` are UTC epoch seconds, ``energy`` kWh and ``power`` kW.
+    Sessions without an end, energy, or matching tariff are unpriceable.
+    """
+    count = len(start)
+    fees = np.full(count, -1, dtype=np.int64)
+    if not count:
+        return fees
+    tariff_index = table.match(station_ids, charger_types, start)
+    priceable = (tariff_index >= 0) & ~np.isnan(end) & ~np.isnan(energy)
+    priceable &= end > start
+
+    offsets = local_offsets(start.astype(np.int64))
+    local_start = start + offsets
+    local_end = np.where(priceable, end, start) + offsets
+    duration = local_end - local_start
+    safe_duration = np.where(duration > 0, duration, 1)
+
+    total = np.zeros(count)
+    for i, tariff in enumerate(table.tariffs):
+        rows = np.flatnonzero(priceable & (tariff_index == i))
+        if not len(rows):
+            continue
+        kwh = energy[rows]
+        remaining = np.ones(len(rows))
+        cost = np.full(len(rows), float(tariff.session_fee))
+        for band in tariff.bands.all():
+            share = (
+                seconds_in_daily_window(
+                    local_start[rows],
+                    local_end[rows],
+                    _seconds_of_day(band.start_time),
+                    _seconds_of_day(band.end_time),
+                )
+                / safe_duration[rows]
+            )
+            share = np.minimum(share, remaining)
+            remaining -= share
+            cost += kwh * share * float(band.energy_rate)
+        cost += kwh * remaining * float(tariff.energy_rate)
+
+        if tariff.idle_rate:
+            charging_minutes = kwh / np.maximum(power[rows], 1) * 60
+            idle_minutes = (
+                duration[rows] / 60 - charging_minutes - tariff.idle_grace_minutes
+            )
+            cost += np.maximum(idle_minutes, 0) * float(tariff.idle_rate)
+        total[rows] = cost
+
+    # round half up to the cent
+    cents = np.floor(total * 100 + 0.5).astype(np.int64)
+    fees[priceable] = np.clip(cents[priceable], 0, MAX_FEE)
+    return fees
+
+
+def _session_arrays(rows):
+    ids, station_ids, charger_types, power, start, end, energy = zip(*rows)
+    return (
+        ids,
+        np.array([str(pk) for pk in station_ids]),
+        np.array(charger_types),
+        np.array(power, dtype=float),
+        np.array([value.timestamp() for value in start]),
+        np.array([np.nan if value is None else value.timestamp() for value in end]),
+        np.array([np.nan if value is None else float(value) for value in energy]),
+    )
+
+
+def _write_fees(ids, cents, using):
+    connection = connections[using]
+    now = timezone.now()
+    if connection.vendor != "postgresql":
+        records = [
+            ChargingRecord(pk=pk, fee=Decimal(int(fee)) / 100, updated_at=now)
+            for pk, fee in zip(ids, cents)
+        ]
+        ChargingRecord.objects.using(using).bulk_update(
+            records, ["fee", "updated_at"], batch_size=1000
+        )
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for pk, fee in zip(ids, cents):
+        writer.writerow((pk, f"{int(fee) / 100:.2f}"))
+    buffer.seek(0)
+    table = connection.ops.quote_name(ChargingRecord._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE TEMPORARY TABLE record_fees (id uuid, fee numeric(6, 2)) "
+            "ON COMMIT DROP"
+        )
+        cursor.cursor.copy_expert(
+            "COPY record_fees (id, fee) FROM STDIN WITH (FORMAT csv)", buffer
+        )
+        cursor.execute(
+            f"UPDATE {table} AS r SET fee = f.fee, updated_at = %s "
+            "FROM record_fees AS f WHERE r.id = f.id",
+            [now],
+        )
+
+
+def reprice(queryset, batch_size=DEFAULT_BATCH_SIZE, dry_run=False, table=None):
+    """Re-price every session in ``queryset``
+
+    Returns (sessions priced, sessions skipped). Each batch is written in its
+    own transaction.
+    """
+    table = table or TariffTable.load()
+    using = queryset.db
+    rows = queryset.order_by().values_list(*SESSION_FIELDS).iterator(chunk_size=10000)
+    priced = skipped = 0
+    batch = []
+
+    def flush():
+        ids, *arrays = _session_arrays(batch)
+        cents = price_sessions(table, *arrays)
+        ok = cents >= 0
+        if not dry_run and ok.any():
+            with transaction.atomic(using=using):
+                _write_fees([pk for pk, keep in zip(ids, ok) if keep], cents[ok], using)
+        return int(ok.sum()), int((~ok).sum())
+
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            done, missed = flush()
+            priced, skipped, batch = priced + done, skipped + missed, []
+    if batch:
+        done, missed = flush()
+        priced, skipped = priced + done, skipped + missed
+    return priced, skipped
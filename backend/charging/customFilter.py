@@ -1,6 +1,9 @@
 # myapp/filters.py
+import django_filters
 from rest_framework.filters import BaseFilterBackend
 
+from .models import ChargerDailyStats, ChargingRecord, StationDailyStats
+
 
 class ChargerStatusFilter(BaseFilterBackend):
     def filter_queryset(self, request, queryset, view):
@@ -12,3 +15,34 @@ class ChargerStatusFilter(BaseFilterBackend):
             except ValueError:
                 pass
         return queryset
+
+
+class ChargingRecordFilter(django_filters.FilterSet):
+    """Record filters shared by the list and CSV export actions"""
+
+    start_after = django_filters.IsoDateTimeFilter(
+        field_name="start_time", lookup_expr="gte"
+    )
+    start_before = django_filters.IsoDateTimeFilter(
+        field_name="start_time", lookup_expr="lt"
+    )
+    station = django_filters.UUIDFilter(field_name="charger__station")
+
+    class Meta:
+        model = ChargingRecord
+        fields = ["charger", "user", "pay_status"]
+
+
+class StationDailyStatsFilter(django_filters.FilterSet):
+    date_after = django_filters.DateFilter(field_name="date", lookup_expr="gte")
+    date_before = django_filters.DateFilter(field_name="date", lookup_expr="lte")
+
+    class Meta:
+        model = StationDailyStats
+        fields = ["station"]
+
+
+class ChargerDailyStatsFilter(StationDailyStatsFilter):
+    class Meta:
+        model = ChargerDailyStats
+        fields = ["station", "charger"]
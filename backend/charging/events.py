@@ -0,0 +1,143 @@
+"""Charger status change feed behind the status stream endpoint.
+
+Each status transition is stored in the availability cache under an
+increasing sequence number, so any worker sharing that cache can replay
+the events a client has not seen yet (SSE ``Last-Event-ID`` or the
+long-poll ``since`` parameter) without touching the database.
+
+A sequence number is taken before its event is written, so a reader can
+see the counter ahead of an event that is still being stored. Readers
+therefore stop at the first missing event and only step over it once an
+event after it has been stored for ``GAP_GRACE`` seconds (its writer died,
+or it expired); a client never skips an event that is about to appear.
+"""
+
+import time
+
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+
+CACHE_ALIAS = "availability"
+SEQUENCE_KEY = "status-events:seq"
+EVENT_TTL = 300
+MAX_BACKLOG = 500
+# seconds a missing event may still be in the middle of being written
+GAP_GRACE = 2
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _event_key(sequence):
+    return f"status-events:{sequence}"
+
+
+def _next_sequence():
+    cache = _cache()
+    cache.add(SEQUENCE_KEY, 0, timeout=None)
+    try:
+        return cache.incr(SEQUENCE_KEY)
+    except ValueError:
+        # evicted between add() and incr()
+        cache.set(SEQUENCE_KEY, 1, timeout=None)
+        return 1
+
+
+def _store(cache, sequence, event):
+    cache.set(_event_key(sequence), (time.time(), event), EVENT_TTL)
+
+
+def current_sequence():
+    return _cache().get(SEQUENCE_KEY, 0)
+
+
+def publish_status_change(charger, previous_status=None):
+    """Record a charger status transition once the transaction commits"""
+    publish_status_changes(
+        [(charger.pk, charger.station_id, charger.status, previous_status)]
+    )
+
+
+def publish_status_changes(changes):
+    """Record ``(charger_id, station_id, status, previous_status)`` transitions
+
+    Station summaries for all the changes are read with one grouped query.
+    """
+    from .serializers import get_station_summaries
+
+    changes = list(changes)
+
+    def write():
+        summaries = get_station_summaries({change[1] for change in changes})
+        timestamp = timezone.now().isoformat()
+        cache = _cache()
+        for charger_id, station_id, status, previous_status in changes:
+            event = {
+                "charger": str(charger_id),
+                "station": str(station_id),
+                "status": status,
+                "previous_status": previous_status,
+                "timestamp": timestamp,
+                **summaries[station_id],
+            }
+            _store(cache, _next_sequence(), event)
+
+    if changes:
+        transaction.on_commit(write)
+
+
+def _backlog(sequence, latest):
+    if sequence >= latest:
+        # nothing new, or the counter was reset and the client is ahead
+        return range(0)
+    return range(max(sequence + 1, latest - MAX_BACKLOG + 1), latest + 1)
+
+
+def _found(sequences, found):
+    """Return (cursor, events) for the stored events in ``sequences``
+
+    The cursor is the last sequence the reader is done with: it stops
+    before a missing event unless the events after it are old enough.
+    """
+    cursor = sequences.start - 1
+    events = []
+    now = time.time()
+    for seq in sequences:
+        entry = found.get(_event_key(seq))
+        if entry is None:
+            continue
+        stored_at, event = entry
+        if seq > cursor + 1 and now - stored_at < GAP_GRACE:
+            break
+        events.append((seq, event))
+        cursor = seq
+    return cursor, events
+
+
+def events_since(sequence):
+    """Return (cursor, [(sequence, event), ...]) after ``sequence``
+
+    Pass the cursor back as ``sequence`` on the next call.
+    """
+    latest = current_sequence()
+    sequences = _backlog(sequence, latest)
+    if not sequences:
+        return latest, []
+    found = _cache().get_many([_event_key(seq) for seq in sequences])
+    return _found(sequences, found)
+
+
+async def acurrent_sequence():
+    return await _cache().aget(SEQUENCE_KEY, 0)
+
+
+async def aevents_since(sequence):
+    """Async version of ``events_since`` for the ASGI status stream"""
+    latest = await acurrent_sequence()
+    sequences = _backlog(sequence, latest)
+    if not sequences:
+        return latest, []
+    found = await _cache().aget_many([_event_key(seq) for seq in sequences])
+    return _found(sequences, found)
@@ -0,0 +1,110 @@
+"""Charging session timeouts.
+
+A session that should end after a paid-for duration gets ``expires_at``
+(see the ``schedule_expiry`` record action). The ``run_expiry_scheduler``
+worker keeps the sessions due within the next ``horizon`` seconds in a
+heap ordered by expiry, sleeps until the earliest one, and releases
+everything due at once: the records are completed and their chargers set
+back to idle with one bulk status update.
+
+Releasing only touches records whose ``expires_at`` has passed and clears
+it, so a rescheduled session is skipped and several workers can run
+side by side without double-releasing.
+"""
+
+import heapq
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Charger, ChargingRecord
+from .status import set_charger_status
+
+
+def release_expired(record_ids, now=None):
+    """Complete the given sessions if they have expired; returns their ids"""
+    now = now or timezone.now()
+    with transaction.atomic():
+        records = list(
+            ChargingRecord.objects.select_for_update()
+            .filter(pk__in=record_ids, expires_at__lte=now)
+            .only("pk", "charger_id", "start_time", "end_time", "expires_at")
+        )
+        if not records:
+            return []
+        for record in records:
+            if record.end_time is None:
+                record.end_time = record.expires_at
+            record.duration = int(
+                (record.end_time - record.start_time).total_seconds() / 60
+            )
+            record.status = "completed"
+            record.expires_at = None
+            record.updated_at = now
+        ChargingRecord.objects.bulk_update(
+            records,
+            ["end_time", "duration", "status", "expires_at", "updated_at"],
+        )
+        set_charger_status(
+            Charger.objects.filter(
+                pk__in={record.charger_id for record in records}, status="charging"
+            ),
+            "idle",
+        )
+    return [record.pk for record in records]
+
+
+def expire_now(record_ids, now=None):
+    """Expire the given sessions immediately and release them"""
+    now = now or timezone.now()
+    with transaction.atomic():
+        ChargingRecord.objects.filter(pk__in=record_ids).update(expires_at=now)
+        return release_expired(record_ids, now)
+
+
+class ExpiryScheduler:
+    """In-memory heap of upcoming expiries, refilled from the database"""
+
+    def __init__(self, horizon=30, batch_size=500):
+        self.horizon = horizon
+        self.batch_size = batch_size
+        self.heap = []
+        # record id -> expires_at of its live heap entry
+        self.scheduled = {}
+
+    def load(self, now):
+        """Schedule sessions expiring before ``now + horizon``"""
+        upcoming = ChargingRecord.objects.filter(
+            expires_at__lte=now + timedelta(seconds=self.horizon)
+        ).values_list("expires_at", "pk")
+        for expires_at, pk in upcoming.order_by("expires_at"):
+            if self.scheduled.get(pk) != expires_at:
+                # new or rescheduled; an older entry becomes stale
+                self.scheduled[pk] = expires_at
+                heapq.heappush(self.heap, (expires_at, pk))
+
+    def pop_due(self, now):
+        due = []
+        while self.heap and self.heap[0][0] <= now and len(due) < self.batch_size:
+            expires_at, pk = heapq.heappop(self.heap)
+            if self.scheduled.get(pk) == expires_at:
+                del self.scheduled[pk]
+                due.append(pk)
+        return due
+
+    def run_once(self):
+        """Release what is due; return (released ids, seconds until next)"""
+        now = timezone.now()
+        self.load(now)
+        released = []
+        while True:
+            due = self.pop_due(now)
+            if not due:
+                break
+            released.extend(release_expired(due, now))
+        if self.heap:
+            wait = (self.heap[0][0] - timezone.now()).total_seconds()
+        else:
+            wait = self.horizon
+        return released, max(0.0, min(wait, self.horizon))
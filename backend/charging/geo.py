@@ -0,0 +1,88 @@
+import math
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+GEOHASH_PRECISION = 8
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Encode a coordinate as a geohash string"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    latitude, longitude = float(latitude), float(longitude)
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        value, bounds = (longitude, lng_range) if even else (latitude, lat_range)
+        mid = (bounds[0] + bounds[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            bounds[0] = mid
+        else:
+            bits <<= 1
+            bounds[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
+
+
+def geohash_cell_size(precision):
+    """Return (height, width) in degrees of a geohash cell"""
+    lng_bits = math.ceil(precision * 5 / 2)
+    lat_bits = precision * 5 // 2
+    return 180.0 / 2**lat_bits, 360.0 / 2**lng_bits
+
+
+def covering_geohashes(latitude, longitude, radius_km):
+    """Return the 3x3 geohash cells covering a circle, or None if it is too wide
+
+    The precision is the finest one whose cells are at least ``radius_km``
+    across, so the centre cell and its eight neighbours contain the circle.
+    """
+    cos_lat = max(math.cos(math.radians(float(latitude))), 0.01)
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = geohash_cell_size(precision)
+        if (
+            height * KM_PER_DEGREE >= radius_km
+            and width * KM_PER_DEGREE * cos_lat >= radius_km
+        ):
+            break
+    else:
+        return None
+    cells = set()
+    for d_lat in (-height, 0, height):
+        for d_lng in (-width, 0, width):
+            lat = min(max(float(latitude) + d_lat, -90.0), 90.0)
+            lng = (float(longitude) + d_lng + 180.0) % 360.0 - 180.0
+            cells.add(encode_geohash(lat, lng, precision))
+    return cells
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """Return (min_lat, max_lat, min_lng, max_lng) around a point"""
+    d_lat = radius_km / KM_PER_DEGREE
+    cos_lat = max(math.cos(math.radians(float(latitude))), 0.01)
+    d_lng = min(radius_km / (KM_PER_DEGREE * cos_lat), 180.0)
+    return (
+        float(latitude) - d_lat,
+        float(latitude) + d_lat,
+        float(longitude) - d_lng,
+        float(longitude) + d_lng,
+    )
+
+
+def haversine(lat1, lng1, lat2, lng2):
+    """Great-circle distance in km"""
+    lat1, lng1, lat2, lng2 = map(math.radians, map(float, (lat1, lng1, lat2, lng2)))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
@@ -0,0 +1,57 @@
+"""Vectorised helpers for arrays of time intervals in epoch seconds."""
+
+from datetime import datetime
+
+import numpy as np
+from django.utils import timezone
+
+DAY_SECONDS = 86400
+
+
+def seconds_in_daily_window(start, end, window_start, window_end):
+    """Seconds of each [start, end) that fall in a daily [window_start, window_end)
+
+    ``start``/``end`` are local epoch seconds and the window bounds seconds
+    since midnight. Uses the cumulative window time since the epoch,
+    F(t) = days * length + clip(t mod day - window_start), so the overlap is
+    F(end) - F(start) for every interval at once. A window whose end is not
+    after its start wraps past midnight.
+    """
+    if window_end <= window_start:
+        return seconds_in_daily_window(
+            start, end, window_start, DAY_SECONDS
+        ) + seconds_in_daily_window(start, end, 0, window_end)
+    length = window_end - window_start
+
+    def cumulative(t):
+        days, rest = np.divmod(t, DAY_SECONDS)
+        return days * length + np.clip(rest - window_start, 0, length)
+
+    return cumulative(end) - cumulative(start)
+
+
+def local_offsets(epoch):
+    """UTC offset in seconds of the current time zone at each epoch second"""
+    tz = timezone.get_current_timezone()
+    hours, inverse = np.unique(
+        np.asarray(epoch, dtype=np.int64) // 3600, return_inverse=True
+    )
+    offsets = np.array(
+        [
+            datetime.fromtimestamp(int(hour) * 3600, tz).utcoffset().total_seconds()
+            for hour in hours
+        ],
+        dtype=np.int64,
+    )
+    return offsets[inverse.reshape(-1)]
+
+
+def offset_changes(low, high):
+    """Epoch seconds in (low, high] at which the current time zone's UTC offset changes
+
+    Resolved to the hour, like ``local_offsets``.
+    """
+    hours = np.arange(int(low) // 3600, int(high) // 3600 + 1, dtype=np.int64) * 3600
+    offsets = local_offsets(hours)
+    changes = hours[1:][offsets[1:] != offsets[:-1]]
+    return changes[(changes > low) & (changes <= high)]
@@ -0,0 +1,144 @@
+import json
+import time
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from charging.models import Charger, ChargingRecord, Station
+
+# Maximum SQL queries per request, cold caches. These must not grow with
+# page size or fleet size; a higher count usually means a new N+1 in a
+# serializer.
+QUERY_BUDGETS = {
+    "stations list": 3,
+    "stations list idle": 3,
+    "station detail": 2,
+    "stations nearby": 3,
+    "chargers list": 3,
+    "chargers by station and status": 4,
+    "charger detail": 2,
+    "records list": 2,
+    "records keyset page": 1,
+    "records by charger": 3,
+}
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the read API against the local database (see seed_fleet): "
+        "records latency percentiles and SQL query counts per endpoint and "
+        "fails if any query count exceeds its budget."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--output", help="Write the results as JSON to this file")
+        parser.add_argument(
+            "--compare", help="Report latency changes against a previous --output"
+        )
+
+    def endpoints(self):
+        charger = Charger.objects.order_by().first()
+        station = Station.objects.order_by().exclude(latitude=None).first()
+        if charger is None or station is None:
+            raise CommandError("No data to benchmark, run seed_fleet first")
+        base = "/api/charging"
+        return {
+            "stations list": f"{base}/stations/",
+            "stations list idle": f"{base}/stations/?charger_status=idle",
+            "station detail": f"{base}/stations/{station.pk}/?charger_status=idle",
+            "stations nearby": (
+                f"{base}/stations/nearby/?lat={station.latitude}"
+                f"&lng={station.longitude}&radius=10"
+            ),
+            "chargers list": f"{base}/chargers/",
+            "chargers by station and status": (
+                f"{base}/chargers/?station={charger.station_id}&status=idle"
+            ),
+            "charger detail": f"{base}/chargers/{charger.pk}/",
+            "records list": f"{base}/records/",
+            "records keyset page": f"{base}/records/?cursor=",
+            "records by charger": f"{base}/records/?charger={charger.pk}",
+        }
+
+    def handle(self, *args, **options):
+        client = Client()
+        iterations = options["iterations"]
+        results = {
+            "scale": {
+                "stations": Station.objects.count(),
+                "chargers": Charger.objects.count(),
+                "records": ChargingRecord.objects.count(),
+            },
+            "endpoints": {},
+        }
+        self.stdout.write(f"Scale: {results['scale']}")
+        self.stdout.write(
+            f"{'endpoint':34} {'queries':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+        )
+
+        regressions = []
+        for name, url in self.endpoints().items():
+            # query count on a cold cache, latency over warm iterations
+            caches["availability"].clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(url)
+            # read now: the next request resets the connection's query log
+            query_count = len(queries)
+            if response.status_code != 200:
+                raise CommandError(f"{name}: {url} returned {response.status_code}")
+            timings = []
+            for _ in range(iterations):
+                start = time.perf_counter()
+                client.get(url)
+                timings.append((time.perf_counter() - start) * 1000)
+
+            stats = {
+                "url": url,
+                "queries": query_count,
+                "p50": round(percentile(timings, 50), 2),
+                "p95": round(percentile(timings, 95), 2),
+                "p99": round(percentile(timings, 99), 2),
+            }
+            results["endpoints"][name] = stats
+            budget = QUERY_BUDGETS.get(name)
+            over_budget = budget is not None and query_count > budget
+            line = (
+                f"{name:34} {query_count:>7} {stats['p50']:>8} "
+                f"{stats['p95']:>8} {stats['p99']:>8}"
+            )
+            if over_budget:
+                regressions.append(f"{name}: {query_count} queries (budget {budget})")
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+
+        if options["compare"]:
+            self.compare(options["compare"], results)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(results, f, indent=2)
+        if regressions:
+            raise CommandError("Query count regressions:\n" + "\n".join(regressions))
+
+    def compare(self, path, results):
+        with open(path) as f:
+            previous = json.load(f)["endpoints"]
+        self.stdout.write(f"\nLatency change vs {path} (p95):")
+        for name, stats in results["endpoints"].items():
+            if name not in previous:
+                continue
+            before = previous[name]["p95"]
+            change = (stats["p95"] - before) / before * 100 if before else 0
+            self.stdout.write(
+                f"{name:34} {before:>8} -> {stats['p95']:>8} ({change:+.0f}%)"
+            )
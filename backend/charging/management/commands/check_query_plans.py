@@ -0,0 +1,110 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from charging.models import Charger, ChargingRecord, User
+from charging.views import ChargerViewSet, ChargingRecordViewSet
+
+PAGE_SIZE = 10
+
+
+def viewset_queryset(viewset_class, params):
+    """Return the filtered list queryset a viewset builds for ``params``"""
+    request = Request(APIRequestFactory().get("/", params))
+    view = viewset_class(
+        action="list", request=request, format_kwarg=None, args=(), kwargs={}
+    )
+    return view.filter_queryset(view.get_queryset())
+
+
+def access_paths():
+    """(description, table, queryset) for each indexed viewset access path
+
+    Filter values are taken from existing rows because the viewset filters
+    validate them; paths without a sample row are skipped.
+    """
+    records = ChargingRecord._meta.db_table
+    charger = Charger.objects.order_by().first()
+    user = User.objects.order_by().first()
+    paths = [
+        (
+            "records list unpaid",
+            records,
+            viewset_queryset(ChargingRecordViewSet, {"pay_status": "unpaid"}),
+        ),
+        (
+            "records keyset page",
+            records,
+            viewset_queryset(ChargingRecordViewSet, {}).order_by("-start_time", "-id"),
+        ),
+        (
+            "user email lookup",
+            User._meta.db_table,
+            User.objects.filter(email="someone@example.com"),
+        ),
+    ]
+    if charger is not None:
+        paths += [
+            (
+                "records list by charger",
+                records,
+                viewset_queryset(ChargingRecordViewSet, {"charger": charger.pk}),
+            ),
+            (
+                "chargers list by station and status",
+                Charger._meta.db_table,
+                viewset_queryset(
+                    ChargerViewSet, {"station": charger.station_id, "status": "idle"}
+                ),
+            ),
+        ]
+    if user is not None:
+        paths.append(
+            (
+                "records list by user",
+                records,
+                viewset_queryset(ChargingRecordViewSet, {"user": user.pk}),
+            )
+        )
+    return [(description, table, qs[:PAGE_SIZE]) for description, table, qs in paths]
+
+
+class Command(BaseCommand):
+    help = (
+        "Explains the queries behind each viewset list action and fails if "
+        "any of them falls back to a sequential scan of its table."
+    )
+
+    def handle(self, *args, **options):
+        failures = []
+        with transaction.atomic():
+            if connection.vendor == "postgresql":
+                # small local tables make seq scans cheapest; we want to know
+                # whether an index *can* serve the query
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL enable_seqscan = off")
+            for description, table, queryset in access_paths():
+                plan = queryset.explain()
+                if self.uses_seq_scan(plan, table):
+                    failures.append(description)
+                    self.stdout.write(self.style.ERROR(f"SEQ SCAN  {description}"))
+                    self.stdout.write(plan)
+                else:
+                    self.stdout.write(self.style.SUCCESS(f"INDEX     {description}"))
+        if failures:
+            raise CommandError(f"{len(failures)} access path(s) without an index")
+
+    def uses_seq_scan(self, plan, table):
+        if connection.vendor == "postgresql":
+            # a partitioned table is scanned through its monthly and
+            # default partitions (see charging/partitions.py)
+            partition = r"(_p\d{4}_\d{2}|_default)?"
+            return re.search(rf"Seq Scan on {table}{partition}\b", plan) is not None
+        # sqlite: "SCAN <table>" without "USING ... INDEX"
+        return any(
+            re.search(rf"\bSCAN {table}\b", line) and "INDEX" not in line
+            for line in plan.splitlines()
+        )
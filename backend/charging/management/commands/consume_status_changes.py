@@ -0,0 +1,77 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from charging.availability import require_shared_cache
+from charging.status_queue import MAX_WAIT_SECONDS, StatusChangeConsumer, get_client
+
+logger = logging.getLogger(__name__)
+
+# seconds to wait after a failed receive, doubling up to the maximum
+BACKOFF_INITIAL = 1
+BACKOFF_MAX = 60
+
+
+class Command(BaseCommand):
+    help = (
+        "Applies the charger status changes published by create_order. "
+        "Long-polls the queue for batches of 10, updates the chargers in bulk "
+        "and deletes each batch at once; throughput and lag are reported "
+        "every --stats-interval seconds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--queue-url", default=settings.CHARGER_STATUS_QUEUE_URL)
+        parser.add_argument("--wait", type=int, default=MAX_WAIT_SECONDS)
+        parser.add_argument("--stats-interval", type=int, default=60)
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Drain the queue and exit",
+        )
+
+    def handle(self, *args, **options):
+        if not options["queue_url"]:
+            raise CommandError("Set CHARGER_STATUS_QUEUE_URL or pass --queue-url")
+        try:
+            require_shared_cache()
+        except ImproperlyConfigured as e:
+            raise CommandError(e)
+        consumer = StatusChangeConsumer(
+            get_client(), options["queue_url"], wait=options["wait"]
+        )
+        next_report = time.monotonic() + options["stats_interval"]
+        backoff = BACKOFF_INITIAL
+        while True:
+            # long-running process: drop connections the database timed out
+            close_old_connections()
+            try:
+                received = consumer.poll()
+            except KeyboardInterrupt:
+                break
+            except Exception:
+                if options["once"]:
+                    raise
+                consumer.stats.poll_errors += 1
+                logger.exception(
+                    "receiving status changes failed, retrying in %ss", backoff
+                )
+                time.sleep(backoff)
+                backoff = min(backoff * 2, BACKOFF_MAX)
+                continue
+            backoff = BACKOFF_INITIAL
+            if options["once"] and not received:
+                break
+            if time.monotonic() >= next_report:
+                self.report(consumer.stats)
+                next_report = time.monotonic() + options["stats_interval"]
+        self.report(consumer.stats)
+
+    def report(self, stats):
+        self.stdout.write(
+            " ".join(f"{name}={value}" for name, value in stats.as_dict().items())
+        )
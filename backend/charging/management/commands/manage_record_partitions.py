@@ -0,0 +1,76 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from charging.partitions import (
+    add_months,
+    archive_partition,
+    create_partition,
+    is_partitioned,
+    list_partitions,
+    month_start,
+    months_in_default,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates the monthly charging record partitions for the coming months, "
+        "moves rows out of the default partition into their month's partition "
+        "and optionally archives old ones to gzipped CSV files (PostgreSQL)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--ahead", type=int, default=3, help="Months to create past this one"
+        )
+        parser.add_argument(
+            "--retain",
+            type=int,
+            help="Archive partitions older than this many months",
+        )
+        parser.add_argument(
+            "--archive-dir",
+            default=settings.RECORD_ARCHIVE_DIR,
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Record partitions need PostgreSQL")
+        with connection.cursor() as cursor:
+            if not is_partitioned(cursor):
+                raise CommandError(
+                    "charging records are not partitioned, migrate first"
+                )
+
+        # partitions are cut on UTC month boundaries
+        this_month = month_start(timezone.now())
+        with transaction.atomic(), connection.cursor() as cursor:
+            for offset in range(options["ahead"] + 1):
+                month = add_months(this_month, offset)
+                if create_partition(cursor, month):
+                    self.stdout.write(f"Created partition for {month:%Y-%m}")
+
+        # rows of months without a partition (e.g. loaded after the partitions
+        # were created) sit in the default partition and would never be
+        # archived; split them out, one month per transaction as each split
+        # locks the table
+        with connection.cursor() as cursor:
+            stray = months_in_default(cursor)
+        for month in stray:
+            with transaction.atomic(), connection.cursor() as cursor:
+                create_partition(cursor, month)
+            self.stdout.write(f"Moved {month:%Y-%m} out of the default partition")
+
+        if options["retain"] is None:
+            return
+        if options["retain"] < 1:
+            raise CommandError("--retain must keep at least the current month")
+        cutoff = add_months(this_month, -options["retain"] + 1)
+        with connection.cursor() as cursor:
+            old = [month for month in list_partitions(cursor) if month < cutoff]
+        for month in old:
+            path, rows = archive_partition(connection, month, options["archive_dir"])
+            self.stdout.write(f"Archived {month:%Y-%m}: {rows} records to {path}")
+        self.stdout.write(self.style.SUCCESS(f"Archived {len(old)} partitions"))
@@ -0,0 +1,63 @@
+import json
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from charging.occupancy import day_range, occupancy_report
+
+
+class Command(BaseCommand):
+    help = (
+        "Reports charger utilisation by hour of day and peak concurrency per "
+        "station over a date range (inclusive, local time)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--start", help="First day, YYYY-MM-DD (default 30 days ago)"
+        )
+        parser.add_argument("--end", help="Last day, YYYY-MM-DD (default today)")
+        parser.add_argument("--station", help="Only this station id")
+        parser.add_argument(
+            "--output", help="Write the full report as JSON to this file"
+        )
+
+    def handle(self, *args, **options):
+        end = parse_date(options["end"]) if options["end"] else timezone.localdate()
+        start = (
+            parse_date(options["start"])
+            if options["start"]
+            else end - timedelta(days=29)
+        )
+        if start is None or end is None or end < start:
+            raise CommandError("Expected --start and --end dates, YYYY-MM-DD")
+
+        began = time.perf_counter()
+        report = occupancy_report(
+            *day_range(start, end),
+            station_id=options["station"],
+            per_charger=bool(options["station"]),
+        )
+        elapsed = time.perf_counter() - began
+
+        fleet = report["fleet"]
+        self.stdout.write(
+            f"{report['sessions']} sessions on {fleet['chargers']} chargers, "
+            f"{fleet['utilisation']}% utilised, peak {fleet['peak_concurrency']} "
+            f"concurrent at {fleet['peak_at']}"
+        )
+        self.stdout.write(f"{'station':40} {'chargers':>8} {'util %':>7} {'peak':>5}")
+        for station in sorted(
+            report["stations"], key=lambda s: s["utilisation"], reverse=True
+        ):
+            self.stdout.write(
+                f"{station['name'][:40]:40} {station['chargers']:>8} "
+                f"{station['utilisation']:>7} {station['peak_concurrency']:>5}"
+            )
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Computed in {elapsed:.2f}s"))
@@ -0,0 +1,61 @@
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from charging.billing import DEFAULT_BATCH_SIZE, reprice
+from charging.models import ChargingRecord
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-prices charging records that started between two dates (inclusive, "
+        "local time) using the current tariffs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("start", help="First day, YYYY-MM-DD")
+        parser.add_argument("end", help="Last day, YYYY-MM-DD")
+        parser.add_argument("--station", help="Only records at this station id")
+        parser.add_argument(
+            "--include-paid",
+            action="store_true",
+            help="Also re-price paid and refunded records",
+        )
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Price without saving"
+        )
+
+    def handle(self, *args, **options):
+        start, end = parse_date(options["start"]), parse_date(options["end"])
+        if start is None or end is None or end < start:
+            raise CommandError("Expected a start and end date, YYYY-MM-DD")
+        tz = timezone.get_current_timezone()
+        queryset = ChargingRecord.objects.filter(
+            start_time__gte=timezone.make_aware(
+                datetime.combine(start, datetime.min.time()), tz
+            ),
+            start_time__lt=timezone.make_aware(
+                datetime.combine(end + timedelta(days=1), datetime.min.time()), tz
+            ),
+        )
+        if options["station"]:
+            queryset = queryset.filter(charger__station_id=options["station"])
+        if not options["include_paid"]:
+            queryset = queryset.filter(pay_status="unpaid")
+
+        began = time.perf_counter()
+        priced, skipped = reprice(
+            queryset, batch_size=options["batch_size"], dry_run=options["dry_run"]
+        )
+        elapsed = time.perf_counter() - began
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Priced {priced} records in {elapsed:.1f}s "
+                f"({skipped} skipped: no end time, energy or tariff)"
+                + (" [dry run]" if options["dry_run"] else "")
+            )
+        )
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from charging.rollups import update_daily_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Updates the daily charger and station statistics from records and "
+        "repairs changed since the previous run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Ignore the watermark and recompute every day",
+        )
+
+    def handle(self, *args, **options):
+        began = time.perf_counter()
+        days = update_daily_stats(rebuild=options["rebuild"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Updated {days} days in {time.perf_counter() - began:.1f}s"
+            )
+        )
@@ -0,0 +1,38 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from charging.models import ChargingRecord, MeterSample
+from charging.telemetry import attach_samples_to_records, rollup_sessions
+
+
+class Command(BaseCommand):
+    help = (
+        "Links unassigned meter samples to their charging session and sets "
+        "each session's electricity from its meter readings."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hours",
+            type=int,
+            default=24,
+            help="Roll up sessions that started within this many hours",
+        )
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(hours=options["hours"])
+        with transaction.atomic():
+            attached = attach_samples_to_records(
+                MeterSample.objects.filter(measured_at__gte=since)
+            )
+            updated = rollup_sessions(
+                ChargingRecord.objects.filter(start_time__gte=since)
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Attached {attached} samples, updated {updated} sessions"
+            )
+        )
@@ -0,0 +1,46 @@
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from charging.availability import require_shared_cache
+from charging.expiry import ExpiryScheduler
+
+
+class Command(BaseCommand):
+    help = (
+        "Releases chargers when their charging session expires. Runs until "
+        "stopped, waking up at the next due expiry or every --horizon seconds "
+        "to pick up newly scheduled sessions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--horizon", type=int, default=30)
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Release what is due now and exit, e.g. from cron",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            require_shared_cache()
+        except ImproperlyConfigured as e:
+            raise CommandError(e)
+        scheduler = ExpiryScheduler(
+            horizon=options["horizon"], batch_size=options["batch_size"]
+        )
+        while True:
+            # long-running process: drop connections the database timed out
+            close_old_connections()
+            released, wait = scheduler.run_once()
+            if released:
+                self.stdout.write(f"Released {len(released)} expired sessions")
+            if options["once"]:
+                break
+            try:
+                time.sleep(wait)
+            except KeyboardInterrupt:
+                break
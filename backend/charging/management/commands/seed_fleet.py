@@ -0,0 +1,147 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from charging.geo import encode_geohash
+from charging.models import Charger, ChargingRecord, Station, User
+
+# roughly the island of Ireland
+LATITUDE_RANGE = (51.4, 55.4)
+LONGITUDE_RANGE = (-10.5, -5.4)
+
+
+def batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Command(BaseCommand):
+    help = "Seeds a synthetic fleet of stations, chargers and records for benchmarks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--stations", type=int, default=100)
+        parser.add_argument("--chargers-per-station", type=int, default=4)
+        parser.add_argument("--records", type=int, default=0)
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--flush",
+            action="store_true",
+            help="Delete existing seeded benchmark data first",
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        batch_size = options["batch_size"]
+
+        if options["flush"]:
+            self.stdout.write("Removing previous benchmark data...")
+            Station.objects.filter(name__startswith="Bench ").delete()
+            User.objects.filter(username__startswith="bench-").delete()
+
+        with transaction.atomic():
+            users = self.seed_users(options["users"], batch_size)
+            chargers = self.seed_stations(
+                rng,
+                options["stations"],
+                options["chargers_per_station"],
+                batch_size,
+            )
+        self.seed_records(rng, options["records"], chargers, users, batch_size)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Seeded {options['stations']} stations, {len(chargers)} chargers, "
+                f"{options['records']} records"
+            )
+        )
+
+    def seed_users(self, count, batch_size):
+        password = make_password(None)
+        users = (
+            User(
+                username=f"bench-{i}", email=f"bench-{i}@example.com", password=password
+            )
+            for i in range(count)
+        )
+        for batch in batched(users, batch_size):
+            User.objects.bulk_create(batch, ignore_conflicts=True)
+        return list(
+            User.objects.filter(username__startswith="bench-").values_list(
+                "pk", flat=True
+            )
+        )
+
+    def seed_stations(self, rng, count, chargers_per_station, batch_size):
+        charger_ids = []
+        statuses = [status for status, _ in Charger.STATUS_CHOICES]
+        types = [charger_type for charger_type, _ in Charger.CHARGER_TYPES]
+        offset = Station.objects.filter(name__startswith="Bench ").count()
+        for start in range(0, count, batch_size):
+            stations = []
+            for i in range(start + offset, min(start + batch_size, count) + offset):
+                latitude = Decimal(f"{rng.uniform(*LATITUDE_RANGE):.6f}")
+                longitude = Decimal(f"{rng.uniform(*LONGITUDE_RANGE):.6f}")
+                stations.append(
+                    Station(
+                        name=f"Bench {i:07d}",
+                        address=f"{i} Benchmark Road",
+                        latitude=latitude,
+                        longitude=longitude,
+                        # bulk_create skips Station.save()
+                        geohash=encode_geohash(latitude, longitude),
+                    )
+                )
+            Station.objects.bulk_create(stations)
+            chargers = [
+                Charger(
+                    station=station,
+                    code=f"BENCH-{station.name[6:]}-{j}",
+                    charger_type=rng.choice(types),
+                    power=rng.choice((7, 22, 50, 150)),
+                    status=rng.choices(statuses, weights=(6, 3, 1, 1))[0],
+                )
+                for station in stations
+                for j in range(chargers_per_station)
+            ]
+            Charger.objects.bulk_create(chargers)
+            charger_ids.extend(charger.pk for charger in chargers)
+        return charger_ids
+
+    def seed_records(self, rng, count, chargers, users, batch_size):
+        if not count or not chargers:
+            return
+        now = timezone.now()
+        pay_statuses = [status for status, _ in ChargingRecord.PAY_STATUS]
+
+        def records():
+            for _ in range(count):
+                start = now - timedelta(minutes=rng.randrange(60 * 24 * 365 * 2))
+                duration = rng.randrange(10, 240)
+                yield ChargingRecord(
+                    charger_id=rng.choice(chargers),
+                    user_id=rng.choice(users) if users else None,
+                    start_time=start,
+                    end_time=start + timedelta(minutes=duration),
+                    duration=duration,
+                    electricity=Decimal(rng.randrange(100, 99999)) / 100,
+                    fee=Decimal(rng.randrange(100, 99999)) / 100,
+                    pay_status=rng.choices(pay_statuses, weights=(2, 7, 1))[0],
+                    status="completed",
+                )
+
+        for n, batch in enumerate(batched(records(), batch_size), start=1):
+            ChargingRecord.objects.bulk_create(batch)
+            if n % 20 == 0:
+                self.stdout.write(f"  {n * batch_size} records")
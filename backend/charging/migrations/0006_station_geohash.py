@@ -0,0 +1,33 @@
+# Generated by Django 4.2.25 on 2026-10-18 07:00
+
+from django.db import migrations, models
+
+from charging.geo import encode_geohash
+
+
+def backfill_geohash(apps, schema_editor):
+    Station = apps.get_model('charging', 'Station')
+    stations = Station.objects.filter(latitude__isnull=False, longitude__isnull=False)
+    for station in stations.iterator():
+        station.geohash = encode_geohash(station.latitude, station.longitude)
+        station.save(update_fields=['geohash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('charging', '0005_chargingrecord_status_alter_chargingrecord_fee'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='station',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=12, verbose_name='Geohash'),
+        ),
+        migrations.AddIndex(
+            model_name='station',
+            index=models.Index(fields=['latitude', 'longitude'], name='station_lat_lng_idx'),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.25 on 2026-10-18 07:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('charging', '0006_station_geohash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chargingrecord',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.25 on 2026-10-18 07:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('charging', '0007_chargingrecord_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='charger',
+            index=models.Index(fields=['station', 'status'], name='charger_station_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chargingrecord',
+            index=models.Index(fields=['charger', '-start_time'], name='record_charger_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chargingrecord',
+            index=models.Index(fields=['user', '-start_time'], name='record_user_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chargingrecord',
+            index=models.Index(fields=['-start_time', '-id'], name='record_start_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chargingrecord',
+            index=models.Index(condition=models.Q(('pay_status', 'unpaid')), fields=['-start_time'], name='record_unpaid_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['email'], name='user_email_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.25 on 2026-10-18 07:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('charging', '0008_access_pattern_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MeterSample',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('measured_at', models.DateTimeField(verbose_name='Measured At')),
+                ('energy_kwh', models.DecimalField(decimal_places=3, help_text='Cumulative meter register reading', max_digits=12, verbose_name='Meter Energy (kWh)')),
+                ('power_kw', models.DecimalField(blank=True, decimal_places=2, max_digits=7, null=True, verbose_name='Power (kW)')),
+                ('charger', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='meter_samples', to='charging.charger')),
+                ('record', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='meter_samples', to='charging.chargingrecord')),
+            ],
+            options={
+                'verbose_name': 'Meter Sample',
+                'verbose_name_plural': 'Meter Samples',
+                'indexes': [models.Index(fields=['charger', 'measured_at'], name='meter_charger_time_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.25 on 2026-10-18 07:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('charging', '0009_metersample'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tariff',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100, verbose_name='Tariff Name')),
+                ('charger_type', models.CharField(blank=True, choices=[('DC', 'Direct Current (Fast)'), ('AC', 'Alternating Current (Slow)')], max_length=2, verbose_name='Charger Type')),
+                ('energy_rate', models.DecimalField(decimal_places=4, help_text='Applies outside the time-of-use bands', max_digits=6, verbose_name='Energy Rate (€/kWh)')),
+                ('session_fee', models.DecimalField(decimal_places=2, default=0, max_digits=6, verbose_name='Session Fee (€)')),
+                ('idle_rate', models.DecimalField(decimal_places=4, default=0, help_text='Charged per minute the vehicle stays plugged in after charging', max_digits=6, verbose_name='Idle Fee (€/min)')),
+                ('idle_grace_minutes', models.PositiveIntegerField(default=0, verbose_name='Idle Grace (minutes)')),
+                ('valid_from', models.DateTimeField(verbose_name='Valid From')),
+                ('valid_to', models.DateTimeField(blank=True, null=True, verbose_name='Valid To')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('station', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tariffs', to='charging.station')),
+            ],
+            options={
+                'verbose_name': 'Tariff',
+                'verbose_name_plural': 'Tariffs',
+                'ordering': ['-valid_from'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TariffBand',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('start_time', models.TimeField(verbose_name='Start Time')),
+                ('end_time', models.TimeField(verbose_name='End Time')),
+                ('energy_rate', models.DecimalField(decimal_places=4, max_digits=6, verbose_name='Energy Rate (€/kWh)')),
+                ('tariff', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bands', to='charging.tariff')),
+            ],
+            options={
+                'verbose_name': 'Tariff Band',
+                'verbose_name_plural': 'Tariff Bands',
+                'ordering': ['start_time'],
+            },
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 4.2.25 on 2026-10-18 07:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('charging', '0010_tariff'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Watermark',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('value', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ChargerDailyStats',
+            fields=[
+                ('date', models.DateField(verbose_name='Date')),
+                ('sessions', models.PositiveIntegerField(default=0, verbose_name='Sessions')),
+                ('energy_kwh', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Energy (kWh)')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Revenue (€)')),
+                ('busy_minutes', models.PositiveIntegerField(default=0, verbose_name='Busy Minutes')),
+                ('fault_count', models.PositiveIntegerField(default=0, verbose_name='Faults')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('charger', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='charging.charger')),
+                ('station', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='charger_daily_stats', to='charging.station')),
+            ],
+            options={
+                'verbose_name': 'Charger Daily Stats',
+                'verbose_name_plural': 'Charger Daily Stats',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='StationDailyStats',
+            fields=[
+                ('date', models.DateField(verbose_name='Date')),
+                ('sessions', models.PositiveIntegerField(default=0, verbose_name='Sessions')),
+                ('energy_kwh', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Energy (kWh)')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Revenue (€)')),
+                ('busy_minutes', models.PositiveIntegerField(default=0, verbose_name='Busy Minutes')),
+                ('fault_count', models.PositiveIntegerField(default=0, verbose_name='Faults')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('station', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='charging.station')),
+            ],
+            options={
+                'verbose_name': 'Station Daily Stats',
+                'verbose_name_plural': 'Station Daily Stats',
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['date'], name='station_stats_date_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='stationdailystats',
+            constraint=models.UniqueConstraint(fields=('station', 'date'), name='station_daily_stats_unique'),
+        ),
+        migrations.AddIndex(
+            model_name='chargerdailystats',
+            index=models.Index(fields=['station', 'date'], name='charger_stats_station_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='chargerdailystats',
+            constraint=models.UniqueConstraint(fields=('charger', 'date'), name='charger_daily_stats_unique'),
+        ),
+    ]
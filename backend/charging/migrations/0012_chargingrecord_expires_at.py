@@ -0,0 +1,22 @@
+# Generated by Django 4.2.25 on 2026-10-18 07:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('charging', '0011_daily_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chargingrecord',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, help_text='When the session times out and the charger is released', null=True, verbose_name='Expires At'),
+        ),
+        migrations.AddIndex(
+            model_name='chargingrecord',
+            index=models.Index(condition=models.Q(('expires_at__isnull', False)), fields=['expires_at'], name='record_expires_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.25 on 2026-10-18 07:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from charging.partitions import partition_records, unpartition_records
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('charging', '0012_chargingrecord_expires_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='metersample',
+            name='record',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='meter_samples', to='charging.chargingrecord'),
+        ),
+        migrations.RunPython(partition_records, unpartition_records),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.25 on 2026-10-18 08:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('charging', '0014_user_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StaleDailyStats',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('charger_id', models.UUIDField()),
+                ('date', models.DateField(verbose_name='Date')),
+            ],
+            options={
+                'verbose_name': 'Stale Daily Stats',
+                'verbose_name_plural': 'Stale Daily Stats',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='chargingrecord',
+            index=models.Index(fields=['updated_at'], name='record_updated_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='staledailystats',
+            constraint=models.UniqueConstraint(fields=('charger_id', 'date'), name='stale_daily_stats_unique'),
+        ),
+    ]
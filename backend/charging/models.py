@@ -1,7 +1,10 @@
 from django.db import models
+from django.db.models import Count, Q
 from django.contrib.auth.models import AbstractUser
 import uuid
 
+from .geo import encode_geohash
+
 
 class User(AbstractUser):
     """Extended user model with role-based access"""
@@ -9,15 +12,35 @@ class User(AbstractUser):
     phone = models.CharField(max_length=15, blank=True)
     is_maintenance = models.BooleanField(default=False)
     is_operator = models.BooleanField(default=False)
+    # record list ETags cover the usernames they show
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = "User"
         verbose_name_plural = "Users"
+        indexes = [
+            # UserSerializer.validate looks users up by email
+            models.Index(fields=["email"], name="user_email_idx"),
+        ]
 
     def __str__(self):
         return self.username
 
 
+class StationQuerySet(models.QuerySet):
+    def with_charger_counts(self):
+        """Annotate total, idle and per-type charger counts in one query"""
+        annotations = {
+            "charger_count": Count("chargers"),
+            "idle_charger_count": Count("chargers", filter=Q(chargers__status="idle")),
+        }
+        for charger_type, _ in Charger.CHARGER_TYPES:
+            annotations[f"{charger_type.lower()}_charger_count"] = Count(
+                "chargers", filter=Q(chargers__charger_type=charger_type)
+            )
+        return self.annotate(**annotations)
+
+
 class Station(models.Model):
     """Charging station location"""
 
@@ -31,23 +54,44 @@ class Station(models.Model):
     longitude = models.DecimalField(
         "Longitude", max_digits=9, decimal_places=6, null=True, blank=True
     )
+    # precomputed from latitude/longitude, used to prefilter nearby searches
+    geohash = models.CharField(
+        "Geohash", max_length=12, blank=True, db_index=True, editable=False
+    )
     is_active = models.BooleanField("Operational", default=True)
     contact_phone = models.CharField("Contact Phone", max_length=15, blank=True)
     created_at = models.DateTimeField("Created At", auto_now_add=True)
     updated_at = models.DateTimeField("Updated At", auto_now=True)
 
+    objects = StationQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = encode_geohash(self.latitude, self.longitude)
+        else:
+            self.geohash = ""
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"latitude", "longitude"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "geohash"}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.name
 
     @property
     def available_chargers(self):
         """Return count of available chargers"""
+        if hasattr(self, "idle_charger_count"):
+            return self.idle_charger_count
         return self.chargers.filter(status="idle").count()
 
     class Meta:
         verbose_name = "Charging Station"
         verbose_name_plural = "Charging Stations"
         ordering = ["name"]
+        indexes = [
+            models.Index(fields=["latitude", "longitude"], name="station_lat_lng_idx"),
+        ]
 
 
 class Charger(models.Model):
@@ -86,10 +130,19 @@ class Charger(models.Model):
         verbose_name = "Charger"
         verbose_name_plural = "Chargers"
         ordering = ["station__name", "code"]
+        indexes = [
+            models.Index(
+                fields=["station", "status"], name="charger_station_status_idx"
+            ),
+        ]
 
 
 class ChargingRecord(models.Model):
-    """Record of a completed or ongoing charging session"""
+    """Record of a completed or ongoing charging session
+
+    Partitioned by month of ``start_time`` on Postgres, see
+    ``charging.partitions``.
+    """
 
     PAY_STATUS = (
         ("unpaid", "Unpaid"),
@@ -127,7 +180,26 @@ class ChargingRecord(models.Model):
     transaction_id = models.CharField(
         "Transaction ID", max_length=100, blank=True, null=True
     )
+    expires_at = models.DateTimeField(
+        "Expires At",
+        null=True,
+        blank=True,
+        help_text="When the session times out and the charger is released",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        record = super().from_db(db, field_names, values)
+        record.remember_span()
+        return record
+
+    def remember_span(self):
+        """Keep the stored (charger, start, end), see ``charging.signals``"""
+        self._saved_span = tuple(
+            self.__dict__.get(name) for name in ("charger_id", "start_time", "end_time")
+        )
 
     def save(self, *args, **kwargs):
         # Calculate duration if both times are present
@@ -142,6 +214,253 @@ class ChargingRecord(models.Model):
         verbose_name = "Charging Record"
         verbose_name_plural = "Charging Records"
         ordering = ["-start_time"]
+        indexes = [
+            models.Index(
+                fields=["charger", "-start_time"], name="record_charger_start_idx"
+            ),
+            models.Index(fields=["user", "-start_time"], name="record_user_start_idx"),
+            # keyset pagination walks (start_time, id)
+            models.Index(fields=["-start_time", "-id"], name="record_start_id_idx"),
+            models.Index(
+                fields=["-start_time"],
+                name="record_unpaid_start_idx",
+                condition=Q(pay_status="unpaid"),
+            ),
+            # only sessions still waiting to expire are indexed
+            models.Index(
+                fields=["expires_at"],
+                name="record_expires_idx",
+                condition=Q(expires_at__isnull=False),
+            ),
+            # the daily stats roll-up reads the records changed since its watermark
+            models.Index(fields=["updated_at"], name="record_updated_idx"),
+        ]
+
+
+class Tariff(models.Model):
+    """Pricing plan for charging sessions
+
+    A tariff applies to one station, one charger type, both, or (with
+    neither set) the whole network; the most specific tariff valid at a
+    session's start time wins. See ``charging.billing``.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    name = models.CharField("Tariff Name", max_length=100)
+    station = models.ForeignKey(
+        Station,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="tariffs",
+    )
+    charger_type = models.CharField(
+        "Charger Type",
+        max_length=2,
+        choices=Charger.CHARGER_TYPES,
+        blank=True,
+    )
+    energy_rate = models.DecimalField(
+        "Energy Rate (€/kWh)",
+        max_digits=6,
+        decimal_places=4,
+        help_text="Applies outside the time-of-use bands",
+    )
+    session_fee = models.DecimalField(
+        "Session Fee (€)", max_digits=6, decimal_places=2, default=0
+    )
+    idle_rate = models.DecimalField(
+        "Idle Fee (€/min)",
+        max_digits=6,
+        decimal_places=4,
+        default=0,
+        help_text="Charged per minute the vehicle stays plugged in after charging",
+    )
+    idle_grace_minutes = models.PositiveIntegerField("Idle Grace (minutes)", default=0)
+    valid_from = models.DateTimeField("Valid From")
+    valid_to = models.DateTimeField("Valid To", null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        verbose_name = "Tariff"
+        verbose_name_plural = "Tariffs"
+        ordering = ["-valid_from"]
+
+
+class TariffBand(models.Model):
+    """Time-of-use energy rate within a tariff
+
+    Times are local wall-clock times; a band whose end is not after its
+    start wraps past midnight (e.g. 23:00-07:00).
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    tariff = models.ForeignKey(Tariff, on_delete=models.CASCADE, related_name="bands")
+    start_time = models.TimeField("Start Time")
+    end_time = models.TimeField("End Time")
+    energy_rate = models.DecimalField(
+        "Energy Rate (€/kWh)", max_digits=6, decimal_places=4
+    )
+
+    def __str__(self):
+        return f"{self.tariff.name} {self.start_time:%H:%M}-{self.end_time:%H:%M}"
+
+    class Meta:
+        verbose_name = "Tariff Band"
+        verbose_name_plural = "Tariff Bands"
+        ordering = ["start_time"]
+
+
+class MeterSample(models.Model):
+    """Periodic meter reading reported by a charger"""
+
+    # high-volume append-only table: a sequential bigint key keeps inserts
+    # and index maintenance cheap compared to random UUIDs
+    id = models.BigAutoField(primary_key=True)
+    charger = models.ForeignKey(
+        Charger, on_delete=models.CASCADE, related_name="meter_samples", db_index=False
+    )
+    record = models.ForeignKey(
+        ChargingRecord,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="meter_samples",
+        # records are partitioned on Postgres, where their id alone is not a
+        # unique key a foreign key constraint can reference
+        db_constraint=False,
+    )
+    measured_at = models.DateTimeField("Measured At")
+    energy_kwh = models.DecimalField(
+        "Meter Energy (kWh)",
+        max_digits=12,
+        decimal_places=3,
+        help_text="Cumulative meter register reading",
+    )
+    power_kw = models.DecimalField(
+        "Power (kW)", max_digits=7, decimal_places=2, null=True, blank=True
+    )
+
+    def __str__(self):
+        return f"{self.charger_id} - {self.measured_at.isoformat()}"
+
+    class Meta:
+        verbose_name = "Meter Sample"
+        verbose_name_plural = "Meter Samples"
+        indexes = [
+            models.Index(
+                fields=["charger", "measured_at"], name="meter_charger_time_idx"
+            ),
+        ]
+
+
+class DailyStats(models.Model):
+    """Per-day session totals, maintained by the ``rollup_daily_stats`` command"""
+
+    date = models.DateField("Date")
+    sessions = models.PositiveIntegerField("Sessions", default=0)
+    energy_kwh = models.DecimalField(
+        "Energy (kWh)", max_digits=12, decimal_places=2, default=0
+    )
+    revenue = models.DecimalField(
+        "Revenue (€)", max_digits=12, decimal_places=2, default=0
+    )
+    busy_minutes = models.PositiveIntegerField("Busy Minutes", default=0)
+    fault_count = models.PositiveIntegerField("Faults", default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+
+class ChargerDailyStats(DailyStats):
+    id = models.BigAutoField(primary_key=True)
+    charger = models.ForeignKey(
+        Charger, on_delete=models.CASCADE, related_name="daily_stats"
+    )
+    # copied from the charger so station queries skip the join
+    station = models.ForeignKey(
+        Station, on_delete=models.CASCADE, related_name="charger_daily_stats"
+    )
+
+    def __str__(self):
+        return f"{self.charger_id} - {self.date}"
+
+    class Meta:
+        verbose_name = "Charger Daily Stats"
+        verbose_name_plural = "Charger Daily Stats"
+        ordering = ["-date"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["charger", "date"], name="charger_daily_stats_unique"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["station", "date"], name="charger_stats_station_idx"),
+        ]
+
+
+class StationDailyStats(DailyStats):
+    id = models.BigAutoField(primary_key=True)
+    station = models.ForeignKey(
+        Station, on_delete=models.CASCADE, related_name="daily_stats"
+    )
+
+    def __str__(self):
+        return f"{self.station_id} - {self.date}"
+
+    class Meta:
+        verbose_name = "Station Daily Stats"
+        verbose_name_plural = "Station Daily Stats"
+        ordering = ["-date"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["station", "date"], name="station_daily_stats_unique"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["date"], name="station_stats_date_idx"),
+        ]
+
+
+class Watermark(models.Model):
+    """How far an incremental job has processed its source rows"""
+
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.value.isoformat()}"
+
+
+class StaleDailyStats(models.Model):
+    """A charger's day whose roll-up lost a session
+
+    Written when a record is deleted or moved to another charger or day;
+    the record's ``updated_at`` only leads the roll-up to its new day.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    # no foreign key: the charger may be going away in the same delete
+    charger_id = models.UUIDField()
+    date = models.DateField("Date")
+
+    def __str__(self):
+        return f"{self.charger_id} - {self.date}"
+
+    class Meta:
+        verbose_name = "Stale Daily Stats"
+        verbose_name_plural = "Stale Daily Stats"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["charger_id", "date"], name="stale_daily_stats_unique"
+            ),
+        ]
 
 
 class MaintenanceRecord(models.Model):
@@ -0,0 +1,247 @@
+"""Charger and station occupancy by hour of day.
+
+Sessions overlapping the requested range are loaded once as arrays of
+``(charger, start, end)`` epoch seconds, clipped to the range, and reduced
+with whole-array operations:
+
+* busy seconds per charger and local hour of day use the cumulative
+  daily-window identity from ``charging.intervals`` plus ``np.bincount``;
+* peak concurrency per station is a sweep line: +1 at every start, -1 at
+  every end, sorted by (station, time) and cumulatively summed. Each
+  station's deltas sum to zero, so the running total restarts at every
+  station boundary and ``np.maximum.reduceat`` gives each station's peak.
+"""
+
+from datetime import datetime, time, timedelta
+from datetime import timezone as dt_timezone
+
+import numpy as np
+from django.db.models import Q
+from django.utils import timezone
+
+from .intervals import DAY_SECONDS, local_offsets, offset_changes
+from .models import Charger, ChargingRecord
+
+HOURS = 24
+# sessions longer than this that started before the range are ignored,
+# which keeps the start_time index usable
+MAX_SESSION = timedelta(days=2)
+
+
+def day_range(start_date, end_date):
+    """Aware datetimes for local midnight on ``start_date`` and after ``end_date``"""
+    tz = timezone.get_current_timezone()
+    return (
+        timezone.make_aware(datetime.combine(start_date, time.min), tz),
+        timezone.make_aware(
+            datetime.combine(end_date + timedelta(days=1), time.min), tz
+        ),
+    )
+
+
+def load(range_start, range_end, station_id=None):
+    """Return (chargers, sessions) for the range
+
+    ``chargers`` is a list of ``(id, code, station_id, station_name)`` and
+    ``sessions`` a tuple of arrays (charger index, start, end) in epoch
+    seconds, clipped to the range. Ongoing sessions end now.
+    """
+    chargers = Charger.objects.order_by("station__name", "code")
+    records = ChargingRecord.objects.filter(
+        start_time__gte=range_start - MAX_SESSION, start_time__lt=range_end
+    ).filter(Q(end_time__gt=range_start) | Q(end_time__isnull=True))
+    if station_id is not None:
+        chargers = chargers.filter(station_id=station_id)
+        records = records.filter(charger__station_id=station_id)
+    chargers = list(chargers.values_list("pk", "code", "station_id", "station__name"))
+    index = {charger[0]: i for i, charger in enumerate(chargers)}
+
+    now = timezone.now().timestamp()
+    rows = records.order_by().values_list("charger_id", "start_time", "end_time")
+    charger_index, starts, ends = [], [], []
+    for charger_id, start, end in rows.iterator(chunk_size=10000):
+        charger_index.append(index[charger_id])
+        starts.append(start.timestamp())
+        ends.append(now if end is None else end.timestamp())
+
+    low, high = range_start.timestamp(), range_end.timestamp()
+    starts = np.clip(np.array(starts, dtype=float), low, high)
+    ends = np.clip(np.array(ends, dtype=float), low, high)
+    charger_index = np.array(charger_index, dtype=np.int64)
+    keep = ends > starts
+    return chargers, (charger_index[keep], starts[keep], ends[keep])
+
+
+def hourly_busy_seconds(charger_index, start, end, charger_count):
+    """Busy seconds per (charger, local hour of day)
+
+    Same cumulative-window identity as ``seconds_in_daily_window``, with the
+    day/time-of-day split done once rather than once per hour: every whole
+    day adds an hour to each hour of day, and the partial days add
+    clip(time of day - hour start, 0, 1h) at the end minus the same at the
+    start. Sessions are first split where the UTC offset changes, so each
+    piece maps to local time with a single offset: across a DST switch the
+    local clock jumps, and shifting both ends by one offset would move the
+    time after the switch into the wrong hour.
+    """
+    busy = np.zeros((charger_count, HOURS))
+    if not len(start):
+        return busy
+    charger_index, start, end = _split_at_offset_changes(charger_index, start, end)
+    offsets = local_offsets(start)
+    start_days, start_rest = np.divmod(start + offsets, DAY_SECONDS)
+    end_days, end_rest = np.divmod(end + offsets, DAY_SECONDS)
+    whole_days = np.bincount(
+        charger_index, weights=(end_days - start_days) * 3600, minlength=charger_count
+    )
+    for hour in range(HOURS):
+        window = hour * 3600
+        seconds = np.clip(end_rest - window, 0, 3600)
+        seconds -= np.clip(start_rest - window, 0, 3600)
+        busy[:, hour] = whole_days + np.bincount(
+            charger_index, weights=seconds, minlength=charger_count
+        )
+    return busy
+
+
+def _split_at_offset_changes(charger_index, start, end):
+    """Cut intervals at every UTC offset change they span"""
+    for change in offset_changes(start.min(), end.max()):
+        crossing = (start < change) & (end > change)
+        if not crossing.any():
+            continue
+        charger_index = np.concatenate([charger_index, charger_index[crossing]])
+        tail_end = end[crossing]
+        end = np.concatenate([np.where(crossing, change, end), tail_end])
+        start = np.concatenate([start, np.full(len(tail_end), float(change))])
+    return charger_index, start, end
+
+
+def hourly_capacity(range_start, range_end):
+    """Seconds each local hour of day occurs within the range"""
+    return hourly_busy_seconds(
+        np.zeros(1, dtype=np.int64),
+        np.array([range_start.timestamp()]),
+        np.array([range_end.timestamp()]),
+        1,
+    )[0]
+
+
+def peak_concurrency(group, start, end, group_count):
+    """Return (peak, epoch second of first peak) per group via a sweep line"""
+    peak = np.zeros(group_count, dtype=np.int64)
+    peak_at = np.full(group_count, np.nan)
+    if not len(start):
+        return peak, peak_at
+    groups = np.concatenate([group, group])
+    times = np.concatenate([start, end])
+    deltas = np.concatenate(
+        [np.ones(len(start), dtype=np.int64), -np.ones(len(end), dtype=np.int64)]
+    )
+    # ends before starts at the same instant, so back-to-back sessions on one
+    # charger do not count as two
+    order = np.lexsort((deltas, times, groups))
+    groups, times = groups[order], times[order]
+    running = np.cumsum(deltas[order])
+
+    first = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    present = groups[first]
+    peak[present] = np.maximum.reduceat(running, first)
+    at_peak = np.flatnonzero(running == peak[groups])
+    peaked_groups, position = np.unique(groups[at_peak], return_index=True)
+    peak_at[peaked_groups] = times[at_peak[position]]
+    return peak, peak_at
+
+
+def _timestamp(value):
+    if np.isnan(value):
+        return None
+    return datetime.fromtimestamp(value, dt_timezone.utc).isoformat()
+
+
+def _percentages(busy, capacity):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        share = np.where(capacity > 0, busy / capacity * 100, 0)
+    return [round(float(value), 2) for value in share]
+
+
+def occupancy_report(range_start, range_end, station_id=None, per_charger=False):
+    """Hourly utilisation, occupancy curves and peak concurrency per station"""
+    chargers, (charger_index, start, end) = load(range_start, range_end, station_id)
+    station_ids = sorted({charger[2] for charger in chargers}, key=str)
+    station_position = {pk: i for i, pk in enumerate(station_ids)}
+    charger_station = np.array(
+        [station_position[charger[2]] for charger in chargers], dtype=np.int64
+    )
+
+    busy = hourly_busy_seconds(charger_index, start, end, len(chargers))
+    capacity = hourly_capacity(range_start, range_end)
+    total_capacity = range_end.timestamp() - range_start.timestamp()
+
+    station_busy = np.zeros((len(station_ids), HOURS))
+    np.add.at(station_busy, charger_station, busy)
+    station_chargers = np.bincount(charger_station, minlength=len(station_ids))
+    session_station = (
+        charger_station[charger_index] if len(charger_index) else charger_index
+    )
+    peak, peak_at = peak_concurrency(session_station, start, end, len(station_ids))
+
+    names = {charger[2]: charger[3] for charger in chargers}
+    stations = []
+    for i, pk in enumerate(station_ids):
+        count = int(station_chargers[i])
+        stations.append(
+            {
+                "station": str(pk),
+                "name": names[pk],
+                "chargers": count,
+                "utilisation": round(
+                    float(station_busy[i].sum()) / (total_capacity * count) * 100, 2
+                ),
+                "hourly_utilisation": _percentages(station_busy[i], capacity * count),
+                # average number of chargers in use, by hour of day
+                "hourly_occupancy": [
+                    round(float(value), 3)
+                    for value in np.where(
+                        capacity > 0, station_busy[i] / np.maximum(capacity, 1), 0
+                    )
+                ],
+                "peak_concurrency": int(peak[i]),
+                "peak_at": _timestamp(peak_at[i]),
+            }
+        )
+
+    fleet_peak, fleet_peak_at = peak_concurrency(
+        np.zeros(len(start), dtype=np.int64), start, end, 1
+    )
+    report = {
+        "start": range_start.isoformat(),
+        "end": range_end.isoformat(),
+        "sessions": int(len(start)),
+        "fleet": {
+            "chargers": len(chargers),
+            "utilisation": round(
+                float(busy.sum()) / (total_capacity * len(chargers)) * 100, 2
+            )
+            if chargers
+            else 0,
+            "hourly_utilisation": _percentages(
+                busy.sum(axis=0), capacity * len(chargers)
+            ),
+            "peak_concurrency": int(fleet_peak[0]),
+            "peak_at": _timestamp(fleet_peak_at[0]),
+        },
+        "stations": stations,
+    }
+    if per_charger:
+        report["chargers"] = [
+            {
+                "charger": str(pk),
+                "code": code,
+                "station": str(station),
+                "utilisation": round(float(busy[i].sum()) / total_capacity * 100, 2),
+                "hourly_utilisation": _percentages(busy[i], capacity),
+            }
+            for i, (pk, code, station, _) in enumerate(chargers)
+        ]
+    return report
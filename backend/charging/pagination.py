@@ -0,0 +1,159 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound, ValidationError as APIValidationError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(PageNumberPagination):
+    """Page numbers by default, keyset pages when ``?cursor=`` is present
+
+    Keyset pages walk ``(keyset_field, id)`` in descending order, so every
+    page costs one index range scan no matter how deep it is, and no
+    ``COUNT(*)`` runs unless the client asks for ``?include_total=1``, which
+    returns the planner's row estimate on Postgres. Keyset pages have a
+    fixed order, so ``?ordering=`` together with ``?cursor=`` is a 400.
+    """
+
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    total_query_param = "include_total"
+    keyset_field = "start_time"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        if request.query_params.get(api_settings.ORDERING_PARAM):
+            raise APIValidationError(
+                {
+                    api_settings.ORDERING_PARAM: [
+                        f"cannot be combined with {self.cursor_query_param}; "
+                        f"keyset pages are ordered by -{self.keyset_field}"
+                    ]
+                }
+            )
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        field = self.keyset_field
+        cursor = self.decode_cursor(
+            request.query_params[self.cursor_query_param], queryset.model
+        )
+
+        self.total = None
+        if request.query_params.get(self.total_query_param):
+            self.total = self.get_approximate_count(queryset)
+
+        if cursor is None:
+            position, reverse = None, False
+        else:
+            position, reverse = cursor
+        if position is None:
+            queryset = queryset.order_by(f"-{field}", "-id")
+        elif not reverse:
+            value, pk = position
+            queryset = (
+                queryset.filter(**{f"{field}__lte": value})
+                .filter(Q(**{f"{field}__lt": value}) | Q(id__lt=pk))
+                .order_by(f"-{field}", "-id")
+            )
+        else:
+            value, pk = position
+            queryset = (
+                queryset.filter(**{f"{field}__gte": value})
+                .filter(Q(**{f"{field}__gt": value}) | Q(id__gt=pk))
+                .order_by(field, "id")
+            )
+
+        rows = list(queryset[: page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, position is not None
+
+        self.next_position = self.position_of(rows[-1]) if rows and has_next else None
+        self.previous_position = (
+            self.position_of(rows[0]) if rows and has_previous else None
+        )
+        return rows
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        payload = OrderedDict(
+            [("next", self.get_next_link()), ("previous", self.get_previous_link())]
+        )
+        if self.total is not None:
+            payload["approximate_count"] = self.total
+        payload["results"] = data
+        return Response(payload)
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if self.next_position is None:
+            return None
+        return self.cursor_link(self.next_position, reverse=False)
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        if self.previous_position is None:
+            return None
+        return self.cursor_link(self.previous_position, reverse=True)
+
+    def cursor_link(self, position, reverse):
+        url = remove_query_param(self.base_url, self.total_query_param)
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(position, reverse)
+        )
+
+    def position_of(self, obj):
+        return getattr(obj, self.keyset_field), obj.pk
+
+    def encode_cursor(self, position, reverse):
+        value, pk = position
+        payload = {"v": value.isoformat(), "id": str(pk), "r": reverse}
+        return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+    def decode_cursor(self, encoded, model):
+        """Return ((value, pk), reverse), or None for the first page"""
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            value = parse_datetime(payload["v"])
+            if value is None:
+                raise ValueError(payload["v"])
+            pk = model._meta.pk.to_python(payload["id"])
+            return (value, pk), bool(payload.get("r"))
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_approximate_count(self, queryset):
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql":
+            return queryset.count()
+        sql, params = queryset.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
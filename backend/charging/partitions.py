@@ -0,0 +1,214 @@
+"""Monthly range partitions of the charging record table (PostgreSQL only).
+
+Migration 0013 turns ``charging_chargingrecord`` into a table partitioned by
+``start_time``, one partition per calendar month (UTC) plus a default
+partition for anything outside them. Queries filtering on ``start_time``
+(list date filters, the admin date hierarchy, keyset pages, exports) only
+read the matching partitions.
+
+Postgres requires the partition key in every unique constraint, so the
+primary key becomes ``(id, start_time)``; ids are random UUIDs and are not
+referenced by database-level foreign keys.
+
+``manage_record_partitions`` keeps partitions created ahead of time, moves
+rows that landed in the default partition into partitions of their own
+month, and archives old ones: a partition is detached, dumped to a gzipped
+CSV and dropped.
+"""
+
+import gzip
+import os
+import re
+from datetime import date
+
+from django.db import transaction
+from django.utils import timezone
+
+TABLE = "charging_chargingrecord"
+DEFAULT_PARTITION = f"{TABLE}_default"
+METER_SAMPLE_TABLE = "charging_metersample"
+PARTITION_NAME = re.compile(rf"^{TABLE}_p(\d{{4}})_(\d{{2}})$")
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"{TABLE}_p{month:%Y_%m}"
+
+
+def is_partitioned(cursor):
+    cursor.execute(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p "
+        "JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = %s)",
+        [TABLE],
+    )
+    return cursor.fetchone()[0]
+
+
+def list_partitions(cursor):
+    """Return the months that have a partition, oldest first"""
+    cursor.execute(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = %s",
+        [TABLE],
+    )
+    months = []
+    for (name,) in cursor.fetchall():
+        match = PARTITION_NAME.match(name)
+        if match:
+            months.append(date(int(match[1]), int(match[2]), 1))
+    return sorted(months)
+
+
+def months_in_default(cursor):
+    """Return the months (UTC) of the rows sitting in the default partition"""
+    cursor.execute(
+        "SELECT DISTINCT date_trunc('month', start_time AT TIME ZONE 'UTC') "
+        f"FROM {DEFAULT_PARTITION}"
+    )
+    return sorted(month_start(row[0]) for row in cursor.fetchall())
+
+
+def _bounds(month):
+    return f"'{month.isoformat()} 00:00:00+00'", (
+        f"'{add_months(month, 1).isoformat()} 00:00:00+00'"
+    )
+
+
+def create_partition(cursor, month):
+    """Create the partition for ``month`` unless it exists; returns True if created
+
+    Rows for that month already sitting in the default partition are moved
+    into the new partition.
+    """
+    name = partition_name(month)
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [name])
+    if cursor.fetchone()[0]:
+        return False
+    low, high = _bounds(month)
+    in_month = f"start_time >= {low} AND start_time < {high}"
+    create = (
+        f"CREATE TABLE {name} PARTITION OF {TABLE} FOR VALUES FROM ({low}) TO ({high})"
+    )
+
+    cursor.execute(
+        f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE {in_month})"
+    )
+    if not cursor.fetchone()[0]:
+        cursor.execute(create)
+        return True
+    # Postgres refuses the new bounds while the default partition holds rows
+    # inside them
+    cursor.execute(f"ALTER TABLE {TABLE} DETACH PARTITION {DEFAULT_PARTITION}")
+    cursor.execute(create)
+    cursor.execute(
+        f"INSERT INTO {TABLE} SELECT * FROM {DEFAULT_PARTITION} WHERE {in_month}"
+    )
+    cursor.execute(f"DELETE FROM {DEFAULT_PARTITION} WHERE {in_month}")
+    cursor.execute(f"ALTER TABLE {TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT")
+    return True
+
+
+def _table_definition(cursor, table):
+    """Index definitions and foreign keys of ``table`` except the primary key"""
+    cursor.execute(
+        "SELECT indexdef FROM pg_indexes i JOIN pg_class c ON c.relname = i.indexname "
+        "JOIN pg_index x ON x.indexrelid = c.oid "
+        "WHERE i.tablename = %s AND NOT x.indisprimary",
+        [table],
+    )
+    # partitioned parents report their indexes as "ON ONLY <table>"
+    indexes = [row[0].replace(" ON ONLY ", " ON ") for row in cursor.fetchall()]
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = %s::regclass AND contype = 'f'",
+        [table],
+    )
+    return indexes, cursor.fetchall()
+
+
+def _rebuild(cursor, partitioned):
+    indexes, foreign_keys = _table_definition(cursor, TABLE)
+    old = f"{TABLE}_old"
+    cursor.execute(f"ALTER TABLE {TABLE} RENAME TO {old}")
+    columns = f"(LIKE {old} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE)"
+    if partitioned:
+        cursor.execute(
+            f"CREATE TABLE {TABLE} {columns} PARTITION BY RANGE (start_time)"
+        )
+        cursor.execute(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT")
+        cursor.execute(f"SELECT min(start_time) FROM {old}")
+        first = cursor.fetchone()[0]
+        this_month = month_start(timezone.now())
+        month = month_start(first) if first else this_month
+        while month <= add_months(this_month, 3):
+            create_partition(cursor, month)
+            month = add_months(month, 1)
+    else:
+        cursor.execute(f"CREATE TABLE {TABLE} {columns}")
+
+    cursor.execute(f"INSERT INTO {TABLE} SELECT * FROM {old}")
+    cursor.execute(f"DROP TABLE {old}")
+    key = "id, start_time" if partitioned else "id"
+    cursor.execute(
+        f"ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey PRIMARY KEY ({key})"
+    )
+    for index in indexes:
+        cursor.execute(index)
+    for name, definition in foreign_keys:
+        cursor.execute(f"ALTER TABLE {TABLE} ADD CONSTRAINT {name} {definition}")
+
+
+def partition_records(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        if not is_partitioned(cursor):
+            _rebuild(cursor, partitioned=True)
+
+
+def unpartition_records(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        if is_partitioned(cursor):
+            _rebuild(cursor, partitioned=False)
+
+
+def archive_partition(connection, month, directory):
+    """Detach ``month``'s partition, dump it to ``directory`` and drop it
+
+    Returns (path, row count). Meter samples of the archived sessions are
+    unlinked from them first.
+    """
+    name = partition_name(month)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{name}.csv.gz")
+    with transaction.atomic(using=connection.alias):
+        with connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {TABLE} DETACH PARTITION {name}")
+            cursor.execute(f"SELECT count(*) FROM {name}")
+            expected = cursor.fetchone()[0]
+            with gzip.open(f"{path}.tmp", "wt", encoding="utf-8", newline="") as f:
+                cursor.cursor.copy_expert(
+                    f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER)", f
+                )
+            if cursor.cursor.rowcount != expected:
+                raise RuntimeError(
+                    f"{name}: archived {cursor.cursor.rowcount} of {expected} rows"
+                )
+            os.replace(f"{path}.tmp", path)
+            cursor.execute(
+                f"UPDATE {METER_SAMPLE_TABLE} SET record_id = NULL "
+                f"WHERE record_id IN (SELECT id FROM {name})"
+            )
+            cursor.execute(f"DROP TABLE {name}")
+    return path, expected
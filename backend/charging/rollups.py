@@ -0,0 +1,256 @@
+"""Daily per-charger and per-station statistics for the operator dashboard.
+
+``update_daily_stats`` is incremental: it looks at the records changed
+(``updated_at``) and repairs logged since the last run's watermark, works
+out which (charger, day) pairs they touch, and recomputes only those rows
+from the raw tables, then the station rows above them. Recomputing whole
+rows rather than adding deltas keeps reruns and overlapping windows safe.
+
+A session counts towards the local day it starts on (a repair towards the
+day of its maintenance time), but its busy minutes are split across the
+days it spans, so a session running past midnight also keeps the next day
+busy. A fault is a ``repair`` maintenance record, the only persisted trace
+of one.
+
+A deleted record, or one moved to another charger or day, leaves no
+changed row on the day it used to count towards; ``charging.signals``
+records those days as ``StaleDailyStats`` rows, consumed by the next run.
+"""
+
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from datetime import timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import (
+    Count,
+    DateTimeField,
+    DecimalField,
+    DurationField,
+    ExpressionWrapper,
+    F,
+    Q,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Coalesce, Greatest, Least, TruncDate
+from django.utils import timezone
+
+from .models import (
+    Charger,
+    ChargerDailyStats,
+    ChargingRecord,
+    MaintenanceRecord,
+    StaleDailyStats,
+    StationDailyStats,
+    Watermark,
+)
+
+WATERMARK = "daily-stats"
+# re-read a little before the watermark to catch rows from transactions that
+# were still open at the last run
+OVERLAP = timedelta(minutes=5)
+STAT_FIELDS = ("sessions", "energy_kwh", "revenue", "busy_minutes", "fault_count")
+ZERO = Value(0, output_field=DecimalField())
+# how far back a day's rebuild looks for sessions still running into it
+LONGEST_SESSION = timedelta(days=7)
+
+
+def _day_bounds(day):
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.combine(day, time.min), tz)
+    end = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min), tz)
+    return start, end
+
+
+def _dirty_days(since, until):
+    """Return {day: {charger_id: station_id}} touched in (since, until]"""
+    tz = timezone.get_current_timezone()
+    changed = ChargingRecord.objects.filter(
+        updated_at__gt=since, updated_at__lte=until
+    ).annotate(day=TruncDate("start_time", tzinfo=tz))
+    records = changed.values_list("day", "charger_id", "charger__station_id").distinct()
+    # the days after midnight a session runs into
+    overnight = (
+        changed.annotate(last_day=TruncDate("end_time", tzinfo=tz))
+        .filter(last_day__gt=F("day"))
+        .values_list("day", "last_day", "charger_id", "charger__station_id")
+        .distinct()
+    )
+    repairs = (
+        MaintenanceRecord.objects.filter(
+            maintenance_type="repair", created_at__gt=since, created_at__lte=until
+        )
+        .annotate(day=TruncDate("maintenance_time", tzinfo=tz))
+        .values_list("day", "charger_id", "charger__station_id")
+        .distinct()
+    )
+    dirty = defaultdict(dict)
+    for rows in (records, repairs):
+        for day, charger_id, station_id in rows.order_by():
+            dirty[day][charger_id] = station_id
+    for day, last_day, charger_id, station_id in overnight.order_by():
+        while day < last_day:
+            day += timedelta(days=1)
+            dirty[day][charger_id] = station_id
+    return dirty
+
+
+def session_days(start_time, end_time=None):
+    """The local days a session counts towards, from its start to its end"""
+    day = timezone.localdate(start_time)
+    last_day = timezone.localdate(end_time) if end_time else day
+    days = [day]
+    while day < last_day:
+        day += timedelta(days=1)
+        days.append(day)
+    return days
+
+
+def mark_stale_days(charger_id, days):
+    """Have the next run rebuild ``days`` of a charger that lost a session"""
+    if days:
+        StaleDailyStats.objects.bulk_create(
+            [StaleDailyStats(charger_id=charger_id, date=day) for day in days],
+            ignore_conflicts=True,
+        )
+
+
+def _stale_days(dirty):
+    """Add the ``StaleDailyStats`` days to ``dirty``; returns the rows' ids"""
+    stale = list(StaleDailyStats.objects.values_list("pk", "date", "charger_id"))
+    stations = dict(
+        Charger.objects.filter(pk__in={charger_id for _, _, charger_id in stale})
+        .order_by()
+        .values_list("pk", "station_id")
+    )
+    for _, day, charger_id in stale:
+        # a deleted charger's rows went with it
+        if charger_id in stations:
+            dirty[day][charger_id] = stations[charger_id]
+    return [pk for pk, _, _ in stale]
+
+
+def _upsert(model, rows, unique_fields):
+    model.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=unique_fields,
+        update_fields=[*STAT_FIELDS, "updated_at"],
+    )
+
+
+def rebuild_charger_days(day, chargers):
+    """Recompute one day's rows for ``chargers`` ({charger_id: station_id})"""
+    start, end = _day_bounds(day)
+    totals = {
+        row.pop("charger_id"): row
+        for row in ChargingRecord.objects.filter(
+            charger_id__in=list(chargers), start_time__gte=start, start_time__lt=end
+        )
+        .order_by()
+        .values("charger_id")
+        .annotate(
+            sessions=Count("id"),
+            energy_kwh=Coalesce(Sum("electricity"), ZERO),
+            revenue=Coalesce(Sum("fee", filter=~Q(pay_status="refunded")), ZERO),
+        )
+    }
+    # the part of every session, however early it started, inside the day
+    overlap = ExpressionWrapper(
+        Least("end_time", Value(end, output_field=DateTimeField()))
+        - Greatest("start_time", Value(start, output_field=DateTimeField())),
+        output_field=DurationField(),
+    )
+    busy = {
+        charger_id: int(busy_time.total_seconds() // 60)
+        for charger_id, busy_time in ChargingRecord.objects.filter(
+            charger_id__in=list(chargers),
+            start_time__gte=start - LONGEST_SESSION,
+            start_time__lt=end,
+            end_time__gt=start,
+        )
+        .order_by()
+        .values("charger_id")
+        .annotate(busy_time=Sum(overlap))
+        .values_list("charger_id", "busy_time")
+    }
+    faults = dict(
+        MaintenanceRecord.objects.filter(
+            charger_id__in=list(chargers),
+            maintenance_type="repair",
+            maintenance_time__gte=start,
+            maintenance_time__lt=end,
+        )
+        .order_by()
+        .values("charger_id")
+        .annotate(count=Count("id"))
+        .values_list("charger_id", "count")
+    )
+
+    rows, empty = [], []
+    for charger_id, station_id in chargers.items():
+        if not (charger_id in totals or charger_id in faults or busy.get(charger_id)):
+            empty.append(charger_id)
+            continue
+        stats = totals.get(charger_id, {})
+        rows.append(
+            ChargerDailyStats(
+                charger_id=charger_id,
+                station_id=station_id,
+                date=day,
+                busy_minutes=busy.get(charger_id, 0),
+                fault_count=faults.get(charger_id, 0),
+                **stats,
+            )
+        )
+    if rows:
+        _upsert(ChargerDailyStats, rows, ["charger", "date"])
+    if empty:
+        ChargerDailyStats.objects.filter(charger_id__in=empty, date=day).delete()
+
+
+def rebuild_station_days(day, station_ids):
+    """Recompute one day's station rows from the charger rows"""
+    totals = {
+        row.pop("station_id"): row
+        for row in ChargerDailyStats.objects.filter(
+            station_id__in=list(station_ids), date=day
+        )
+        .order_by()
+        .values("station_id")
+        .annotate(**{field: Sum(field) for field in STAT_FIELDS})
+    }
+    rows = [
+        StationDailyStats(station_id=station_id, date=day, **stats)
+        for station_id, stats in totals.items()
+    ]
+    if rows:
+        _upsert(StationDailyStats, rows, ["station", "date"])
+    StationDailyStats.objects.filter(
+        station_id__in=set(station_ids) - set(totals), date=day
+    ).delete()
+
+
+def update_daily_stats(rebuild=False):
+    """Bring the roll-ups up to date; returns the number of days touched"""
+    with transaction.atomic():
+        watermark = Watermark.objects.select_for_update().filter(name=WATERMARK).first()
+        if rebuild:
+            ChargerDailyStats.objects.all().delete()
+            StationDailyStats.objects.all().delete()
+        if watermark is None or rebuild:
+            since = datetime.min.replace(tzinfo=dt_timezone.utc)
+        else:
+            since = watermark.value - OVERLAP
+        until = timezone.now()
+
+        dirty = _dirty_days(since, until)
+        stale = _stale_days(dirty)
+        for day in sorted(dirty):
+            chargers = dirty[day]
+            rebuild_charger_days(day, chargers)
+            rebuild_station_days(day, set(chargers.values()))
+        StaleDailyStats.objects.filter(pk__in=stale).delete()
+        Watermark.objects.update_or_create(name=WATERMARK, defaults={"value": until})
+    return len(dirty)
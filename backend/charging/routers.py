@@ -0,0 +1,170 @@
+"""Read replica routing.
+
+When a ``replica`` database is configured, GET/HEAD/OPTIONS requests to
+views that set ``read_replica = True`` run their queries against it;
+everything else, and every write, uses ``default``.
+
+A client that has just written would otherwise risk reading stale data
+from a lagging replica, so a successful unsafe request pins the client to
+the primary for ``REPLICA_PIN_SECONDS``. API clients authenticate with a
+token header and browsers cross-site never send a Lax cookie, so the pin
+is an entry in the shared availability cache keyed on a hash of the
+request's credentials (``Authorization`` header or session cookie);
+anonymous clients get a ``pin_primary`` cookie instead. A pin set by one
+worker must be seen by all of them, so with a process-local availability
+cache (the default LocMem) every read stays on the primary.
+
+The middleware runs natively under both WSGI and ASGI. Under ASGI each
+request is its own task with its own context, and the async ORM's worker
+threads inherit that context, so the flag never leaks between requests.
+"""
+
+import hashlib
+import logging
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+
+from . import availability
+
+logger = logging.getLogger(__name__)
+
+REPLICA = "replica"
+PIN_COOKIE = "pin_primary"
+PIN_CACHE = availability.CACHE_ALIAS
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+_use_replica = ContextVar("use_replica", default=False)
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+def replica_usable():
+    """Whether reads may go to the replica: it exists and pins are shared"""
+    return replica_configured() and availability.is_shared()
+
+
+def _pin_key(request):
+    """Cache key of the client's primary pin, or None if it is anonymous"""
+    credentials = request.META.get("HTTP_AUTHORIZATION") or request.COOKIES.get(
+        settings.SESSION_COOKIE_NAME
+    )
+    if not credentials:
+        return None
+    return "replica-pin:" + hashlib.sha256(credentials.encode()).hexdigest()
+
+
+def _pinned(request):
+    if PIN_COOKIE in request.COOKIES:
+        return True
+    key = _pin_key(request)
+    return key is not None and caches[PIN_CACHE].get(key, False)
+
+
+def read_replica(view_func):
+    """Mark a function-based view as safe to serve from the replica"""
+    view_func.read_replica = True
+    return view_func
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _use_replica.get():
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == REPLICA:
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        if replica_configured() and not availability.is_shared():
+            logger.warning(
+                "The replica is not used: the availability cache holding the "
+                "primary pins is local to this process. Set "
+                "AVAILABILITY_CACHE_BACKEND to a shared cache such as Redis."
+            )
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.replica_token = None
+        try:
+            response = self.get_response(request)
+        finally:
+            self._release(request)
+        if self._wrote(request, response):
+            key = self._pin(request, response)
+            if key is not None:
+                caches[PIN_CACHE].set(key, True, settings.REPLICA_PIN_SECONDS)
+        return response
+
+    async def __acall__(self, request):
+        request.replica_token = None
+        try:
+            response = await self.get_response(request)
+        finally:
+            self._release(request)
+        if self._wrote(request, response):
+            key = self._pin(request, response)
+            if key is not None:
+                await caches[PIN_CACHE].aset(key, True, settings.REPLICA_PIN_SECONDS)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # class-based views carry the flag on the class, function views on
+        # themselves (see ``read_replica``)
+        view = getattr(view_func, "cls", view_func)
+        if (
+            request.method in SAFE_METHODS
+            and getattr(view, "read_replica", False)
+            and replica_usable()
+            and not _pinned(request)
+        ):
+            request.replica_token = _use_replica.set(True)
+
+    def _release(self, request):
+        if request.replica_token is None:
+            return
+        try:
+            _use_replica.reset(request.replica_token)
+        except ValueError:
+            # under ASGI Django runs process_view in a worker thread and
+            # copies the flag back, so the token belongs to another context
+            _use_replica.set(False)
+
+    def _wrote(self, request, response):
+        return request.method not in SAFE_METHODS and response.status_code < 400
+
+    def _pin(self, request, response):
+        """Pin an anonymous client by cookie; return the cache key otherwise"""
+        key = _pin_key(request)
+        if key is None:
+            response.set_cookie(
+                PIN_COOKIE,
+                "1",
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return key
@@ -1,5 +1,65 @@
+from django.db.models import Count, Q
 from rest_framework import serializers
-from .models import Station, Charger, ChargingRecord, User
+from .models import (
+    Station,
+    Charger,
+    ChargerDailyStats,
+    ChargingRecord,
+    StationDailyStats,
+    User,
+)
+
+
+def _station_summary_rows(station_ids):
+    return (
+        Charger.objects.filter(station_id__in=station_ids)
+        .order_by()
+        .values("station_id")
+        .annotate(
+            charger_count=Count("id"),
+            active_charger_count=Count("id", filter=Q(status="idle")),
+        )
+    )
+
+
+def _fold_summaries(station_ids, rows):
+    summaries = {
+        station_id: {"active_charger_count": 0, "charger_count": 0}
+        for station_id in station_ids
+    }
+    for row in rows:
+        summaries[row["station_id"]] = {
+            "active_charger_count": row["active_charger_count"],
+            "charger_count": row["charger_count"],
+        }
+    return summaries
+
+
+def get_station_summaries(station_ids):
+    """Return idle/total charger counts per station from one grouped query"""
+    return _fold_summaries(station_ids, _station_summary_rows(station_ids))
+
+
+async def aget_station_summaries(station_ids):
+    """Async version of ``get_station_summaries``"""
+    rows = [row async for row in _station_summary_rows(station_ids)]
+    return _fold_summaries(station_ids, rows)
+
+
+class ChargerListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        chargers = list(data.all() if hasattr(data, "all") else data)
+        # Stations annotated by Station.objects.with_charger_counts() already
+        # carry their counts; batch the rest into one grouped query per request.
+        summaries = self.context.setdefault("station_summaries", {})
+        missing = {
+            charger.station_id
+            for charger in chargers
+            if not hasattr(charger.station, "charger_count")
+        } - summaries.keys()
+        if missing:
+            summaries.update(get_station_summaries(missing))
+        return super().to_representation(chargers)
 
 
 class ChargerSerializer(serializers.ModelSerializer):
@@ -8,16 +68,24 @@ class ChargerSerializer(serializers.ModelSerializer):
     class Meta:
         model = Charger
         fields = "__all__"
+        list_serializer_class = ChargerListSerializer
 
     def get_station_info(self, obj):
         station = obj.station
         if not station:
             return None
-        return {
-            "station_name": station.name,
-            "active_charger_count": station.chargers.filter(status="idle").count(),
-            "charger_count": station.chargers.count(),
-        }
+        if hasattr(station, "charger_count"):
+            # counts annotated by Station.objects.with_charger_counts()
+            summary = {
+                "active_charger_count": station.idle_charger_count,
+                "charger_count": station.charger_count,
+            }
+        else:
+            summaries = self.context.setdefault("station_summaries", {})
+            if station.pk not in summaries:
+                summaries.update(get_station_summaries([station.pk]))
+            summary = summaries[station.pk]
+        return {"station_name": station.name, **summary}
 
 
 class StationSerializer(serializers.ModelSerializer):
@@ -25,6 +93,8 @@ class StationSerializer(serializers.ModelSerializer):
     avaliable_count = serializers.SerializerMethodField()
     count = serializers.SerializerMethodField()
     chargers_type = serializers.SerializerMethodField()
+    idle_count = serializers.SerializerMethodField()
+    charger_type_counts = serializers.SerializerMethodField()
 
     class Meta:
         model = Station
@@ -34,12 +104,57 @@ class StationSerializer(serializers.ModelSerializer):
         return len(obj.filtered_chargers)
 
     def get_count(self, obj):
+        if hasattr(obj, "charger_count"):
+            return obj.charger_count
         return obj.chargers.count()
 
     def get_chargers_type(self, obj):
         types = {charger.charger_type for charger in obj.filtered_chargers}
         return list(types)
 
+    def get_idle_count(self, obj):
+        return obj.available_chargers
+
+    def get_charger_type_counts(self, obj):
+        if hasattr(obj, "charger_count"):
+            return {
+                charger_type: getattr(obj, f"{charger_type.lower()}_charger_count")
+                for charger_type, _ in Charger.CHARGER_TYPES
+            }
+        counts = dict.fromkeys(dict(Charger.CHARGER_TYPES), 0)
+        for charger in obj.chargers.all():
+            counts[charger.charger_type] += 1
+        return counts
+
+
+class BulkChargerStatusSerializer(serializers.Serializer):
+    """Target chargers by id, or by station plus optional filters"""
+
+    status = serializers.ChoiceField(choices=Charger.STATUS_CHOICES)
+    chargers = serializers.ListField(
+        child=serializers.UUIDField(), required=False, max_length=1000
+    )
+    station = serializers.UUIDField(required=False)
+    current_status = serializers.ChoiceField(
+        choices=Charger.STATUS_CHOICES, required=False
+    )
+    charger_type = serializers.ChoiceField(
+        choices=Charger.CHARGER_TYPES, required=False
+    )
+
+    def validate(self, data):
+        if ("chargers" in data) == ("station" in data):
+            raise serializers.ValidationError(
+                "provide either a list of chargers or a station"
+            )
+        return data
+
+
+class ScheduleExpirySerializer(serializers.Serializer):
+    """Session timeout, in minutes from now"""
+
+    minutes = serializers.IntegerField(min_value=1, max_value=24 * 60)
+
 
 class ChargingRecordSerializer(serializers.ModelSerializer):
     charger_code = serializers.ReadOnlyField(source="charger.code")
@@ -57,6 +172,18 @@ class ChargingRecordSerializer(serializers.ModelSerializer):
         return charger  # 验证通过，返回充电器对象
 
 
+class StationDailyStatsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StationDailyStats
+        exclude = ("id",)
+
+
+class ChargerDailyStatsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ChargerDailyStats
+        exclude = ("id",)
+
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -0,0 +1,45 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import availability, rollups
+from .models import Charger, ChargingRecord, Station
+
+
+@receiver(post_save, sender=Charger)
+@receiver(post_delete, sender=Charger)
+def update_charger_availability(sender, instance, **kwargs):
+    """Write charger changes (status, type, ...) through to the station cache"""
+    availability.refresh_station(instance.station_id)
+
+
+@receiver(post_save, sender=Station)
+def update_station_availability(sender, instance, **kwargs):
+    availability.refresh_station(instance.pk)
+    availability.invalidate_index()
+
+
+@receiver(post_delete, sender=Station)
+def remove_station_availability(sender, instance, **kwargs):
+    availability.forget_station(instance.pk)
+
+
+@receiver(post_save, sender=ChargingRecord)
+def mark_stats_of_moved_record(sender, instance, created, **kwargs):
+    """A session moved to another charger or day leaves its old days stale"""
+    charger_id, start_time, end_time = getattr(
+        instance, "_saved_span", (None, None, None)
+    )
+    if not created and charger_id and start_time:
+        days = set(rollups.session_days(start_time, end_time))
+        if charger_id == instance.charger_id:
+            # the days it still covers are found through updated_at
+            days -= set(rollups.session_days(instance.start_time, instance.end_time))
+        rollups.mark_stale_days(charger_id, days)
+    instance.remember_span()
+
+
+@receiver(post_delete, sender=ChargingRecord)
+def mark_stats_of_deleted_record(sender, instance, **kwargs):
+    if instance.charger_id and instance.start_time:
+        days = rollups.session_days(instance.start_time, instance.end_time)
+        rollups.mark_stale_days(instance.charger_id, days)
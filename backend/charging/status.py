@@ -0,0 +1,32 @@
+from django.db import transaction
+from django.utils import timezone
+
+from . import availability, events
+from .models import Charger
+
+
+def set_charger_status(queryset, status):
+    """Move every charger in ``queryset`` to ``status`` with one UPDATE
+
+    The matched rows are locked and read first so callers get each charger's
+    previous status back as ``{charger_id: previous_status}``. Chargers
+    already in ``status`` are left untouched. update() sends no post_save,
+    so the availability cache and status stream are fed explicitly.
+    """
+    with transaction.atomic():
+        current = {
+            pk: (station_id, previous_status)
+            for pk, station_id, previous_status in queryset.order_by()
+            .select_for_update()
+            .values_list("pk", "station_id", "status")
+        }
+        changed = [pk for pk, (_, previous) in current.items() if previous != status]
+        if changed:
+            Charger.objects.filter(pk__in=changed).update(
+                status=status, updated_at=timezone.now()
+            )
+            availability.refresh_stations({current[pk][0] for pk in changed})
+            events.publish_status_changes(
+                (pk, current[pk][0], status, current[pk][1]) for pk in changed
+            )
+    return {pk: previous for pk, (_, previous) in current.items()}
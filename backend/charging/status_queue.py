@@ -0,0 +1,251 @@
+"""Consumer for the charger status-change queue.
+
+``create_order`` publishes ``{"order_id": <charger id>, "status": ...,
+"timestamp": ...}`` to ``order-status-change-queue`` for every order. The
+``consume_status_changes`` worker long-polls it for full batches, applies
+each batch with one ``set_charger_status`` call per target status and
+acknowledges the batch with a single ``DeleteMessageBatch``.
+
+SQS does not keep order and a backlog can build up, so a message older than
+``FRESH`` is only applied if the charger has not been updated since it was
+sent; otherwise a late "charging" could undo the release of a session that
+has already expired. Younger messages are always applied: no session is
+shorter than a minute, so nothing they could undo has happened yet (and the
+check would wrongly skip them after the worker's own update of the same
+charger). Malformed and stale messages are acknowledged and dropped; if
+applying a batch fails nothing is deleted and the messages come back after
+the visibility timeout.
+
+The client is anything with the boto3 SQS ``receive_message`` /
+``delete_message_batch`` methods, chosen by ``STATUS_QUEUE_CLIENT``;
+``LocalQueue`` is an in-process stand-in for development and tests.
+"""
+
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Charger
+from .status import set_charger_status
+
+logger = logging.getLogger(__name__)
+
+# SQS limits
+MAX_BATCH_SIZE = 10
+MAX_WAIT_SECONDS = 20
+STATUSES = {status for status, _ in Charger.STATUS_CHOICES}
+# shortest session schedule_expiry accepts
+FRESH = timedelta(minutes=1)
+
+
+def sqs_client():
+    import boto3
+
+    return boto3.client("sqs")
+
+
+def get_client():
+    return import_string(settings.STATUS_QUEUE_CLIENT)()
+
+
+class LocalQueue:
+    """In-process stand-in for the SQS client (one queue, any URL)"""
+
+    def __init__(self, visibility_timeout=30):
+        self.visibility_timeout = visibility_timeout
+        self.messages = deque()
+        self.in_flight = {}
+        self.condition = threading.Condition()
+
+    def send_message(self, QueueUrl, MessageBody, MessageAttributes=None, **kwargs):
+        message_id = str(uuid.uuid4())
+        with self.condition:
+            self.messages.append(
+                {
+                    "MessageId": message_id,
+                    "Body": MessageBody,
+                    "MessageAttributes": MessageAttributes or {},
+                    "Attributes": {"SentTimestamp": str(int(time.time() * 1000))},
+                }
+            )
+            self.condition.notify_all()
+        return {"MessageId": message_id}
+
+    def receive_message(
+        self, QueueUrl, MaxNumberOfMessages=1, WaitTimeSeconds=0, **kwargs
+    ):
+        deadline = time.monotonic() + WaitTimeSeconds
+        with self.condition:
+            self._requeue_expired()
+            while not self.messages and time.monotonic() < deadline:
+                self.condition.wait(deadline - time.monotonic())
+                self._requeue_expired()
+            batch = []
+            while self.messages and len(batch) < MaxNumberOfMessages:
+                message = dict(self.messages.popleft())
+                message["ReceiptHandle"] = str(uuid.uuid4())
+                self.in_flight[message["ReceiptHandle"]] = (
+                    time.monotonic() + self.visibility_timeout,
+                    message,
+                )
+                batch.append(message)
+        return {"Messages": batch} if batch else {}
+
+    def delete_message_batch(self, QueueUrl, Entries):
+        successful, failed = [], []
+        with self.condition:
+            for entry in Entries:
+                if self.in_flight.pop(entry["ReceiptHandle"], None):
+                    successful.append({"Id": entry["Id"]})
+                else:
+                    failed.append({"Id": entry["Id"], "Code": "ReceiptHandleIsInvalid"})
+        return {"Successful": successful, "Failed": failed}
+
+    def _requeue_expired(self):
+        now = time.monotonic()
+        for handle, (visible_at, message) in list(self.in_flight.items()):
+            if visible_at <= now:
+                del self.in_flight[handle]
+                self.messages.append(message)
+
+
+class ConsumerStats:
+    """Counters for the worker's periodic report"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.batches = 0
+        self.received = 0
+        # chargers whose status actually changed
+        self.applied = 0
+        # chargers already in the requested status
+        self.unchanged = 0
+        # stale messages and unknown chargers
+        self.skipped = 0
+        self.dropped = 0
+        self.failed = 0
+        # receive calls that raised
+        self.poll_errors = 0
+        # seconds between a message being sent and its batch being applied
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+    def as_dict(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return {
+            "batches": self.batches,
+            "received": self.received,
+            "applied": self.applied,
+            "unchanged": self.unchanged,
+            "skipped": self.skipped,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "poll_errors": self.poll_errors,
+            "messages_per_second": round(self.received / elapsed, 2),
+            "last_lag_seconds": round(self.last_lag, 3),
+            "max_lag_seconds": round(self.max_lag, 3),
+        }
+
+
+def parse_message(message):
+    """Return (charger id, status, sent at) or None if the message is unusable"""
+    try:
+        body = json.loads(message["Body"])
+        charger_id = uuid.UUID(str(body["order_id"]))
+        status = body["status"]
+    except (KeyError, TypeError, ValueError):
+        return None
+    if status not in STATUSES:
+        return None
+    sent_ms = message.get("Attributes", {}).get("SentTimestamp")
+    if sent_ms is not None:
+        sent_at = datetime.fromtimestamp(int(sent_ms) / 1000, dt_timezone.utc)
+    else:
+        sent_at = timezone.now()
+    return charger_id, status, sent_at
+
+
+class StatusChangeConsumer:
+    def __init__(self, client, queue_url, wait=MAX_WAIT_SECONDS):
+        self.client = client
+        self.queue_url = queue_url
+        self.wait = wait
+        self.stats = ConsumerStats()
+
+    def poll(self):
+        """Receive and apply one batch; returns the number of messages"""
+        response = self.client.receive_message(
+            QueueUrl=self.queue_url,
+            MaxNumberOfMessages=MAX_BATCH_SIZE,
+            WaitTimeSeconds=self.wait,
+            AttributeNames=["SentTimestamp"],
+        )
+        messages = response.get("Messages", [])
+        if not messages:
+            return 0
+        self.stats.batches += 1
+        self.stats.received += len(messages)
+        try:
+            self.apply(messages)
+        except Exception:
+            # leave the batch on the queue to be redelivered
+            self.stats.failed += len(messages)
+            logger.exception("failed to apply %d status changes", len(messages))
+            return len(messages)
+        self.acknowledge(messages)
+        return len(messages)
+
+    def apply(self, messages):
+        # latest change per charger; earlier ones in the batch are superseded
+        latest = {}
+        for message in messages:
+            parsed = parse_message(message)
+            if parsed is None:
+                self.stats.dropped += 1
+                logger.warning("dropping malformed message %s", message["MessageId"])
+                continue
+            charger_id, status, sent_at = parsed
+            if charger_id not in latest or latest[charger_id][1] <= sent_at:
+                latest[charger_id] = (status, sent_at)
+
+        now = timezone.now()
+        by_status = {}
+        for charger_id, (status, sent_at) in latest.items():
+            condition = Q(pk=charger_id)
+            if now - sent_at >= FRESH:
+                condition &= Q(updated_at__lt=sent_at)
+            by_status[status] = by_status.get(status, Q()) | condition
+        matched = changed = 0
+        for status, condition in by_status.items():
+            previous = set_charger_status(Charger.objects.filter(condition), status)
+            matched += len(previous)
+            changed += sum(1 for old in previous.values() if old != status)
+        self.stats.applied += changed
+        self.stats.unchanged += matched - changed
+        self.stats.skipped += len(latest) - matched
+
+        if latest:
+            oldest = min(sent_at for _, sent_at in latest.values())
+            self.stats.last_lag = (now - oldest).total_seconds()
+            self.stats.max_lag = max(self.stats.max_lag, self.stats.last_lag)
+
+    def acknowledge(self, messages):
+        response = self.client.delete_message_batch(
+            QueueUrl=self.queue_url,
+            Entries=[
+                {"Id": str(index), "ReceiptHandle": message["ReceiptHandle"]}
+                for index, message in enumerate(messages)
+            ],
+        )
+        for failure in response.get("Failed", []):
+            logger.warning("could not delete message: %s", failure)
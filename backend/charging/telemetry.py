@@ -0,0 +1,196 @@
+"""Meter telemetry ingestion and per-session roll-up.
+
+Chargers post their meter readings in batches. Samples are validated with
+plain Python rather than one DRF serializer per item, the referenced
+chargers and records are checked with one query each, and accepted rows are
+written with ``COPY`` on Postgres (``bulk_create`` elsewhere), so a batch
+costs a handful of statements however many samples it carries.
+"""
+
+import csv
+import io
+import uuid
+from datetime import timezone as dt_timezone
+from decimal import Decimal, InvalidOperation
+
+from django.db import connections, transaction
+from django.db.models import Max, Min, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Least
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Charger, ChargingRecord, MeterSample
+
+MAX_BATCH_SIZE = 10000
+INSERT_BATCH_SIZE = 5000
+ENERGY_PLACES = Decimal("0.001")
+POWER_PLACES = Decimal("0.01")
+MAX_ENERGY = Decimal("1e9")
+MAX_POWER = Decimal("1e5")
+MAX_SESSION_ELECTRICITY = Decimal("999.99")
+
+COPY_COLUMNS = ("charger_id", "record_id", "measured_at", "energy_kwh", "power_kw")
+
+
+def _parse_decimal(value, places, maximum):
+    if isinstance(value, bool):
+        raise ValueError(value)
+    number = Decimal(str(value)).quantize(places)
+    if not number.is_finite() or number < 0 or number >= maximum:
+        raise ValueError(value)
+    return number
+
+
+def _parse_sample(item):
+    charger = uuid.UUID(str(item["charger"]))
+    record = item.get("record")
+    record = uuid.UUID(str(record)) if record else None
+    measured_at = parse_datetime(str(item["measured_at"]))
+    if measured_at is None:
+        raise ValueError("measured_at")
+    if timezone.is_naive(measured_at):
+        measured_at = measured_at.replace(tzinfo=dt_timezone.utc)
+    energy = _parse_decimal(item["energy_kwh"], ENERGY_PLACES, MAX_ENERGY)
+    power = item.get("power_kw")
+    if power is not None:
+        power = _parse_decimal(power, POWER_PLACES, MAX_POWER)
+    return MeterSample(
+        charger_id=charger,
+        record_id=record,
+        measured_at=measured_at,
+        energy_kwh=energy,
+        power_kw=power,
+    )
+
+
+def parse_samples(items):
+    """Return (samples, errors) for a list of sample dicts
+
+    ``errors`` is a list of ``{"index", "error"}`` for rejected items.
+    """
+    samples, errors = [], []
+    for index, item in enumerate(items):
+        try:
+            samples.append((index, _parse_sample(item)))
+        except KeyError as exc:
+            errors.append({"index": index, "error": f"missing {exc.args[0]}"})
+        except (TypeError, ValueError, AttributeError, InvalidOperation):
+            errors.append({"index": index, "error": "invalid sample"})
+
+    charger_ids = {sample.charger_id for _, sample in samples}
+    record_ids = {sample.record_id for _, sample in samples if sample.record_id}
+    known_chargers = set(
+        Charger.objects.filter(pk__in=charger_ids).values_list("pk", flat=True)
+    )
+    known_records = (
+        {
+            pk: charger_id
+            for pk, charger_id in ChargingRecord.objects.filter(
+                pk__in=record_ids
+            ).values_list("pk", "charger_id")
+        }
+        if record_ids
+        else {}
+    )
+
+    accepted = []
+    seen = set()
+    for index, sample in samples:
+        reading = (sample.charger_id, sample.measured_at)
+        if sample.charger_id not in known_chargers:
+            errors.append({"index": index, "error": "unknown charger"})
+        elif sample.record_id and known_records.get(sample.record_id) != (
+            sample.charger_id
+        ):
+            errors.append({"index": index, "error": "unknown record for charger"})
+        elif reading in seen:
+            # a charger resending a reading within the batch
+            errors.append({"index": index, "error": "duplicate sample"})
+        else:
+            seen.add(reading)
+            accepted.append(sample)
+    errors.sort(key=lambda error: error["index"])
+    return accepted, errors
+
+
+def _copy_samples(connection, samples):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for sample in samples:
+        writer.writerow(
+            (
+                sample.charger_id,
+                sample.record_id or "",
+                sample.measured_at.isoformat(),
+                sample.energy_kwh,
+                "" if sample.power_kw is None else sample.power_kw,
+            )
+        )
+    buffer.seek(0)
+    table = connection.ops.quote_name(MeterSample._meta.db_table)
+    columns = ", ".join(connection.ops.quote_name(c) for c in COPY_COLUMNS)
+    # the raw psycopg2 cursor raises psycopg2 errors; map them to Django's
+    with connection.cursor() as cursor, connection.wrap_database_errors:
+        # empty unquoted CSV fields load as NULL
+        cursor.cursor.copy_expert(
+            f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer
+        )
+
+
+def store_samples(samples, using="default"):
+    """Insert parsed samples in one transaction"""
+    if not samples:
+        return 0
+    connection = connections[using]
+    with transaction.atomic(using=using):
+        if connection.vendor == "postgresql":
+            _copy_samples(connection, samples)
+        else:
+            MeterSample.objects.using(using).bulk_create(
+                samples, batch_size=INSERT_BATCH_SIZE
+            )
+    return len(samples)
+
+
+def attach_samples_to_records(samples=None):
+    """Link unassigned samples to the session running on their charger
+
+    Returns the number of samples updated.
+    """
+    if samples is None:
+        samples = MeterSample.objects.all()
+    session = (
+        ChargingRecord.objects.filter(
+            charger=OuterRef("charger"), start_time__lte=OuterRef("measured_at")
+        )
+        .filter(Q(end_time__isnull=True) | Q(end_time__gte=OuterRef("measured_at")))
+        .order_by("-start_time")
+        .values("pk")[:1]
+    )
+    return samples.filter(record__isnull=True).update(record=Subquery(session))
+
+
+def rollup_sessions(records):
+    """Set each record's electricity to the energy its meter samples span
+
+    The meter register is cumulative, so a session's energy is the last
+    reading minus the first. Records without samples are left alone.
+    Returns the number of records updated.
+    """
+    energy = (
+        MeterSample.objects.filter(record=OuterRef("pk"))
+        .order_by()
+        .values("record")
+        .annotate(
+            # clamp to what the electricity column can hold
+            energy=Least(
+                Max("energy_kwh") - Min("energy_kwh"),
+                Value(MAX_SESSION_ELECTRICITY),
+            )
+        )
+        .values("energy")
+    )
+    sampled = records.filter(meter_samples__isnull=False).values("pk")
+    return ChargingRecord.objects.filter(pk__in=sampled).update(
+        electricity=Subquery(energy), updated_at=timezone.now()
+    )
@@ -1,3 +1,1399 @@
-from django.test import TestCase
+import asyncio
+import contextlib
+import gzip
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from datetime import date, datetime, time as dt_time, timedelta
+from datetime import timezone as dt_timezone
+from decimal import ROUND_HALF_UP, Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import DatabaseError, connection, transaction
+from django.http import HttpResponse
+from django.test import (
+    AsyncClient,
+    Client,
+    RequestFactory,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+
+from rest_framework.authtoken.models import Token
+
+from . import (
+    async_views,
+    availability,
+    billing,
+    events,
+    expiry,
+    occupancy,
+    partitions,
+    rollups,
+    routers,
+    status_queue,
+    telemetry,
+    views,
+)
+from .geo import haversine
+from .management.commands import benchmark_api, check_query_plans
+from .serializers import ChargingRecordSerializer
+from .status import set_charger_status
+from .models import (
+    Charger,
+    ChargerDailyStats,
+    ChargingRecord,
+    MeterSample,
+    StaleDailyStats,
+    Station,
+    StationDailyStats,
+    Tariff,
+    TariffBand,
+    User,
+)
+
+
+class LongPollWaitTests(TestCase):
+    url = "/api/charging/status-stream/"
+
+    def test_rejects_non_finite_and_non_numeric_waits(self):
+        for wait in ("nan", "inf", "-inf", "soon"):
+            response = self.client.get(self.url, {"wait": wait})
+            self.assertEqual(response.status_code, 400, wait)
+
+    def test_negative_wait_returns_immediately(self):
+        started = time.monotonic()
+        response = self.client.get(self.url, {"wait": "-5"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["events"], [])
+        self.assertLess(time.monotonic() - started, async_views.STREAM_POLL_INTERVAL)
+
+    def test_wait_is_clamped(self):
+        request = self.client.get(self.url, {"wait": "0"}).wsgi_request
+        self.assertEqual(async_views._long_poll_wait(request), 0)
+        request.GET = request.GET.copy()
+        request.GET["wait"] = "9999"
+        self.assertEqual(
+            async_views._long_poll_wait(request), async_views.LONG_POLL_MAX_WAIT
+        )
+
+    def test_stream_never_holds_a_worker_thread(self):
+        view = resolve(self.url).func
+        self.assertTrue(asyncio.iscoroutinefunction(view))
+
+    async def test_async_stream_rejects_nan(self):
+        response = await AsyncClient().get(
+            "/api/charging/async/status-stream/", {"wait": "nan"}
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class StatusEventOrderTests(TestCase):
+    def setUp(self):
+        self.cache = events._cache()
+        self.cache.clear()
+
+    def publish(self, status):
+        events._store(self.cache, events._next_sequence(), {"status": status})
+
+    def test_reader_waits_for_an_event_still_being_written(self):
+        self.publish("charging")
+        reserved = events._next_sequence()
+        self.publish("idle")
+
+        cursor, found = events.events_since(0)
+        self.assertEqual(cursor, 1)
+        self.assertEqual([seq for seq, _ in found], [1])
+
+        events._store(self.cache, reserved, {"status": "fault"})
+        cursor, found = events.events_since(cursor)
+        self.assertEqual(cursor, 3)
+        self.assertEqual([event["status"] for _, event in found], ["fault", "idle"])
+
+    def test_reader_skips_a_gap_once_later_events_are_old(self):
+        events._next_sequence()
+        self.publish("idle")
+        self.assertEqual(events.events_since(0), (0, []))
+
+        later = time.time() + events.GAP_GRACE
+        with mock.patch("charging.events.time.time", return_value=later):
+            cursor, found = events.events_since(0)
+        self.assertEqual(cursor, 2)
+        self.assertEqual([seq for seq, _ in found], [2])
+
+
+@contextlib.contextmanager
+def shared_availability_cache():
+    """Run a worker command on a file cache, as if it were shared"""
+    with tempfile.TemporaryDirectory() as location:
+        caches = {
+            **settings.CACHES,
+            "availability": {
+                "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                "LOCATION": location,
+            },
+        }
+        with override_settings(CACHES=caches):
+            yield
+
+
+class WorkerCacheTests(TestCase):
+    def test_expiry_scheduler_refuses_a_process_local_cache(self):
+        with self.assertRaisesMessage(CommandError, "AVAILABILITY_CACHE_BACKEND"):
+            call_command("run_expiry_scheduler", "--once")
+
+    def test_status_consumer_refuses_a_process_local_cache(self):
+        with self.assertRaisesMessage(CommandError, "AVAILABILITY_CACHE_BACKEND"):
+            call_command("consume_status_changes", "--once", queue_url="local")
+
+    def test_expiry_scheduler_runs_on_a_shared_cache(self):
+        # the test's transaction would count as an obsolete connection
+        command = "charging.management.commands.run_expiry_scheduler"
+        with shared_availability_cache():
+            with mock.patch(f"{command}.close_old_connections"):
+                call_command("run_expiry_scheduler", "--once", stdout=io.StringIO())
+
+
+def status_message(charger, status, sent_at=None):
+    message = {"MessageId": str(uuid.uuid4()), "ReceiptHandle": str(uuid.uuid4())}
+    message["Body"] = json.dumps({"order_id": str(charger.pk), "status": status})
+    if sent_at is not None:
+        sent_ms = int(sent_at.timestamp() * 1000)
+        message["Attributes"] = {"SentTimestamp": str(sent_ms)}
+    return message
+
+
+class StatusChangeConsumerTests(TestCase):
+    def setUp(self):
+        self.station = Station.objects.create(name="Depot", address="1 Main St")
+        self.chargers = [
+            Charger.objects.create(
+                station=self.station, code=f"C{i}", charger_type="DC", power=60
+            )
+            for i in range(25)
+        ]
+        self.queue = status_queue.LocalQueue()
+        self.consumer = status_queue.StatusChangeConsumer(self.queue, "local", wait=0)
+
+    def send(self, charger, status):
+        self.queue.send_message(
+            QueueUrl="local",
+            MessageBody=json.dumps({"order_id": str(charger.pk), "status": status}),
+        )
+
+    def status(self, charger):
+        charger.refresh_from_db()
+        return charger.status
+
+    def test_latest_change_in_a_batch_wins(self):
+        charger = self.chargers[0]
+        now = timezone.now()
+        self.consumer.apply(
+            [
+                status_message(charger, "idle", now),
+                status_message(charger, "fault", now - timedelta(seconds=5)),
+                status_message(charger, "charging", now - timedelta(seconds=10)),
+            ]
+        )
+        self.assertEqual(self.status(charger), "idle")
+        self.assertEqual(self.consumer.stats.applied, 0)
+        self.assertEqual(self.consumer.stats.unchanged, 1)
+
+    def test_only_transitions_count_as_applied(self):
+        self.send(self.chargers[0], "charging")
+        self.send(self.chargers[1], "idle")
+        self.consumer.poll()
+        self.assertEqual(self.status(self.chargers[0]), "charging")
+        self.assertEqual(self.consumer.stats.applied, 1)
+        self.assertEqual(self.consumer.stats.unchanged, 1)
+
+    def test_stale_message_does_not_undo_a_later_update(self):
+        charger = self.chargers[0]
+        sent_at = timezone.now() - status_queue.FRESH * 2
+        self.consumer.apply([status_message(charger, "charging", sent_at)])
+        self.assertEqual(self.status(charger), "idle")
+        self.assertEqual(self.consumer.stats.skipped, 1)
+
+        Charger.objects.filter(pk=charger.pk).update(
+            updated_at=sent_at - timedelta(minutes=1)
+        )
+        self.consumer.apply([status_message(charger, "charging", sent_at)])
+        self.assertEqual(self.status(charger), "charging")
+
+    def test_batches_are_applied_and_deleted(self):
+        for charger in self.chargers:
+            self.send(charger, "charging")
+        self.queue.send_message(QueueUrl="local", MessageBody="not json")
+
+        received = []
+        with self.assertLogs("charging.status_queue", "WARNING"):
+            while True:
+                count = self.consumer.poll()
+                if not count:
+                    break
+                received.append(count)
+
+        self.assertEqual(received, [10, 10, 6])
+        self.assertEqual(self.consumer.stats.applied, 25)
+        self.assertEqual(self.consumer.stats.dropped, 1)
+        self.assertFalse(self.queue.messages or self.queue.in_flight)
+        self.assertEqual(
+            Charger.objects.filter(status="charging").count(), len(self.chargers)
+        )
+
+    def test_failed_batch_is_left_on_the_queue(self):
+        self.send(self.chargers[0], "charging")
+        failing = mock.patch(
+            "charging.status_queue.set_charger_status", side_effect=DatabaseError
+        )
+        with failing, self.assertLogs("charging.status_queue", "ERROR"):
+            self.consumer.poll()
+        self.assertEqual(self.consumer.stats.failed, 1)
+        self.assertEqual(len(self.queue.in_flight), 1)
+
+    def test_command_backs_off_when_receiving_fails(self):
+        client = mock.Mock()
+        client.receive_message.side_effect = [
+            ConnectionError,
+            ConnectionError,
+            KeyboardInterrupt,
+        ]
+        stdout = io.StringIO()
+        command = "charging.management.commands.consume_status_changes"
+        with contextlib.ExitStack() as stack:
+            stack.enter_context(shared_availability_cache())
+            stack.enter_context(
+                mock.patch(f"{command}.get_client", return_value=client)
+            )
+            stack.enter_context(mock.patch(f"{command}.close_old_connections"))
+            sleep = stack.enter_context(mock.patch(f"{command}.time.sleep"))
+            stack.enter_context(self.assertLogs(command, "ERROR"))
+            call_command("consume_status_changes", queue_url="local", stdout=stdout)
+        self.assertEqual([call.args[0] for call in sleep.call_args_list], [1, 2])
+        self.assertIn("poll_errors=2", stdout.getvalue())
+
+
+class PrimaryPinTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("driver", password="secret")
+        self.token = Token.objects.create(user=self.user)
+        station = Station.objects.create(name="Depot", address="1 Main St")
+        self.charger = Charger.objects.create(
+            station=station, code="C1", charger_type="DC", power=60
+        )
+        # every worker has to see the pins
+        stack = contextlib.ExitStack()
+        self.addCleanup(stack.close)
+        stack.enter_context(shared_availability_cache())
+
+    def reads_replica(self, **headers):
+        """Whether a GET with ``headers`` would be routed to the replica"""
+        request = RequestFactory().get("/api/charging/chargers/", headers=headers)
+        request.replica_token = None
+        with mock.patch("charging.routers.replica_configured", return_value=True):
+            middleware = routers.ReplicaRoutingMiddleware(lambda request: None)
+            middleware.process_view(
+                request, views.ChargerViewSet.as_view({"get": "list"}), (), {}
+            )
+        middleware._release(request)
+        return request.replica_token is not None
+
+    def test_token_client_is_pinned_to_the_primary_after_a_write(self):
+        authorization = f"Token {self.token.key}"
+        self.assertTrue(self.reads_replica(authorization=authorization))
+
+        response = self.client.patch(
+            f"/api/charging/chargers/{self.charger.pk}/",
+            {"firmware_version": "2.1"},
+            content_type="application/json",
+            headers={"authorization": authorization},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(routers.PIN_COOKIE, response.cookies)
+
+        self.assertFalse(self.reads_replica(authorization=authorization))
+        other = Token.objects.create(user=User.objects.create_user("other"))
+        self.assertTrue(self.reads_replica(authorization=f"Token {other.key}"))
+
+    def test_anonymous_client_is_pinned_by_cookie(self):
+        response = self.client.patch(
+            f"/api/charging/chargers/{self.charger.pk}/",
+            {"firmware_version": "2.1"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(routers.PIN_COOKIE, response.cookies)
+
+    async def test_async_write_pins_the_token_client(self):
+        async def created(request):
+            return HttpResponse(status=201)
+
+        middleware = routers.ReplicaRoutingMiddleware(created)
+        request = RequestFactory().post("/", headers={"authorization": "Token abc"})
+        await middleware(request)
+        self.assertFalse(self.reads_replica(authorization="Token abc"))
+
+    def test_reads_stay_on_the_primary_without_a_shared_cache(self):
+        local = {
+            **settings.CACHES,
+            "availability": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache"
+            },
+        }
+        with override_settings(CACHES=local):
+            with self.assertLogs("charging.routers", "WARNING"):
+                self.assertFalse(self.reads_replica())
+        self.assertTrue(self.reads_replica())
+
+
+class QueryPlanCheckTests(TestCase):
+    table = ChargingRecord._meta.db_table
+
+    def uses_seq_scan(self, plan):
+        return check_query_plans.Command().uses_seq_scan(plan, self.table)
+
+    @skipUnless(connection.vendor == "postgresql", "PostgreSQL plans")
+    def test_seq_scan_of_a_partition_is_reported(self):
+        plan = (
+            "Limit  (cost=0.00..1.23 rows=10 width=96)\n"
+            "  ->  Append  (cost=0.00..24.60 rows=200 width=96)\n"
+            f"        ->  Seq Scan on {self.table}_p2025_01 {self.table}_1\n"
+            f"        ->  Index Scan using {self.table}_default_pkey"
+            f" on {self.table}_default {self.table}_2\n"
+        )
+        self.assertTrue(self.uses_seq_scan(plan))
+        self.assertTrue(self.uses_seq_scan(f"Seq Scan on {self.table}_default"))
+
+    @skipUnless(connection.vendor == "postgresql", "PostgreSQL plans")
+    def test_index_scans_of_partitions_pass(self):
+        plan = (
+            "Append  (cost=0.15..16.40 rows=4 width=96)\n"
+            f"  ->  Index Scan using {self.table}_p2025_01_pkey"
+            f" on {self.table}_p2025_01 {self.table}_1\n"
+            f"  ->  Bitmap Heap Scan on {self.table}_default {self.table}_2\n"
+            f"  ->  Seq Scan on {self.table}_archive\n"
+        )
+        self.assertFalse(self.uses_seq_scan(plan))
+
+
+class DailyStatsTests(TestCase):
+    def setUp(self):
+        self.station = Station.objects.create(name="Depot", address="1 Main St")
+        self.charger = Charger.objects.create(
+            station=self.station, code="C1", charger_type="DC", power=60
+        )
+
+    def record(self, start, end):
+        return ChargingRecord.objects.create(
+            charger=self.charger,
+            start_time=start,
+            end_time=end,
+            electricity=Decimal("10"),
+            fee=Decimal("5"),
+        )
+
+    def test_busy_minutes_are_split_at_midnight(self):
+        self.record(
+            datetime(2025, 1, 10, 23, 0, tzinfo=dt_timezone.utc),
+            datetime(2025, 1, 11, 1, 30, tzinfo=dt_timezone.utc),
+        )
+        rollups.update_daily_stats()
+
+        rows = {
+            row.date: row
+            for row in ChargerDailyStats.objects.filter(charger=self.charger)
+        }
+        self.assertEqual(sorted(rows), [date(2025, 1, 10), date(2025, 1, 11)])
+        self.assertEqual(rows[date(2025, 1, 10)].busy_minutes, 60)
+        self.assertEqual(rows[date(2025, 1, 10)].sessions, 1)
+        self.assertEqual(rows[date(2025, 1, 11)].busy_minutes, 90)
+        self.assertEqual(rows[date(2025, 1, 11)].sessions, 0)
+
+    def test_summary_capacity_covers_the_requested_days(self):
+        self.record(
+            datetime(2025, 1, 10, 10, 0, tzinfo=dt_timezone.utc),
+            datetime(2025, 1, 10, 22, 0, tzinfo=dt_timezone.utc),
+        )
+        rollups.update_daily_stats()
+
+        response = self.client.get(
+            "/api/charging/station-stats/summary/",
+            {"date_after": "2025-01-09", "date_before": "2025-01-12"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["days"]), 1)
+        # 12 busy hours over 4 days of one charger
+        self.assertEqual(response.json()["totals"]["utilisation"], 0.125)
+
+    def stats_days(self):
+        return {
+            row.date: row.sessions
+            for row in ChargerDailyStats.objects.filter(charger=self.charger)
+        }
+
+    def test_deleted_session_clears_every_day_it_spanned(self):
+        record = self.record(
+            datetime(2025, 1, 10, 23, 0, tzinfo=dt_timezone.utc),
+            datetime(2025, 1, 11, 1, 30, tzinfo=dt_timezone.utc),
+        )
+        rollups.update_daily_stats()
+        self.assertEqual(len(self.stats_days()), 2)
+
+        ChargingRecord.objects.filter(pk=record.pk).delete()
+        rollups.update_daily_stats()
+        self.assertEqual(self.stats_days(), {})
+        self.assertFalse(StationDailyStats.objects.exists())
+        self.assertFalse(StaleDailyStats.objects.exists())
+
+    def test_moved_session_leaves_its_old_day(self):
+        record = self.record(
+            datetime(2025, 1, 10, 10, 0, tzinfo=dt_timezone.utc),
+            datetime(2025, 1, 10, 11, 0, tzinfo=dt_timezone.utc),
+        )
+        rollups.update_daily_stats()
+
+        record = ChargingRecord.objects.get(pk=record.pk)
+        record.start_time += timedelta(days=2)
+        record.end_time += timedelta(days=2)
+        record.save()
+        rollups.update_daily_stats()
+        self.assertEqual(self.stats_days(), {date(2025, 1, 12): 1})
+
+    def test_completing_a_session_marks_no_stale_day(self):
+        record = self.record(datetime(2025, 1, 10, 10, 0, tzinfo=dt_timezone.utc), None)
+        record.end_time = datetime(2025, 1, 10, 11, 0, tzinfo=dt_timezone.utc)
+        record.save()
+        self.assertFalse(StaleDailyStats.objects.exists())
+
+
+class QueryBudgetTests(TestCase):
+    def query_counts(self):
+        """Queries per benchmarked endpoint on a cold availability cache"""
+        counts = {}
+        for name, url in benchmark_api.Command().endpoints().items():
+            caches["availability"].clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, name)
+            counts[name] = len(queries)
+        return counts
+
+    def seed(self, **options):
+        call_command("seed_fleet", flush=True, stdout=io.StringIO(), **options)
+        # the filtered lists should return rows, not empty pages
+        Charger.objects.update(status="idle")
+        charger = Charger.objects.order_by().first()
+        ChargingRecord.objects.update(charger=charger)
+
+    def test_query_counts_do_not_grow_with_page_size(self):
+        # pages of one or two rows, then full pages of ten
+        self.seed(stations=1, chargers_per_station=2, records=2, users=2)
+        small = self.query_counts()
+        self.seed(stations=12, chargers_per_station=3, records=60, users=5)
+        full = self.query_counts()
+
+        self.assertEqual(small, full)
+        for name, count in full.items():
+            self.assertLessEqual(count, benchmark_api.QUERY_BUDGETS[name], name)
+
+
+class RecordETagTests(TestCase):
+    def setUp(self):
+        station = Station.objects.create(name="Depot", address="1 Main St")
+        self.charger = Charger.objects.create(
+            station=station, code="C1", charger_type="DC", power=60
+        )
+        self.user = User.objects.create_user("driver")
+        self.record = ChargingRecord.objects.create(
+            charger=self.charger, user=self.user, start_time=timezone.now()
+        )
+
+    def assertStale(self, url, change):
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(
+            self.client.get(url, headers={"if-none-match": etag}).status_code, 304
+        )
+        change()
+        response = self.client.get(url, headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def rename_charger(self):
+        self.charger.code = "C1-renamed"
+        self.charger.save()
+
+    def rename_user(self):
+        self.user.username = "driver-renamed"
+        self.user.save()
+
+    def test_list_etag_covers_charger_codes_and_usernames(self):
+        url = "/api/charging/records/"
+        self.assertStale(url, self.rename_charger)
+        self.assertStale(url, self.rename_user)
+
+    def test_detail_etag_covers_charger_codes_and_usernames(self):
+        url = f"/api/charging/records/{self.record.pk}/"
+        self.assertStale(url, self.rename_charger)
+        self.assertStale(url, self.rename_user)
+        self.assertEqual(self.client.get(url).json()["user_username"], "driver-renamed")
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        self.station = Station.objects.create(name="Depot", address="1 Main St")
+        other = Station.objects.create(name="Harbour", address="2 Quay Rd")
+        for number in range(12):
+            Charger.objects.create(
+                station=self.station if number % 3 else other,
+                code=f"C{number}",
+                charger_type="DC" if number % 2 else "AC",
+                power=60,
+                status="charging" if number % 4 == 0 else "idle",
+            )
+
+    def assertSameResponse(self, path, params=None):
+        sync = self.client.get(f"/api/charging/{path}", params)
+        asynchronous = self.client.get(f"/api/charging/async/{path}", params)
+        self.assertEqual(asynchronous.status_code, sync.status_code, (path, params))
+        body = asynchronous.content.decode().replace(
+            "/api/charging/async/", "/api/charging/"
+        )
+        self.assertEqual(json.loads(body), sync.json(), (path, params))
+        return sync
+
+    def test_lists_match_the_viewsets(self):
+        for params in (
+            None,
+            {"page": 2},
+            {"page": "last"},
+            {"status": "idle"},
+            {"station": str(self.station.pk), "charger_type": "DC"},
+            {"search": "Harbour"},
+        ):
+            self.assertEqual(
+                self.assertSameResponse("chargers/", params).status_code, 200
+            )
+        for params in (None, {"charger_status": "idle"}, {"search": "Depot"}):
+            self.assertEqual(
+                self.assertSameResponse("stations/", params).status_code, 200
+            )
+
+    def test_details_match_the_viewsets(self):
+        charger = Charger.objects.first()
+        self.assertSameResponse(f"chargers/{charger.pk}/")
+        self.assertSameResponse(f"stations/{self.station.pk}/")
+        self.assertSameResponse(
+            f"stations/{self.station.pk}/", {"charger_status": "idle"}
+        )
+
+    def test_errors_match_the_viewsets(self):
+        cases = [
+            ("chargers/", {"station": "not-a-uuid"}, 400),
+            ("chargers/", {"status": "exploded"}, 400),
+            ("chargers/", {"page": 9}, 404),
+            ("stations/", {"page": "first"}, 404),
+            (f"chargers/{uuid.uuid4()}/", None, 404),
+            ("stations/not-a-uuid/", None, 404),
+        ]
+        with self.assertLogs("django.request", "WARNING"):
+            for path, params, status in cases:
+                response = self.assertSameResponse(path, params)
+                self.assertEqual(response.status_code, status, (path, params))
+
+    def test_etag_follows_the_rows_on_the_page(self):
+        for url in ("/api/charging/chargers/", "/api/charging/async/chargers/"):
+            response = self.client.get(url)
+            etag = response["ETag"]
+            charger = Charger.objects.get(pk=response.json()["results"][0]["id"])
+            response = self.client.get(url, headers={"if-none-match": etag})
+            self.assertEqual(response.status_code, 304, url)
+            charger.status = "maintenance" if charger.status == "idle" else "idle"
+            charger.save()
+            response = self.client.get(url, headers={"if-none-match": etag})
+            self.assertEqual(response.status_code, 200, url)
+
+
+class KeysetPaginationTests(TestCase):
+    url = "/api/charging/records/"
+
+    def setUp(self):
+        station = Station.objects.create(name="Depot", address="1 Main St")
+        charger = Charger.objects.create(
+            station=station, code="C1", charger_type="DC", power=60
+        )
+        user = User.objects.create_user("driver")
+        start = timezone.now().replace(microsecond=0)
+        # five sessions share a start time, so pages split on the id tiebreak
+        times = [start] * 5 + [start - timedelta(hours=hours) for hours in (1, 2, 3)]
+        for start_time in times:
+            ChargingRecord.objects.create(
+                charger=charger, user=user, start_time=start_time
+            )
+        self.expected = [
+            str(pk)
+            for pk in ChargingRecord.objects.order_by("-start_time", "-id").values_list(
+                "pk", flat=True
+            )
+        ]
+
+    def walk(self, url, direction):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([record["id"] for record in response.json()["results"]])
+            url = response.json()[direction]
+        return pages
+
+    def test_cursor_pages_round_trip_across_ties(self):
+        pages = self.walk(f"{self.url}?cursor=&page_size=3", "next")
+        self.assertEqual([len(page) for page in pages], [3, 3, 2])
+        self.assertEqual(sum(pages, []), self.expected)
+
+        last = self.client.get(f"{self.url}?cursor=&page_size=3").json()
+        while last["next"]:
+            last = self.client.get(last["next"]).json()
+        backwards = self.walk(last["previous"], "previous")
+        self.assertEqual(backwards, pages[-2::-1])
+
+    def test_invalid_cursor_is_not_found(self):
+        with self.assertLogs("django.request", "WARNING"):
+            for cursor in ("not-base64!", "e30=", "eyJ2IjogIm5vdyIsICJpZCI6ICIxIn0="):
+                response = self.client.get(self.url, {"cursor": cursor})
+                self.assertEqual(response.status_code, 404, cursor)
+
+    def test_ordering_cannot_be_combined_with_a_cursor(self):
+        with self.assertLogs("django.request", "WARNING"):
+            response = self.client.get(self.url, {"cursor": "", "ordering": "fee"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("ordering", response.json())
+        self.assertEqual(
+            self.client.get(self.url, {"ordering": "fee"}).status_code, 200
+        )
+
+
+@skipUnless(connection.vendor == "postgresql", "record partitions need PostgreSQL")
+class RecordPartitionTests(TestCase):
+    command = "charging.management.commands.manage_record_partitions"
+
+    def setUp(self):
+        station = Station.objects.create(name="Depot", address="1 Main St")
+        self.charger = Charger.objects.create(
+            station=station, code="C1", charger_type="DC", power=60
+        )
+
+    def partitions(self, *args):
+        call_command("manage_record_partitions", *args, stdout=io.StringIO())
+        with connection.cursor() as cursor:
+            return partitions.list_partitions(cursor), partitions.months_in_default(
+                cursor
+            )
+
+    def test_months_follow_utc(self):
+        # still January in UTC, already February east of Greenwich
+        now = datetime(2031, 1, 31, 23, 30, tzinfo=dt_timezone.utc)
+        with mock.patch(f"{self.command}.timezone.now", return_value=now):
+            months, _ = self.partitions("--ahead", "0")
+        self.assertIn(date(2031, 1, 1), months)
+        self.assertNotIn(date(2031, 2, 1), months)
+
+    def test_old_rows_are_moved_out_of_the_default_partition_and_archived(self):
+        record = ChargingRecord.objects.create(
+            charger=self.charger,
+            start_time=datetime(2019, 3, 31, 23, 30, tzinfo=dt_timezone.utc),
+        )
+        with connection.cursor() as cursor:
+            self.assertEqual(partitions.months_in_default(cursor), [date(2019, 3, 1)])
+            # run the deferred foreign key checks a commit would, or Postgres
+            # refuses to drop the partition holding the row
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+        months, in_default = self.partitions()
+        self.assertIn(date(2019, 3, 1), months)
+        self.assertEqual(in_default, [])
+        self.assertTrue(ChargingRecord.objects.filter(pk=record.pk).exists())
+
+        with tempfile.TemporaryDirectory() as directory:
+            months, _ = self.partitions("--retain", "1", "--archive-dir", directory)
+            path = os.path.join(directory, f"{partitions.TABLE}_p2019_03.csv.gz")
+            with gzip.open(path, "rt") as archive:
+                lines = archive.read().splitlines()
+        self.assertNotIn(date(2019, 3, 1), months)
+        self.assertEqual(len(lines), 2)
+        self.assertIn(str(record.pk), lines[1])
+        self.assertFalse(ChargingRecord.objects.filter(pk=record.pk).exists())
+
+
+class ExpireSessionTests(TestCase):
+    def setUp(self):
+        station = Station.objects.create(name="Depot", address="1 Main St")
+        self.charger = Charger.objects.create(
+            station=station, code="C1", charger_type="DC", power=60, status="charging"
+        )
+
+    def record(self, hours_ago):
+        return ChargingRecord.objects.create(
+            charger=self.charger,
+            start_time=timezone.now() - timedelta(hours=hours_ago),
+        )
+
+    def test_only_the_current_session_is_completed(self):
+        earlier = self.record(hours_ago=30)
+        current = self.record(hours_ago=1)
+        response = self.client.post(
+            f"/api/charging/chargers/{self.charger.pk}/expire_session/"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["released"], [str(current.pk)])
+
+        current.refresh_from_db()
+        self.assertEqual(current.status, "completed")
+        self.assertIsNotNone(current.end_time)
+        self.assertIsNone(current.expires_at)
+        earlier.refresh_from_db()
+        self.assertIsNone(earlier.end_time)
+        self.charger.refresh_from_db()
+        self.assertEqual(self.charger.status, "idle")
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    def setUp(self):
+        station = Station.objects.create(name="Depot", address="1 Main St")
+        self.charger = Charger.objects.create(
+            station=station, code="C1", charger_type="DC", power=60
+        )
+
+    def test_only_one_of_two_simultaneous_bookings_wins(self):
+        # both requests see the charger idle before either claims it
+        barrier = threading.Barrier(2, timeout=10)
+        validate = ChargingRecordSerializer.validate_charger
+
+        def validate_then_wait(serializer, charger):
+            charger = validate(serializer, charger)
+            barrier.wait()
+            return charger
+
+        statuses = []
+
+        def book():
+            try:
+                response = Client().post(
+                    "/api/charging/records/",
+                    {"charger": str(self.charger.pk), "start_time": timezone.now()},
+                    content_type="application/json",
+                )
+                statuses.append(response.status_code)
+            finally:
+                connection.close()
+
+        with mock.patch.object(
+            ChargingRecordSerializer, "validate_charger", validate_then_wait
+        ):
+            with self.assertLogs("django.request", "WARNING"):
+                threads = [threading.Thread(target=book) for _ in range(2)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+
+        self.assertEqual(sorted(statuses), [201, 400])
+        self.assertEqual(ChargingRecord.objects.count(), 1)
+        self.charger.refresh_from_db()
+        self.assertEqual(self.charger.status, "charging")
+
+
+class BulkStatusTests(TestCase):
+    url = "/api/charging/chargers/bulk_status/"
+
+    def setUp(self):
+        self.station = Station.objects.create(name="Depot", address="1 Main St")
+        other = Station.objects.create(name="Harbour", address="2 Quay Rd")
+        self.idle = [
+            Charger.objects.create(
+                station=self.station, code=f"C{number}", charger_type="DC", power=60
+            )
+            for number in range(3)
+        ]
+        self.busy = Charger.objects.create(
+            station=self.station,
+            code="C3",
+            charger_type="AC",
+            power=22,
+            status="charging",
+        )
+        self.elsewhere = Charger.objects.create(
+            station=other, code="H1", charger_type="DC", power=60
+        )
+
+    def post(self, body):
+        return self.client.post(self.url, body, content_type="application/json")
+
+    def statuses(self):
+        return dict(Charger.objects.values_list("code", "status"))
+
+    def test_results_follow_the_request_with_unknown_ids_last(self):
+        unknown = str(uuid.uuid4())
+        requested = [self.busy.pk, unknown, self.idle[0].pk, self.idle[0].pk]
+        response = self.post(
+            {"status": "idle", "chargers": [str(pk) for pk in requested]}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(),
+            {
+                "status": "idle",
+                "updated": 1,
+                "results": [
+                    {
+                        "id": str(self.busy.pk),
+                        "previous_status": "charging",
+                        "result": "updated",
+                    },
+                    {
+                        "id": str(self.idle[0].pk),
+                        "previous_status": "idle",
+                        "result": "unchanged",
+                    },
+                    {"id": unknown, "previous_status": None, "result": "not_found"},
+                ],
+            },
+        )
+        self.assertEqual(self.statuses()["C3"], "idle")
+
+    def test_station_filters_select_the_chargers(self):
+        response = self.post(
+            {
+                "status": "maintenance",
+                "station": str(self.station.pk),
+                "current_status": "idle",
+                "charger_type": "DC",
+            }
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["updated"], 3)
+        self.assertEqual(
+            self.statuses(),
+            {
+                "C0": "maintenance",
+                "C1": "maintenance",
+                "C2": "maintenance",
+                "C3": "charging",
+                "H1": "idle",
+            },
+        )
+
+    def test_chargers_change_with_a_single_update(self):
+        chargers = [str(charger.pk) for charger in (*self.idle, self.busy)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post({"status": "fault", "chargers": chargers})
+        self.assertEqual(response.json()["updated"], 4)
+        updates = [
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith('UPDATE "charging_charger"')
+        ]
+        self.assertEqual(len(updates), 1)
+
+    def test_invalid_requests_change_nothing(self):
+        charger = str(self.idle[0].pk)
+        bodies = [
+            {"status": "exploded", "chargers": [charger]},
+            {"status": "idle"},
+            {"status": "idle", "chargers": [charger], "station": str(self.station.pk)},
+            {"status": "idle", "chargers": ["not-a-uuid"]},
+            {"status": "idle", "chargers": [charger] * 1001},
+            {
+                "status": "idle",
+                "station": str(self.station.pk),
+                "current_status": "asleep",
+            },
+        ]
+        before = self.statuses()
+        with self.assertLogs("django.request", "WARNING"):
+            for body in bodies:
+                self.assertEqual(self.post(body).status_code, 400, body)
+        self.assertEqual(self.statuses(), before)
+
+
+class MeterSampleIngestionTests(TestCase):
+    url = "/api/charging/meter-samples/"
+
+    def setUp(self):
+        station = Station.objects.create(name="Depot", address="1 Main St")
+        self.charger = Charger.objects.create(
+            station=station, code="C1", charger_type="DC", power=60
+        )
+        other = Charger.objects.create(
+            station=station, code="C2", charger_type="DC", power=60
+        )
+        self.record = ChargingRecord.objects.create(
+            charger=self.charger, start_time=timezone.now()
+        )
+        self.other_record = ChargingRecord.objects.create(
+            charger=other, start_time=timezone.now()
+        )
+
+    def sample(self, minute=0, **fields):
+        return {
+            "charger": str(self.charger.pk),
+            "measured_at": f"2025-01-10T10:{minute:02d}:00Z",
+            "energy_kwh": "10.5",
+            **fields,
+        }
+
+    def test_malformed_and_duplicate_samples_are_reported_not_stored(self):
+        samples = [
+            self.sample(0, record=str(self.record.pk), power_kw=50),
+            self.sample(1, energy_kwh="-1"),
+            self.sample(2, energy_kwh=True),
+            self.sample(3, energy_kwh="NaN"),
+            self.sample(4, measured_at="yesterday"),
+            {"charger": str(self.charger.pk), "energy_kwh": "1"},
+            self.sample(5, charger="not-a-uuid"),
+            self.sample(6, charger=str(uuid.uuid4())),
+            self.sample(7, record=str(self.other_record.pk)),
+            self.sample(0, energy_kwh="10.6"),
+            # naive timestamps are taken as UTC
+            self.sample(measured_at="2025-01-10T10:08:00"),
+        ]
+        response = self.client.post(
+            self.url, {"samples": samples}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["accepted"], 2)
+        self.assertEqual(
+            [(error["index"], error["error"]) for error in response.json()["rejected"]],
+            [
+                (1, "invalid sample"),
+                (2, "invalid sample"),
+                (3, "invalid sample"),
+                (4, "invalid sample"),
+                (5, "missing measured_at"),
+                (6, "invalid sample"),
+                (7, "unknown charger"),
+                (8, "unknown record for charger"),
+                (9, "duplicate sample"),
+            ],
+        )
+        stored = MeterSample.objects.order_by("measured_at")
+        self.assertEqual(
+            [(sample.measured_at.minute, sample.record_id) for sample in stored],
+            [(0, self.record.pk), (8, None)],
+        )
+        self.assertEqual(stored[0].energy_kwh, Decimal("10.5"))
+        self.assertEqual(stored[0].power_kw, Decimal("50"))
+
+    def test_oversized_batches_are_refused(self):
+        samples = [self.sample()] * (telemetry.MAX_BATCH_SIZE + 1)
+        with self.assertLogs("django.request", "WARNING"):
+            response = self.client.post(
+                self.url, {"samples": samples}, content_type="application/json"
+            )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(MeterSample.objects.exists())
+
+    def test_a_failed_insert_stores_nothing(self):
+        samples, _ = telemetry.parse_samples(
+            [self.sample(minute) for minute in range(3)]
+        )
+        # too large for the column: the database rejects the last row
+        samples[-1].energy_kwh = Decimal("1e12")
+        with self.assertRaises(DatabaseError):
+            telemetry.store_samples(samples)
+        self.assertFalse(MeterSample.objects.exists())
+
+
+def scalar_fee(tariffs, record):
+    """Price one session minute by minute, as a reference for ``billing``"""
+    charger = record.charger
+    if record.end_time is None or record.electricity is None:
+        return None
+    candidates = [
+        tariff
+        for tariff in tariffs
+        if tariff.valid_from <= record.start_time
+        and (tariff.valid_to is None or record.start_time < tariff.valid_to)
+        and tariff.station_id in (None, charger.station_id)
+        and tariff.charger_type in ("", charger.charger_type)
+    ]
+    if not candidates:
+        return None
+    tariff = max(
+        candidates,
+        key=lambda t: (t.station_id is not None, bool(t.charger_type), t.valid_from),
+    )
+
+    def rate_at(moment):
+        local = timezone.localtime(moment).time()
+        for band in tariff.bands.all():
+            if band.start_time < band.end_time:
+                inside = band.start_time <= local < band.end_time
+            else:
+                inside = local >= band.start_time or local < band.end_time
+            if inside:
+                return band.energy_rate
+        return tariff.energy_rate
+
+    minutes = int((record.end_time - record.start_time).total_seconds() // 60)
+    per_minute = record.electricity / minutes
+    fee = tariff.session_fee + sum(
+        per_minute * rate_at(record.start_time + timedelta(minutes=minute))
+        for minute in range(minutes)
+    )
+    charging_minutes = record.electricity / charger.power * 60
+    idle_minutes = minutes - charging_minutes - tariff.idle_grace_minutes
+    fee += max(idle_minutes, 0) * tariff.idle_rate
+    return fee.quantize(Decimal("0.01"), ROUND_HALF_UP)
+
+
+# no DST, so local time is a fixed offset from UTC
+@override_settings(TIME_ZONE="Asia/Kolkata")
+class RepricingTests(TestCase):
+    def setUp(self):
+        self.station = Station.objects.create(name="Depot", address="1 Main St")
+        self.ac = Charger.objects.create(
+            station=self.station, code="AC1", charger_type="AC", power=22
+        )
+        self.dc = Charger.objects.create(
+            station=self.station, code="DC1", charger_type="DC", power=60
+        )
+        network = Tariff.objects.create(
+            name="Network",
+            energy_rate=Decimal("0.30"),
+            session_fee=Decimal("1.00"),
+            valid_from=self.at(2025, 1, 1, 0, 0),
+            valid_to=self.at(2025, 2, 1, 0, 0),
+        )
+        TariffBand.objects.create(
+            tariff=network,
+            start_time=dt_time(17),
+            end_time=dt_time(20),
+            energy_rate=Decimal("0.50"),
+        )
+        TariffBand.objects.create(
+            tariff=network,
+            start_time=dt_time(23),
+            end_time=dt_time(7),
+            energy_rate=Decimal("0.15"),
+        )
+        Tariff.objects.create(
+            name="Depot DC",
+            station=self.station,
+            charger_type="DC",
+            energy_rate=Decimal("0.40"),
+            idle_rate=Decimal("0.10"),
+            idle_grace_minutes=10,
+            valid_from=self.at(2025, 1, 1, 0, 0),
+            valid_to=self.at(2025, 2, 1, 0, 0),
+        )
+        Tariff.objects.create(
+            name="Network 2025-02",
+            energy_rate=Decimal("0.35"),
+            valid_from=self.at(2025, 2, 1, 0, 0),
+        )
+
+    def at(self, *fields):
+        return timezone.make_aware(datetime(*fields))
+
+    def record(self, charger, start, minutes, kwh):
+        return ChargingRecord.objects.create(
+            charger=charger,
+            start_time=start,
+            end_time=None if minutes is None else start + timedelta(minutes=minutes),
+            electricity=None if kwh is None else Decimal(kwh),
+        )
+
+    def test_vectorised_fees_match_the_scalar_reference(self):
+        priceable = [
+            # across the start and end of the evening band
+            self.record(self.ac, self.at(2025, 1, 10, 16, 30), 240, "20"),
+            # overnight, in the band that wraps past midnight
+            self.record(self.ac, self.at(2025, 1, 10, 22, 0), 600, "40.5"),
+            # the station's DC tariff, with 40 idle minutes after the grace
+            self.record(self.dc, self.at(2025, 1, 11, 9, 0), 60, "10"),
+            # the last minute of the January tariffs
+            self.record(self.dc, self.at(2025, 1, 31, 23, 59), 30, "5"),
+            # the first minute of the February tariff
+            self.record(self.ac, self.at(2025, 2, 1, 0, 0), 45, "7.25"),
+        ]
+        unpriceable = [
+            self.record(self.ac, self.at(2025, 1, 12, 10, 0), None, "3"),
+            self.record(self.ac, self.at(2025, 1, 12, 12, 0), 30, None),
+            self.record(self.ac, self.at(2024, 12, 31, 23, 0), 30, "3"),
+        ]
+
+        self.assertEqual(billing.reprice(ChargingRecord.objects.all()), (5, 3))
+
+        tariffs = list(Tariff.objects.prefetch_related("bands"))
+        for record in priceable:
+            record.refresh_from_db()
+            expected = scalar_fee(tariffs, record)
+            self.assertIsNotNone(expected)
+            self.assertEqual(record.fee, expected, record.start_time)
+        for record in unpriceable:
+            record.refresh_from_db()
+            self.assertIsNone(record.fee)
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=dt_timezone.utc).timestamp()
+
+
+@override_settings(TIME_ZONE="Europe/Dublin")
+class OccupancyTests(TestCase):
+    def busy(self, *sessions):
+        """Busy seconds per local hour for one charger's (start, end) sessions"""
+        start = np.array([session[0] for session in sessions])
+        end = np.array([session[1] for session in sessions])
+        return occupancy.hourly_busy_seconds(
+            np.zeros(len(sessions), dtype=np.int64), start, end, 1
+        )[0]
+
+    def assertHours(self, busy, expected):
+        self.assertEqual(
+            {hour: seconds for hour, seconds in enumerate(busy) if seconds}, expected
+        )
+
+    def test_busy_seconds_across_midnight(self):
+        # 23:30 to 00:30 GMT, then a whole day plus an hour
+        busy = self.busy(
+            (utc(2025, 1, 10, 23, 30), utc(2025, 1, 11, 0, 30)),
+            (utc(2025, 1, 12, 10, 0), utc(2025, 1, 13, 11, 0)),
+        )
+        expected = {hour: 3600 for hour in range(24)}
+        expected.update({23: 3600 + 1800, 0: 3600 + 1800, 10: 7200})
+        self.assertHours(busy, expected)
+
+    def test_busy_seconds_across_the_spring_forward(self):
+        # 00:30 GMT to 02:30 IST is an hour; local 01:00-02:00 never happens
+        busy = self.busy((utc(2025, 3, 30, 0, 30), utc(2025, 3, 30, 1, 30)))
+        self.assertHours(busy, {0: 1800, 2: 1800})
+
+    def test_busy_seconds_across_the_fall_back(self):
+        # 01:30 IST to 01:30 GMT is an hour, all of it in local hour 1
+        busy = self.busy((utc(2025, 10, 26, 0, 30), utc(2025, 10, 26, 1, 30)))
+        self.assertHours(busy, {1: 3600})
+
+    def test_capacity_on_dst_days(self):
+        capacity = occupancy.hourly_capacity(
+            *occupancy.day_range(date(2025, 3, 30), date(2025, 3, 30))
+        )
+        self.assertEqual(capacity.sum(), 23 * 3600)
+        self.assertEqual(capacity[1], 0)
+        capacity = occupancy.hourly_capacity(
+            *occupancy.day_range(date(2025, 10, 26), date(2025, 10, 26))
+        )
+        self.assertEqual(capacity.sum(), 25 * 3600)
+        self.assertEqual(capacity[1], 7200)
+
+    def test_peak_concurrency_per_group(self):
+        group = np.array([0, 0, 0, 0, 2])
+        start = np.array([100.0, 150.0, 200.0, 300.0, 50.0])
+        end = np.array([200.0, 300.0, 250.0, 400.0, 60.0])
+        peak, peak_at = occupancy.peak_concurrency(group, start, end, 3)
+        # a session ending at 200 and one starting at 200 do not overlap
+        self.assertEqual(list(peak), [2, 0, 1])
+        self.assertEqual(peak_at[0], 150.0)
+        self.assertTrue(np.isnan(peak_at[1]))
+        self.assertEqual(peak_at[2], 50.0)
+
+    def test_report_across_midnight_and_dst(self):
+        station = Station.objects.create(name="Depot", address="1 Main St")
+        chargers = [
+            Charger.objects.create(
+                station=station, code=code, charger_type="DC", power=60
+            )
+            for code in ("C1", "C2")
+        ]
+        for charger, start, end in (
+            # both busy over local midnight into the spring-forward day
+            (chargers[0], (2025, 3, 29, 23, 0), (2025, 3, 30, 0, 30)),
+            (chargers[1], (2025, 3, 29, 23, 45), (2025, 3, 30, 1, 30)),
+            # and one more session after it
+            (chargers[0], (2025, 3, 30, 12, 0), (2025, 3, 30, 13, 0)),
+        ):
+            ChargingRecord.objects.create(
+                charger=charger,
+                start_time=datetime(*start, tzinfo=dt_timezone.utc),
+                end_time=datetime(*end, tzinfo=dt_timezone.utc),
+            )
+
+        report = occupancy.occupancy_report(
+            *occupancy.day_range(date(2025, 3, 29), date(2025, 3, 30))
+        )
+
+        self.assertEqual(report["sessions"], 3)
+        summary = report["stations"][0]
+        self.assertEqual(summary["peak_concurrency"], 2)
+        self.assertEqual(summary["peak_at"], "2025-03-29T23:45:00+00:00")
+        # local hour 1 is skipped on the 30th, so the time after the switch
+        # counts in hour 2 and hour 1 only has the 29th's capacity
+        occupancy_curve = summary["hourly_occupancy"]
+        self.assertEqual(occupancy_curve[0], round((1800 + 3600) / 7200, 3))
+        self.assertEqual(occupancy_curve[1], 0)
+        self.assertEqual(summary["hourly_utilisation"][1], 0)
+        self.assertEqual(occupancy_curve[2], round(1800 / 7200, 3))
+        self.assertEqual(occupancy_curve[23], round((3600 + 900) / 7200, 3))
+
+
+class NearbyStationTests(TestCase):
+    url = "/api/charging/stations/nearby/"
+    origin = {"lat": "53.35", "lng": "-6.26"}
+
+    def setUp(self):
+        self.stations = {}
+        # name: (degrees north of the origin, active, charger status)
+        for name, north, active, status in (
+            ("Far", "0.06", True, "idle"),  # ~6.7 km
+            ("Near", "0.01", True, "idle"),  # ~1.1 km
+            ("Middle", "0.03", True, "idle"),  # ~3.3 km
+            ("Closed", "0.005", False, "idle"),
+            ("Busy", "0.002", True, "charging"),
+        ):
+            station = Station.objects.create(
+                name=name,
+                address="1 Main St",
+                latitude=Decimal("53.35") + Decimal(north),
+                longitude=Decimal("-6.26"),
+                is_active=active,
+            )
+            Charger.objects.create(
+                station=station,
+                code=f"{name}-1",
+                charger_type="DC",
+                power=60,
+                status=status,
+            )
+            self.stations[name] = station
+
+    def nearby(self, **params):
+        response = self.client.get(self.url, {**self.origin, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_nearest_first_with_distances(self):
+        results = self.nearby()
+        self.assertEqual([item["name"] for item in results], ["Near", "Middle"])
+        for item in results:
+            station = self.stations[item["name"]]
+            expected = haversine(53.35, -6.26, station.latitude, station.longitude)
+            self.assertEqual(item["distance"], round(expected, 3))
+        self.assertLess(results[0]["distance"], results[1]["distance"])
+
+    def test_radius_cutoff(self):
+        self.assertEqual(
+            [item["name"] for item in self.nearby(radius="10")],
+            ["Near", "Middle", "Far"],
+        )
+        self.assertEqual([item["name"] for item in self.nearby(radius="2")], ["Near"])
+        self.assertEqual(self.nearby(radius="1"), [])
+
+    def test_limit(self):
+        self.assertEqual(
+            [item["name"] for item in self.nearby(radius="10", limit="2")],
+            ["Near", "Middle"],
+        )
+
+    def test_rejects_missing_or_invalid_coordinates(self):
+        for params in (
+            {"lng": "-6.26"},
+            {"lat": "53.35"},
+            {"lat": "north", "lng": "-6.26"},
+            {"lat": "53.35", "lng": ""},
+            {"lat": "91", "lng": "-6.26"},
+            {"lat": "nan", "lng": "-6.26"},
+            {"lat": "53.35", "lng": "-181"},
+            {**self.origin, "radius": "0"},
+            {**self.origin, "limit": "ten"},
+        ):
+            with self.assertLogs("django.request", "WARNING"):
+                response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 400, params)
+
+
+class AvailabilityWriteThroughTests(TestCase):
+    def setUp(self):
+        stack = contextlib.ExitStack()
+        self.addCleanup(stack.close)
+        stack.enter_context(shared_availability_cache())
+        self.station = Station.objects.create(name="Depot", address="1 Main St")
+        self.chargers = [
+            Charger.objects.create(
+                station=self.station, code=code, charger_type="DC", power=60
+            )
+            for code in ("C1", "C2")
+        ]
+        # warm the entry the idle-station list is served from
+        availability.get_stations([self.station.pk])
+        self.assertEqual(self.cached_idle(), ["C1", "C2"])
+
+    def cached_idle(self):
+        """Idle charger codes in the station's cache entry, None if missing"""
+        key = availability._station_key(self.station.pk)
+        entry = caches[availability.CACHE_ALIAS].get(key)
+        if entry is None:
+            return None
+        self.assertEqual(entry["idle_count"], len(entry["chargers"]))
+        return sorted(charger["code"] for charger in entry["chargers"])
+
+    def test_set_charger_status_writes_through(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            set_charger_status(Charger.objects.filter(code="C1"), "maintenance")
+        self.assertEqual(self.cached_idle(), ["C2"])
+        response = self.client.get(
+            f"/api/charging/stations/{self.station.pk}/", {"charger_status": "idle"}
+        )
+        self.assertEqual(
+            [charger["code"] for charger in response.json()["chargers"]], ["C2"]
+        )
+
+    def test_unchanged_status_leaves_the_entry_alone(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            set_charger_status(Charger.objects.all(), "idle")
+        self.assertEqual(callbacks, [])
+
+    def test_rolled_back_change_is_not_written(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(DatabaseError):
+                with transaction.atomic():
+                    set_charger_status(Charger.objects.all(), "charging")
+                    raise DatabaseError("rolled back")
+        self.assertEqual(self.cached_idle(), ["C1", "C2"])
+
+    def test_bulk_status_writes_through(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/api/charging/chargers/bulk_status/",
+                {"status": "charging", "chargers": [str(self.chargers[1].pk)]},
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.cached_idle(), ["C1"])
+
+    def test_expiry_writes_through(self):
+        set_charger_status(Charger.objects.all(), "charging")
+        records = [
+            ChargingRecord.objects.create(
+                charger=charger,
+                start_time=timezone.now() - timedelta(hours=1),
+                expires_at=timezone.now() - timedelta(minutes=minutes),
+            )
+            for charger, minutes in zip(self.chargers, (5, -5))
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            released = expiry.release_expired([record.pk for record in records])
+        self.assertEqual(released, [records[0].pk])
+        self.assertEqual(self.cached_idle(), ["C1"])
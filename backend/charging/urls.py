@@ -1,16 +1,43 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import views
+from . import async_views, views
 
 router = DefaultRouter()
 router.register(r"stations", views.StationViewSet, basename="stations")
 router.register(r"chargers", views.ChargerViewSet, basename="chargers")
 router.register(r"records", views.ChargingRecordViewSet, basename="records")
+router.register(
+    r"station-stats", views.StationDailyStatsViewSet, basename="station-stats"
+)
+router.register(
+    r"charger-stats", views.ChargerDailyStatsViewSet, basename="charger-stats"
+)
+router.register(r"occupancy", views.OccupancyViewSet, basename="occupancy")
+router.register(r"meter-samples", views.MeterSampleViewSet, basename="meter-samples")
 router.register(r"user", views.UserViewSet, basename="users")
 
 
 urlpatterns = [
     path("", include(router.urls)),
     path("login/", views.UserLoginView.as_view(), name="login"),
+    # coroutine views for the ASGI server, see charging/async_views.py
+    path("status-stream/", async_views.status_stream, name="status-stream"),
+    path("async/stations/", async_views.station_list, name="async-station-list"),
+    path(
+        "async/stations/<str:pk>/",
+        async_views.station_detail,
+        name="async-station-detail",
+    ),
+    path("async/chargers/", async_views.charger_list, name="async-charger-list"),
+    path(
+        "async/chargers/<str:pk>/",
+        async_views.charger_detail,
+        name="async-charger-detail",
+    ),
+    path(
+        "async/status-stream/",
+        async_views.status_stream,
+        name="async-status-stream",
+    ),
     path("api-auth/", include("rest_framework.urls", namespace="rest_framework")),
 ]
@@ -1,13 +1,47 @@
-from django.db.models import Prefetch
+import heapq
+from datetime import date, timedelta
+import uuid
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Prefetch, Q, Sum
+from django.http import Http404
+from django.utils import timezone
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import viewsets, filters
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 
-from .models import Station, Charger, ChargingRecord, User
-from .serializers import StationSerializer, ChargerSerializer, ChargingRecordSerializer
+from . import availability, events, expiry, occupancy, telemetry
+from .conditional import conditional_get
+from .customFilter import (
+    ChargerDailyStatsFilter,
+    ChargingRecordFilter,
+    StationDailyStatsFilter,
+)
+from .exports import records_csv_response
+from .pagination import KeysetPagination
+from .geo import bounding_box, covering_geohashes, haversine
+from .models import (
+    Station,
+    Charger,
+    ChargerDailyStats,
+    ChargingRecord,
+    StationDailyStats,
+    User,
+)
+from .serializers import (
+    BulkChargerStatusSerializer,
+    ChargerDailyStatsSerializer,
+    StationDailyStatsSerializer,
+    StationSerializer,
+    ChargerSerializer,
+    ChargingRecordSerializer,
+    ScheduleExpirySerializer,
+)
+from .status import set_charger_status
 
 # views.py
 from rest_framework.authtoken.views import ObtainAuthToken
@@ -62,6 +96,13 @@ class UserViewSet(viewsets.ModelViewSet):
         )
 
 
+def _parse_uuid(value):
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
+
+
 charger_status = openapi.Parameter(
     "charger_status",  # 参数名称，必须与您的过滤器中使用的名称一致
     openapi.IN_QUERY,  # 参数位置：查询参数
@@ -70,135 +111,469 @@ charger_status = openapi.Parameter(
     required=False,  # 是否必须
 )
 
+nearby_parameters = [
+    openapi.Parameter("lat", openapi.IN_QUERY, type=openapi.TYPE_NUMBER, required=True),
+    openapi.Parameter("lng", openapi.IN_QUERY, type=openapi.TYPE_NUMBER, required=True),
+    openapi.Parameter(
+        "radius",
+        openapi.IN_QUERY,
+        description="Search radius in km (default 5)",
+        type=openapi.TYPE_NUMBER,
+    ),
+    openapi.Parameter(
+        "limit",
+        openapi.IN_QUERY,
+        description="Maximum number of stations (default 10, max 100)",
+        type=openapi.TYPE_INTEGER,
+    ),
+]
+
+NEARBY_MAX_LIMIT = 100
+
+
+def station_queryset(charger_status=None):
+    """Stations with their chargers (optionally only those in one status)"""
+    # total/idle/per-type counts come from one annotated query
+    queryset = Station.objects.with_charger_counts().order_by("name")
+
+    if charger_status:
+        return queryset.prefetch_related(
+            Prefetch(
+                "chargers",
+                queryset=Charger.objects.filter(
+                    status=charger_status
+                ),  # 按状态过滤充电桩
+                to_attr="filtered_chargers",  # 自定义属性名，避免覆盖原related_name
+            )
+        )
+    return queryset.filter(charger_count__gt=0).prefetch_related(
+        Prefetch(
+            "chargers",
+            queryset=Charger.objects.all(),
+            to_attr="filtered_chargers",
+        )
+    )
+
 
 class StationViewSet(viewsets.ModelViewSet):
+    read_replica = True
     serializer_class = StationSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ["name", "address"]
     ordering_fields = ["name", "created_at"]
 
     def get_queryset(self):
-        queryset = Station.objects.all()
-
-        charger_status = self.request.query_params.get("charger_status")
-
-        if charger_status:
-            queryset = queryset.prefetch_related(
-                Prefetch(
-                    "chargers",
-                    queryset=Charger.objects.filter(
-                        status=charger_status
-                    ),  # 按状态过滤充电桩
-                    to_attr="filtered_chargers",  # 自定义属性名，避免覆盖原related_name
-                )
-            )
-        else:
-            queryset = queryset.exclude(chargers__isnull=True).prefetch_related(
-                Prefetch(
-                    "chargers",
-                    queryset=Charger.objects.all(),
-                    to_attr="filtered_chargers",
-                )
-            )
-
-        return queryset
+        return station_queryset(self.request.query_params.get("charger_status"))
 
     @swagger_auto_schema(
         manual_parameters=[charger_status],
     )
+    @conditional_get
     def list(self, request, *args, **kwargs):
+        if self._use_availability_cache(request):
+            station_ids = availability.get_station_ids()
+            page = self.paginate_queryset(station_ids)
+            if page is None:
+                return Response(availability.get_stations(station_ids))
+            return self.get_paginated_response(availability.get_stations(page))
         return super().list(request, *args, **kwargs)
 
+    @conditional_get
+    def retrieve(self, request, *args, **kwargs):
+        if self._use_availability_cache(request):
+            station_id = _parse_uuid(kwargs[self.lookup_field])
+            if station_id is None:
+                raise Http404
+            stations = availability.get_stations([station_id])
+            if not stations:
+                raise Http404
+            return Response(stations[0])
+        return super().retrieve(request, *args, **kwargs)
+
+    def _use_availability_cache(self, request):
+        """The plain idle-station view is served from the availability cache"""
+        params = request.query_params
+        return (
+            params.get("charger_status") == "idle"
+            and not params.get("search")
+            and not params.get("ordering")
+        )
+
+    @swagger_auto_schema(manual_parameters=nearby_parameters)
+    @action(detail=False, methods=["get"])
+    def nearby(self, request):
+        """Return the nearest active stations that have idle chargers"""
+        params = request.query_params
+        try:
+            lat = float(params["lat"])
+            lng = float(params["lng"])
+            radius = float(params.get("radius", 5))
+            limit = min(int(params.get("limit", 10)), NEARBY_MAX_LIMIT)
+        except (KeyError, ValueError):
+            raise ValidationError("lat and lng are required, radius/limit numeric")
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180) or radius <= 0 or limit <= 0:
+            raise ValidationError("lat/lng out of range or non-positive radius/limit")
+
+        # prefilter on the geohash cells and bounding box, both indexed
+        candidates = Station.objects.filter(is_active=True)
+        cells = covering_geohashes(lat, lng, radius)
+        if cells:
+            prefix = Q()
+            for cell in cells:
+                prefix |= Q(geohash__startswith=cell)
+            candidates = candidates.filter(prefix)
+        min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius)
+        candidates = candidates.filter(latitude__range=(min_lat, max_lat))
+        if min_lng >= -180 and max_lng <= 180:
+            candidates = candidates.filter(longitude__range=(min_lng, max_lng))
+        candidates = candidates.filter(
+            Exists(Charger.objects.filter(station=OuterRef("pk"), status="idle"))
+        )
+
+        # exact ranking on the (small) candidate set
+        distances = (
+            (haversine(lat, lng, station_lat, station_lng), pk)
+            for pk, station_lat, station_lng in candidates.values_list(
+                "pk", "latitude", "longitude"
+            )
+        )
+        nearest = heapq.nsmallest(
+            limit, (item for item in distances if item[0] <= radius)
+        )
+
+        stations = Station.objects.with_charger_counts().prefetch_related(
+            Prefetch(
+                "chargers",
+                queryset=Charger.objects.filter(status="idle"),
+                to_attr="filtered_chargers",
+            )
+        )
+        stations = stations.in_bulk([pk for _, pk in nearest])
+        ordered = [stations[pk] for _, pk in nearest]
+        data = self.get_serializer(ordered, many=True).data
+        for item, (distance, _) in zip(data, nearest):
+            item["distance"] = round(distance, 3)
+        return Response(data)
+
 
 class ChargerViewSet(viewsets.ModelViewSet):
-    queryset = Charger.objects.all()
+    read_replica = True
+    queryset = Charger.objects.select_related("station")
     serializer_class = ChargerSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     filterset_fields = ["station", "status", "charger_type"]
     search_fields = ["code", "station__name"]
 
+    @conditional_get
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_get
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    def _set_status(self, status):
+        charger = self.get_object()
+        set_charger_status(Charger.objects.filter(pk=charger.pk), status)
+
     @action(detail=True, methods=["post"])
     def set_maintenance(self, request, pk=None):
         """Set charger to maintenance mode"""
-        charger = self.get_object()
-        charger.status = "maintenance"
-        charger.save()
+        self._set_status("maintenance")
         return Response({"status": "maintenance mode activated"})
 
     @action(detail=True, methods=["post"])
     def set_active(self, request, pk=None):
         """Set charger back to active mode"""
-        charger = self.get_object()
-        charger.status = "idle"
-        charger.save()
+        self._set_status("idle")
         return Response({"status": "charger activated"})
 
     @action(detail=True, methods=["post"])
     def set_inactive(self, request, pk=None):
-        charger = self.get_object()
-        charger.status = "charging"
-        charger.save()
+        self._set_status("charging")
         return Response({"status": "charger inactivated"})
 
+    @action(detail=True, methods=["post"])
+    def expire_session(self, request, pk=None):
+        """End the charger's current session now and release the charger
+
+        For the timeout rules the old EventBridge scheduler left behind, which
+        know the charger but not the session; the session is completed the
+        same way the expiry scheduler completes it.
+        """
+        charger = self.get_object()
+        current = (
+            charger.records.exclude(status="completed")
+            .order_by("-start_time")
+            .values_list("pk", flat=True)
+            .first()
+        )
+        released = expiry.expire_now([current]) if current else []
+        return Response({"released": released})
+
+    @swagger_auto_schema(request_body=BulkChargerStatusSerializer)
+    @action(detail=False, methods=["post"])
+    def bulk_status(self, request):
+        """Set the status of many chargers with a single UPDATE
+
+        Body: ``{"status": "maintenance", "chargers": [<id>, ...]}`` or
+        ``{"status": "maintenance", "station": <id>, "current_status": "idle",
+        "charger_type": "DC"}``.
+        """
+        serializer = BulkChargerStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        status = data["status"]
+
+        if "chargers" in data:
+            requested = list(dict.fromkeys(data["chargers"]))
+            queryset = Charger.objects.filter(pk__in=requested)
+        else:
+            queryset = Charger.objects.filter(station_id=data["station"])
+            if "current_status" in data:
+                queryset = queryset.filter(status=data["current_status"])
+            if "charger_type" in data:
+                queryset = queryset.filter(charger_type=data["charger_type"])
+            requested = None
+
+        previous = set_charger_status(queryset, status)
+        results = [
+            {
+                "id": pk,
+                "previous_status": previous_status,
+                "result": "unchanged" if previous_status == status else "updated",
+            }
+            for pk, previous_status in previous.items()
+        ]
+        if requested is not None:
+            order = {pk: index for index, pk in enumerate(requested)}
+            results.sort(key=lambda item: order[item["id"]])
+            results += [
+                {"id": pk, "previous_status": None, "result": "not_found"}
+                for pk in requested
+                if pk not in previous
+            ]
+        return Response(
+            {
+                "status": status,
+                "updated": sum(item["result"] == "updated" for item in results),
+                "results": results,
+            }
+        )
+
 
 class ChargingRecordViewSet(viewsets.ModelViewSet):
-    queryset = ChargingRecord.objects.all()
+    read_replica = True
+    # charger_code/user_username are read from the related rows
+    queryset = ChargingRecord.objects.select_related("charger", "user")
     serializer_class = ChargingRecordSerializer
+    pagination_class = KeysetPagination
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
-    filterset_fields = ["charger", "user", "pay_status"]
+    filterset_class = ChargingRecordFilter
     ordering_fields = ["start_time", "fee"]
 
+    @conditional_get
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_get
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         # 从验证后的数据中获取充电器对象（已通过序列化器验证）
         charger = serializer.validated_data["charger"]
 
-        # 更新充电器状态
-        charger.status = "charging"
-        charger.save(update_fields=["status"])  # 只更新status字段，效率更高
+        with transaction.atomic():
+            # 用条件UPDATE原子地占用充电器：只有仍为idle时才会更新成功，
+            # 避免两个请求同时占用同一个充电器
+            claimed = Charger.objects.filter(pk=charger.pk, status="idle").update(
+                status="charging", updated_at=timezone.now()
+            )
+            if not claimed:
+                raise ValidationError({"charger": ["charger status must be idle"]})
+
+            # 保存充电记录（与占用充电器在同一个事务中）
+            serializer.save()  # 无需返回值，DRF会自动处理后续响应
 
-        # 保存充电记录（可在此处添加其他关联字段，如创建者）
-        serializer.save()  # 无需返回值，DRF会自动处理后续响应
+        # update() 不会触发 post_save，手动刷新缓存并推送状态变化
+        charger.status = "charging"
+        availability.refresh_station(charger.station_id)
+        events.publish_status_change(charger, "idle")
 
     @action(detail=False, methods=["get"])
     def export_as_csv(self, request):
-        """Export selected records as CSV"""
-        import csv
-        from django.http import HttpResponse
-
-        response = HttpResponse(content_type="text/csv")
-        response["Content-Disposition"] = 'attachment; filename="charging_records.csv"'
-        queryset = ChargingRecord.objects.all()
-
-        writer = csv.writer(response)
-        writer.writerow(
-            [
-                "ID",
-                "Charger",
-                "License Plate",
-                "Start Time",
-                "End Time",
-                "Energy (kWh)",
-                "Fee (¥)",
-                "Payment Status",
-            ]
+        """Export records as CSV, accepting the same filters as the list
+
+        e.g. ``?start_after=2025-01-01&start_before=2025-02-01&station=<id>
+        &pay_status=unpaid``. Rows are streamed as they are read.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        return records_csv_response(queryset)
+
+    @swagger_auto_schema(request_body=ScheduleExpirySerializer)
+    @action(detail=True, methods=["post"])
+    def schedule_expiry(self, request, pk=None):
+        """Release the charger after ``minutes`` (see run_expiry_scheduler)"""
+        serializer = ScheduleExpirySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        record = self.get_object()
+        record.expires_at = timezone.now() + timedelta(
+            minutes=serializer.validated_data["minutes"]
         )
-        for obj in queryset:
-            writer.writerow(
-                [
-                    obj.id,
-                    obj.charger.code,
-                    obj.start_time,
-                    obj.end_time,
-                    obj.electricity,
-                    obj.fee,
-                    obj.get_pay_status_display(),
-                ]
-            )
-        return response
+        record.save(update_fields=["expires_at", "updated_at"])
+        return Response({"expires_at": record.expires_at})
 
     @action(detail=True, methods=["post"])
     def set_paid(self, request, pk=None):
         record = self.get_object()
         record.pay_status = "paid"
-        record.save()
+        # create_order schedules the expiry concurrently; don't overwrite it
+        record.save(update_fields=["pay_status", "updated_at"])
         return Response({"status": "paid"})
+
+
+class StationDailyStatsViewSet(viewsets.ReadOnlyModelViewSet):
+    """Daily station roll-ups for the dashboard (see ``rollup_daily_stats``)
+
+    Filter with ``?station=<id>&date_after=YYYY-MM-DD&date_before=YYYY-MM-DD``.
+    """
+
+    read_replica = True
+    queryset = StationDailyStats.objects.order_by("-date", "station_id")
+    serializer_class = StationDailyStatsSerializer
+    filterset_class = StationDailyStatsFilter
+
+    @action(detail=False, methods=["get"])
+    def summary(self, request):
+        """Fleet totals and a per-day series over the filtered range
+
+        Utilisation is busy time over the chargers' capacity for every day
+        from ``date_after`` (default: the first day with data) to
+        ``date_before`` (default: today).
+        """
+        queryset = self.filter_queryset(self.get_queryset()).order_by()
+        fields = ("sessions", "energy_kwh", "revenue", "busy_minutes", "fault_count")
+        series = list(
+            queryset.values("date")
+            .annotate(**{field: Sum(field) for field in fields})
+            .order_by("date")
+        )
+        totals = {field: sum(day[field] for day in series) for field in fields}
+
+        # days without any sessions are idle capacity too, so count the
+        # days in the requested range rather than the days with a row
+        bounds = self.filterset_class(request.query_params).form
+        bounds.is_valid()  # already validated by filter_queryset
+        first = bounds.cleaned_data.get("date_after")
+        if first is None and series:
+            first = series[0]["date"]
+        last = bounds.cleaned_data.get("date_before") or timezone.localdate()
+        days = (last - first).days + 1 if first is not None and first <= last else 0
+
+        chargers = Charger.objects.all()
+        if request.query_params.get("station"):
+            chargers = chargers.filter(station_id=request.query_params["station"])
+        capacity = chargers.count() * days * 24 * 60
+        totals["utilisation"] = (
+            round(totals["busy_minutes"] / capacity, 4) if capacity else None
+        )
+        return Response({"totals": totals, "days": series})
+
+
+class ChargerDailyStatsViewSet(viewsets.ReadOnlyModelViewSet):
+    """Daily charger roll-ups, filterable by station, charger and date range"""
+
+    read_replica = True
+    queryset = ChargerDailyStats.objects.order_by("-date", "charger_id")
+    serializer_class = ChargerDailyStatsSerializer
+    filterset_class = ChargerDailyStatsFilter
+
+
+class OccupancyViewSet(viewsets.ViewSet):
+    """How busy chargers and stations are by hour of day"""
+
+    read_replica = True
+    MAX_DAYS = 366
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter("start", openapi.IN_QUERY, type=openapi.TYPE_STRING),
+            openapi.Parameter("end", openapi.IN_QUERY, type=openapi.TYPE_STRING),
+            openapi.Parameter("station", openapi.IN_QUERY, type=openapi.TYPE_STRING),
+        ]
+    )
+    def list(self, request):
+        """Utilisation, occupancy curves and peak concurrency
+
+        ``?start=YYYY-MM-DD&end=YYYY-MM-DD`` (inclusive local dates, default
+        the last 30 days). With ``?station=<id>`` the report also breaks the
+        station down per charger.
+        """
+        today = timezone.localdate()
+        try:
+            end = date.fromisoformat(request.query_params.get("end", str(today)))
+            start = date.fromisoformat(
+                request.query_params.get("start", str(end - timedelta(days=29)))
+            )
+        except ValueError:
+            raise ValidationError({"start": ["expected dates as YYYY-MM-DD"]})
+        if start > end or (end - start).days >= self.MAX_DAYS:
+            raise ValidationError(
+                {
+                    "start": [
+                        f"start must be on or before end, at most {self.MAX_DAYS} days"
+                    ]
+                }
+            )
+
+        station = request.query_params.get("station")
+        if station is not None:
+            station = _parse_uuid(station)
+            if station is None:
+                raise ValidationError({"station": ["invalid station id"]})
+        range_start, range_end = occupancy.day_range(start, end)
+        return Response(
+            occupancy.occupancy_report(
+                range_start, range_end, station, per_charger=station is not None
+            )
+        )
+
+
+class MeterSampleViewSet(viewsets.ViewSet):
+    """Batch ingestion of charger meter readings"""
+
+    @swagger_auto_schema(
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                "samples": openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        properties={
+                            "charger": openapi.Schema(type=openapi.TYPE_STRING),
+                            "record": openapi.Schema(type=openapi.TYPE_STRING),
+                            "measured_at": openapi.Schema(type=openapi.TYPE_STRING),
+                            "energy_kwh": openapi.Schema(type=openapi.TYPE_NUMBER),
+                            "power_kw": openapi.Schema(type=openapi.TYPE_NUMBER),
+                        },
+                    ),
+                )
+            },
+        )
+    )
+    def create(self, request):
+        """Store up to 10000 samples; invalid items are reported, not stored"""
+        samples = (
+            request.data.get("samples") if isinstance(request.data, dict) else None
+        )
+        if not isinstance(samples, list):
+            raise ValidationError({"samples": ["expected a list of samples"]})
+        if len(samples) > telemetry.MAX_BATCH_SIZE:
+            raise ValidationError(
+                {"samples": [f"at most {telemetry.MAX_BATCH_SIZE} samples per batch"]}
+            )
+        accepted, rejected = telemetry.parse_samples(samples)
+        stored = telemetry.store_samples(accepted)
+        return Response({"accepted": stored, "rejected": rejected}, status=201)
@@ -0,0 +1,23 @@
+"""
+ASGI config for charging_system project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with uvicorn workers, e.g.::
+
+    gunicorn -k uvicorn.workers.UvicornWorker charging_system.asgi:application
+
+This is how the web process runs (see the Procfile): the status stream and
+the ``/api/charging/async/`` reads are coroutines, the sync DRF views run
+in a thread.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "charging_system.settings")
+
+application = get_asgi_application()
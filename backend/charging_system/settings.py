@@ -57,6 +57,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "charging.routers.ReplicaRoutingMiddleware",
 ]
 CORS_ALLOW_CREDENTIALS = True
 CORS_ALLOW_ALL_ORIGINS = True
@@ -108,6 +109,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "charging_system.wsgi.application"
+ASGI_APPLICATION = "charging_system.asgi.application"
 
 
 if "RDS_DB_NAME" in os.environ:
@@ -133,6 +135,42 @@ else:
         }
     }
 
+# Optional read replica (e.g. an RDS read replica). Safe-method requests to
+# the read-heavy API views read from it, see charging/routers.py; a client is
+# kept on the primary for REPLICA_PIN_SECONDS after it writes. The pins are
+# kept in the availability cache; while that is process-local the replica is
+# not used at all.
+if "RDS_REPLICA_HOSTNAME" in os.environ:
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "HOST": os.environ["RDS_REPLICA_HOSTNAME"],
+        "PORT": os.environ.get("RDS_REPLICA_PORT", DATABASES["default"]["PORT"]),
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_ROUTERS = ["charging.routers.ReplicaRouter"]
+REPLICA_PIN_SECONDS = int(os.environ.get("REPLICA_PIN_SECONDS", 10))
+
+# The station availability cache (charging/availability.py) also holds the
+# status change feed. It is local memory per process by default; set
+# AVAILABILITY_CACHE_BACKEND/LOCATION to a shared cache (e.g.
+# django.core.cache.backends.redis.RedisCache) for multi-worker deployments
+# so write-through updates are seen by every worker. The worker processes
+# (run_expiry_scheduler, consume_status_changes) require a shared cache and
+# refuse to start without one.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "availability": {
+        "BACKEND": os.environ.get(
+            "AVAILABILITY_CACHE_BACKEND",
+            "django.core.cache.backends.locmem.LocMemCache",
+        ),
+        "LOCATION": os.environ.get("AVAILABILITY_CACHE_LOCATION", "availability"),
+        "TIMEOUT": int(os.environ.get("AVAILABILITY_CACHE_TIMEOUT", 60)),
+    },
+}
+
 AUTH_USER_MODEL = "charging.User"
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -163,3 +201,17 @@ USE_TZ = True
 STATIC_URL = "static/"
 STATIC_ROOT = os.path.join(BASE_DIR, "static")
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# old charging record partitions are dumped here by manage_record_partitions
+RECORD_ARCHIVE_DIR = os.environ.get(
+    "RECORD_ARCHIVE_DIR", os.path.join(BASE_DIR, "record_archive")
+)
+
+# charger status changes published by the create_order Lambda, applied by
+# consume_status_changes; STATUS_QUEUE_CLIENT names a factory for an object
+# with the boto3 SQS client's methods (charging.status_queue.LocalQueue for an
+# in-process queue). main.tf sets the queue URL in the EB environment.
+CHARGER_STATUS_QUEUE_URL = os.environ.get("CHARGER_STATUS_QUEUE_URL", "")
+STATUS_QUEUE_CLIENT = os.environ.get(
+    "STATUS_QUEUE_CLIENT", "charging.status_queue.sqs_client"
+)
@@ -18,6 +18,37 @@ function getQueryVariable(variable) {
 }
 
 
+const STATUS_POLL_WAIT = 20;
+
+/**
+ * Subscribes to charger status changes and calls onChange for each one.
+ *
+ * Long-polls the status stream with `wait=` rather than using EventSource:
+ * API Gateway buffers responses and cuts them off at 29s, so a stream would
+ * never reach the page. The endpoint is an async view, so a waiting poll
+ * does not hold a web worker.
+ *
+ * @param {Object} filters - e.g. {charger: id} or {station: id}
+ * @param {Function} onChange - called with each status event
+ */
+function subscribeStatus(filters, onChange) {
+    const url = backendbaseurl + '/api/charging/status-stream/?' + new URLSearchParams(filters);
+    let since = '';
+    const poll = async () => {
+        try {
+            const response = await fetch(`${url}&wait=${STATUS_POLL_WAIT}${since !== '' ? '&since=' + since : ''}`);
+            const data = await response.json();
+            since = data.last_event_id;
+            data.events.forEach(onChange);
+        } catch (error) {
+            console.error(error);
+            await new Promise((resolve) => setTimeout(resolve, 5000));
+        }
+        poll();
+    };
+    poll();
+}
+
 //=============================================================================
 // Configuration
 //=============================================================================